@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Análises de utilização da frota
+Os períodos das faturas são divididos por mês e agregados com operações vetorizadas
+(NumPy/pandas), sem laços por fatura: dias locados x dias disponíveis, receita por dia
+disponível e sequências de dias sem locação de cada veículo
+"""
+
+import logging
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Datas são tratadas como número de dias desde 1970-01-01 (int64); veículos, pela
+# posição (0..V-1) na tabela de veículos analisada
+_DIA = "datetime64[D]"
+_MES = "datetime64[M]"
+
+
+def dias_desde_epoca(datas) -> np.ndarray:
+    """Converte datas (texto, date ou Timestamp) para dias desde 1970-01-01; inválidas viram NaN"""
+    # Só a parte da data: cadastros gravados com e sem hora convivem na mesma coluna
+    texto = pd.Series(datas, dtype=object).astype(str).str[:10]
+    dias = pd.to_datetime(texto, format="%Y-%m-%d", errors="coerce").values.astype(_DIA)
+    return np.where(np.isnat(dias), np.nan, dias.astype(np.int64))
+
+
+def calendario(inicio: int, fim: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, pd.Index]:
+    """Tabelas do período [inicio, fim]: mês de cada dia, primeiro e último dia de cada mês
+    (recortados ao período) e os rótulos 'AAAA-MM'.
+
+    Consultar o mês de um dia na tabela evita converter milhões de datas para datetime64.
+    """
+    dias = np.arange(inicio, fim + 1).astype(_DIA)
+    meses = np.arange(dias[0].astype(_MES), dias[-1].astype(_MES) + 1)
+    mes_do_dia = (dias.astype(_MES) - meses[0]).astype(np.int64)
+    primeiro_dia = np.maximum(meses.astype(_DIA).astype(np.int64), inicio)
+    ultimo_dia = np.minimum((meses + 1).astype(_DIA).astype(np.int64) - 1, fim)
+    return mes_do_dia, primeiro_dia, ultimo_dia, pd.Index(meses.astype(str), name="mes")
+
+
+def expandir_por_mes(inicio: np.ndarray, fim: np.ndarray, periodo_inicio: int,
+                     mes_do_dia: np.ndarray, primeiro_dia: np.ndarray,
+                     ultimo_dia: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Divide cada intervalo [inicio, fim] (já recortado ao período) nos meses que atravessa.
+
+    Retorna, por trecho: o índice do intervalo de origem, o índice do mês e os dias do trecho.
+    """
+    mes_ini = mes_do_dia[inicio - periodo_inicio]
+    trechos = mes_do_dia[fim - periodo_inicio] - mes_ini + 1
+    # Índice de origem repetido uma vez por mês atravessado, mais o deslocamento do mês
+    origem = np.repeat(np.arange(len(inicio)), trechos)
+    mes = mes_ini[origem] + np.arange(len(origem)) - np.repeat(np.cumsum(trechos) - trechos, trechos)
+    dias = np.minimum(fim[origem], ultimo_dia[mes]) - np.maximum(inicio[origem], primeiro_dia[mes]) + 1
+    return origem, mes, dias
+
+
+def unir_sobrepostas(veiculo: np.ndarray, inicio: np.ndarray,
+                     fim: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Une os intervalos sobrepostos ou contíguos de cada veículo em períodos ocupados disjuntos,
+    ordenados por veículo e início"""
+    # Chave única (veículo, dia) em int64: um argsort simples no lugar do lexsort
+    deslocamento = veiculo << 32
+    ordem = np.argsort(deslocamento + inicio)
+    veiculo, inicio, fim, deslocamento = veiculo[ordem], inicio[ordem], fim[ordem], deslocamento[ordem]
+    if not len(veiculo):
+        return veiculo, inicio, fim
+
+    # Máximo acumulado do fim por veículo: a chave (veículo, fim) só cresce dentro do veículo
+    ocupado_ate = np.maximum.accumulate(deslocamento + fim) - deslocamento
+
+    # Novo período quando muda o veículo ou o intervalo começa depois do último dia ocupado
+    novo = np.ones(len(veiculo), dtype=bool)
+    novo[1:] = (veiculo[1:] != veiculo[:-1]) | (inicio[1:] > ocupado_ate[:-1] + 1)
+    inicios = np.flatnonzero(novo)
+    finais = np.append(inicios[1:] - 1, len(veiculo) - 1)
+    return veiculo[inicios], inicio[inicios], ocupado_ate[finais]
+
+
+def sequencias_ociosas(veiculo: np.ndarray, inicio: np.ndarray, fim: np.ndarray,
+                       disponivel_desde: np.ndarray, periodo_fim: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Maior sequência de dias sem locação e dias parados ao fim do período, por veículo.
+
+    Recebe os períodos disjuntos de unir_sobrepostas; veículos sem período ficam parados
+    desde `disponivel_desde`.
+    """
+    maior = np.zeros(len(disponivel_desde), dtype=np.int64)
+    ultimo_ocupado = disponivel_desde - 1
+    if len(veiculo):
+        # Lacuna antes de cada período; o primeiro de cada veículo compara com o início da disponibilidade
+        primeiro = np.ones(len(veiculo), dtype=bool)
+        primeiro[1:] = veiculo[1:] != veiculo[:-1]
+        anterior = np.empty(len(veiculo), dtype=np.int64)
+        anterior[1:] = fim[:-1]
+        anterior[primeiro] = disponivel_desde[veiculo[primeiro]] - 1
+
+        segmentos = np.flatnonzero(primeiro)
+        maior[veiculo[segmentos]] = np.maximum.reduceat(inicio - anterior - 1, segmentos)
+        ultimos = np.append(segmentos[1:] - 1, len(veiculo) - 1)
+        ultimo_ocupado[veiculo[ultimos]] = fim[ultimos]
+
+    # Veículo cadastrado depois do fim do período: nenhum dia parado (e não um número negativo)
+    ociosidade_final = np.maximum(periodo_fim - ultimo_ocupado, 0)
+    return np.maximum(maior, ociosidade_final), ociosidade_final
+
+
+def utilizacao_frota(locacoes: pd.DataFrame, veiculos: pd.DataFrame,
+                     data_inicio, data_fim) -> Dict[str, pd.DataFrame]:
+    """Calcula a utilização da frota no período, por veículo e mês.
+
+    `locacoes`: veiculo_id, inicio, fim (dias desde a época, inclusivos) e valor_total, como
+    em DatabaseManager.get_periodos_locacao. `veiculos`: id, modelo, placa e data_cadastro.
+    Locações sobrepostas do mesmo veículo (dados legados) não contam dias em dobro; a
+    receita de cada fatura é rateada pelos seus dias.
+
+    Retorna:
+        taxa: matriz veículo x mês ('AAAA-MM') com a fração dos dias disponíveis locada
+        mensal: dias_locados, dias_disponiveis e receita por (veiculo_id, mes)
+        veiculos: totais do período por veículo, com receita por dia disponível e ociosidade
+    """
+    inicio, fim = (int(dia) for dia in dias_desde_epoca([data_inicio, data_fim]))
+    mes_do_dia, primeiro_dia, ultimo_dia, rotulos = calendario(inicio, fim)
+    total_veiculos, total_meses = len(veiculos), len(rotulos)
+
+    # Posição de cada locação na tabela de veículos; recorte ao período. Datas nulas ou que
+    # o SQLite não reconhece (NaN) são descartadas antes da conversão para inteiro
+    posicao = pd.Index(veiculos["id"]).get_indexer(locacoes["veiculo_id"])
+    ini_total = pd.to_numeric(locacoes["inicio"], errors="coerce").to_numpy(np.float64)
+    fim_total = pd.to_numeric(locacoes["fim"], errors="coerce").to_numpy(np.float64)
+    com_datas = np.isfinite(ini_total) & np.isfinite(fim_total)
+    if not com_datas.all():
+        logger.warning(f"{np.count_nonzero(~com_datas)} locações sem data válida ignoradas na utilização da frota")
+    ini_total = np.where(com_datas, ini_total, 0).astype(np.int64)
+    fim_total = np.where(com_datas, fim_total, -1).astype(np.int64)
+    ini = np.maximum(ini_total, inicio)
+    fim_recorte = np.minimum(fim_total, fim)
+    validas = com_datas & (posicao >= 0) & (fim_recorte >= ini)
+    posicao, ini, fim_recorte = posicao[validas].astype(np.int64), ini[validas], fim_recorte[validas]
+    duracao = (fim_total - ini_total + 1)[validas]
+    valor = locacoes["valor_total"].to_numpy(np.float64)[validas]
+
+    # Períodos ocupados: locações do mesmo veículo unidas, sem contar dias em dobro
+    veiculo_unido, ini_unido, fim_unido = unir_sobrepostas(posicao, ini, fim_recorte)
+
+    # Disponível desde o cadastro (ou a primeira locação, em dados importados depois dela)
+    cadastro = np.nan_to_num(dias_desde_epoca(veiculos["data_cadastro"]), nan=inicio)
+    primeira = np.full(total_veiculos, np.inf)
+    primeiro_periodo = np.ones(len(veiculo_unido), dtype=bool)
+    primeiro_periodo[1:] = veiculo_unido[1:] != veiculo_unido[:-1]
+    primeira[veiculo_unido[primeiro_periodo]] = ini_unido[primeiro_periodo]
+    desde = np.maximum(np.minimum(cadastro, primeira), inicio).astype(np.int64)
+
+    # Dias disponíveis: matriz veículos x meses, por difusão (broadcasting)
+    disponiveis = np.clip(ultimo_dia[None, :] - np.maximum(primeiro_dia[None, :], desde[:, None]) + 1, 0, None)
+
+    # Receita por (veículo, mês), rateada pelos dias de cada fatura
+    origem, mes, dias = expandir_por_mes(ini, fim_recorte, inicio, mes_do_dia, primeiro_dia, ultimo_dia)
+    celulas = total_veiculos * total_meses
+    receita = np.bincount(posicao[origem] * total_meses + mes, weights=valor[origem] * dias / duracao[origem],
+                          minlength=celulas).reshape(total_veiculos, total_meses)
+
+    # Dias locados pelos períodos unidos
+    origem, mes, dias = expandir_por_mes(ini_unido, fim_unido, inicio, mes_do_dia, primeiro_dia, ultimo_dia)
+    dias_locados = np.bincount(veiculo_unido[origem] * total_meses + mes, weights=dias,
+                               minlength=celulas).astype(np.int64).reshape(total_veiculos, total_meses)
+
+    indice = pd.Index(veiculos["id"].to_numpy(), name="veiculo_id")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        taxa = pd.DataFrame(np.where(disponiveis > 0, dias_locados / disponiveis, np.nan),
+                            index=indice, columns=rotulos)
+
+    mensal = pd.DataFrame({
+        "veiculo_id": np.repeat(indice.to_numpy(), total_meses),
+        "mes": pd.Categorical.from_codes(np.tile(np.arange(total_meses), total_veiculos), rotulos),
+        "dias_locados": dias_locados.ravel(),
+        "dias_disponiveis": disponiveis.ravel(),
+        "receita": receita.ravel(),
+    })
+
+    maior_ociosidade, ociosidade_final = sequencias_ociosas(veiculo_unido, ini_unido, fim_unido, desde, fim)
+    resumo = pd.DataFrame({
+        "modelo": veiculos["modelo"].to_numpy(),
+        "placa": veiculos["placa"].to_numpy(),
+        "dias_locados": dias_locados.sum(axis=1),
+        "dias_disponiveis": disponiveis.sum(axis=1),
+        "receita": receita.sum(axis=1),
+        "maior_ociosidade_dias": maior_ociosidade,
+        "ociosidade_final_dias": ociosidade_final,
+    }, index=indice)
+    dias_disp = resumo["dias_disponiveis"].where(resumo["dias_disponiveis"] > 0)
+    resumo["utilizacao"] = resumo["dias_locados"] / dias_disp
+    resumo["receita_por_dia_disponivel"] = resumo["receita"] / dias_disp
+    resumo = resumo[["modelo", "placa", "dias_locados", "dias_disponiveis", "utilizacao", "receita",
+                     "receita_por_dia_disponivel", "maior_ociosidade_dias", "ociosidade_final_dias"]]
+
+    return {"taxa": taxa, "mensal": mensal, "veiculos": resumo}
@@ -0,0 +1,268 @@
+import gzip
+import hashlib
+import json
+import logging
+import lzma
+import os
+import re
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Compressão padrão dos backups: "lzma", "gzip" ou "none"
+DEFAULT_COMPRESSION = os.environ.get("LOCAUTO_BACKUP_COMPRESSION", "lzma")
+
+# Retenção avô-pai-filho: últimos N dias, semanas (ISO) e meses com backup
+DEFAULT_RETENTION = {"diarios": 7, "semanais": 4, "mensais": 12}
+
+# Nível de compressão: lzma preset 1 comprime ~6x um banco SQLite a ~7 MB/s
+# (o preset 6 ganha ~20% de tamanho e é ~8x mais lento)
+LZMA_PRESET = 1
+GZIP_LEVEL = 6
+
+CATALOG_NAME = "catalogo.json"
+CHUNK_SIZE = 1024 * 1024
+
+_EXTENSIONS = {"lzma": ".db.xz", "gzip": ".db.gz", "none": ".db"}
+_LEGACY_RE = re.compile(r"^backup_locauto_(\d{8}_\d{6})\.db$")
+
+
+def _open_compressed(path: str, mode: str, compressao: str):
+    """Abre um arquivo de backup no formato de compressão indicado"""
+    if compressao == "lzma":
+        return lzma.open(path, mode, preset=LZMA_PRESET if "w" in mode else None)
+    if compressao == "gzip":
+        return gzip.open(path, mode, compresslevel=GZIP_LEVEL)
+    return open(path, mode)
+
+
+def _compression_of(path: str) -> str:
+    """Deduz a compressão pela extensão do arquivo"""
+    if path.endswith(".xz"):
+        return "lzma"
+    if path.endswith(".gz"):
+        return "gzip"
+    return "none"
+
+
+def file_sha256(path: str, compressao: Optional[str] = None) -> str:
+    """Calcula o SHA-256 do conteúdo (descomprimido) de um arquivo, em blocos"""
+    digest = hashlib.sha256()
+    with _open_compressed(path, "rb", compressao or _compression_of(path)) as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BackupStore:
+    """Repositório de backups comprimidos e deduplicados por conteúdo, com catálogo JSON.
+
+    Cada entrada do catálogo registra data, tamanhos e hash de um backup. Backups sem
+    alterações em relação ao anterior não geram arquivo novo: a entrada reaproveita o
+    arquivo existente, e um arquivo só é apagado quando nenhuma entrada o referencia.
+    """
+
+    def __init__(self, directory: str = "backups", compressao: str = DEFAULT_COMPRESSION,
+                 retencao: Optional[Dict[str, int]] = None):
+        if compressao not in _EXTENSIONS:
+            raise ValueError(f"Compressão de backup desconhecida: {compressao}")
+        self.directory = directory
+        self.compressao = compressao
+        self.retencao = {**DEFAULT_RETENTION, **(retencao or {})}
+        self.catalog_path = os.path.join(directory, CATALOG_NAME)
+        self._lock = threading.Lock()
+        self._entries: Optional[List[Dict[str, Any]]] = None
+
+    # ------------------------------------------------------------------
+    # Catálogo
+    # ------------------------------------------------------------------
+
+    def _load(self) -> List[Dict[str, Any]]:
+        """Carrega o catálogo (uma vez); na primeira execução adota os backups .db antigos"""
+        if self._entries is not None:
+            return self._entries
+
+        if os.path.exists(self.catalog_path):
+            with open(self.catalog_path, encoding="utf-8") as f:
+                self._entries = json.load(f).get("backups", [])
+        else:
+            self._entries = self._adopt_legacy()
+            if self._entries:
+                self._save()
+        return self._entries
+
+    def _save(self):
+        """Grava o catálogo de forma atômica (arquivo temporário + os.replace)"""
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = self.catalog_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"versao": 1, "backups": self._entries}, f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, self.catalog_path)
+
+    def _adopt_legacy(self) -> List[Dict[str, Any]]:
+        """Registra no catálogo os backups backup_locauto_*.db criados antes dele existir"""
+        if not os.path.isdir(self.directory):
+            return []
+
+        entries = []
+        for filename in sorted(os.listdir(self.directory)):
+            match = _LEGACY_RE.match(filename)
+            if not match:
+                continue
+            path = os.path.join(self.directory, filename)
+            size = os.path.getsize(path)
+            entries.append({
+                "criado_em": datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").isoformat(timespec="seconds"),
+                "arquivo": filename,
+                "sha256": file_sha256(path, "none"),
+                "compressao": "none",
+                "bytes": size,
+                "bytes_banco": size,
+            })
+        if entries:
+            logger.info(f"{len(entries)} backups existentes adicionados ao catálogo")
+        return entries
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Entradas do catálogo, da mais antiga para a mais recente"""
+        with self._lock:
+            return [dict(e) for e in self._load()]
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Entrada mais recente do catálogo"""
+        with self._lock:
+            entries = self._load()
+            return dict(entries[-1]) if entries else None
+
+    def find(self, antes_de: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Backup mais recente criado até `antes_de` (ou o último, se omitido)"""
+        if antes_de is None:
+            return self.latest()
+        limite = antes_de.isoformat(timespec="seconds")
+        with self._lock:
+            for entry in reversed(self._load()):
+                if entry["criado_em"] <= limite:
+                    return dict(entry)
+        return None
+
+    def path_of(self, entry: Dict[str, Any]) -> str:
+        """Caminho do arquivo de uma entrada do catálogo"""
+        return os.path.join(self.directory, entry["arquivo"])
+
+    # ------------------------------------------------------------------
+    # Gravação, extração e retenção
+    # ------------------------------------------------------------------
+
+    def add(self, snapshot_path: str, criado_em: Optional[datetime] = None) -> Dict[str, Any]:
+        """Adiciona ao repositório o snapshot não comprimido em `snapshot_path` e o remove.
+
+        Se o conteúdo for idêntico ao do último backup, nada é gravado além do catálogo.
+        """
+        criado_em = criado_em or datetime.now()
+        sha256 = file_sha256(snapshot_path, "none")
+        bytes_banco = os.path.getsize(snapshot_path)
+
+        with self._lock:
+            entries = self._load()
+            previous = entries[-1] if entries else None
+
+            if previous and previous["sha256"] == sha256 and os.path.exists(self.path_of(previous)):
+                os.remove(snapshot_path)
+                entry = {**previous, "criado_em": criado_em.isoformat(timespec="seconds"), "duplicado": True}
+            else:
+                filename = f"backup_locauto_{criado_em.strftime('%Y%m%d_%H%M%S')}{_EXTENSIONS[self.compressao]}"
+                final_path = os.path.join(self.directory, filename)
+                if os.path.exists(final_path):
+                    filename = f"backup_locauto_{criado_em.strftime('%Y%m%d_%H%M%S_%f')}{_EXTENSIONS[self.compressao]}"
+                    final_path = os.path.join(self.directory, filename)
+                temp_path = final_path + ".tmp"
+                try:
+                    with open(snapshot_path, "rb") as src, \
+                            _open_compressed(temp_path, "wb", self.compressao) as dst:
+                        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+                    os.replace(temp_path, final_path)
+                finally:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                os.remove(snapshot_path)
+                entry = {
+                    "criado_em": criado_em.isoformat(timespec="seconds"),
+                    "arquivo": filename,
+                    "sha256": sha256,
+                    "compressao": self.compressao,
+                    "bytes": os.path.getsize(final_path),
+                    "bytes_banco": bytes_banco,
+                }
+
+            entries.append({k: v for k, v in entry.items() if k != "duplicado"})
+            self._save()
+
+        if entry.get("duplicado"):
+            logger.info(f"Backup sem alterações desde {previous['criado_em']}; reaproveitando {entry['arquivo']}")
+        else:
+            logger.info(f"Backup gravado: {entry['arquivo']} ({entry['bytes']} de {bytes_banco} bytes)")
+        return entry
+
+    def extract(self, source: str, target_path: str) -> str:
+        """Descomprime um backup (entrada do catálogo ou caminho) para `target_path`"""
+        with open(target_path, "wb") as dst, \
+                _open_compressed(source, "rb", _compression_of(source)) as src:
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        return target_path
+
+    @contextmanager
+    def uncompressed(self, path: str):
+        """Fornece um caminho .db legível pelo SQLite para o backup (descomprimido se preciso)"""
+        if _compression_of(path) == "none":
+            yield path
+            return
+        plain_path = path + ".restore.tmp"
+        try:
+            yield self.extract(path, plain_path)
+        finally:
+            if os.path.exists(plain_path):
+                os.remove(plain_path)
+
+    def _retained(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Seleciona as entradas mantidas pela política avô-pai-filho"""
+        keep = set()
+        policies = (
+            ("diarios", lambda d: d.date()),
+            ("semanais", lambda d: d.isocalendar()[:2]),
+            ("mensais", lambda d: (d.year, d.month)),
+        )
+        for name, period_of in policies:
+            seen = []
+            for index in range(len(entries) - 1, -1, -1):
+                period = period_of(datetime.fromisoformat(entries[index]["criado_em"]))
+                if period in seen:
+                    continue
+                if len(seen) >= self.retencao[name]:
+                    break
+                seen.append(period)
+                keep.add(index)
+        return [entry for index, entry in enumerate(entries) if index in keep]
+
+    def prune(self) -> List[str]:
+        """Aplica a retenção; apaga arquivos que nenhuma entrada mantida referencia"""
+        with self._lock:
+            entries = self._load()
+            retained = self._retained(entries)
+            if len(retained) == len(entries):
+                return []
+
+            referenced = {entry["arquivo"] for entry in retained}
+            removed = sorted({entry["arquivo"] for entry in entries} - referenced)
+            self._entries = retained
+            self._save()
+
+        for filename in removed:
+            path = os.path.join(self.directory, filename)
+            if os.path.exists(path):
+                os.remove(path)
+                logger.info(f"Backup antigo removido: {filename}")
+        return removed
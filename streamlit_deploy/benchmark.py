@@ -0,0 +1,1179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks de desempenho do LocAuto
+Uso: python benchmark.py [nome_do_benchmark ...] [--escala pequena|media|grande] [--json resultados.json]
+"""
+
+import os
+import sys
+import sqlite3
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+BENCHMARKS = {}
+
+
+def benchmark(nome):
+    """Registra uma função de benchmark pelo nome"""
+    def decorator(func):
+        BENCHMARKS[nome] = func
+        return func
+    return decorator
+
+
+@contextmanager
+def diretorio_temporario():
+    """Executa o benchmark em um diretório temporário (banco, CSVs e backups isolados)"""
+    anterior = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="locauto_bench_") as tmp:
+        os.chdir(tmp)
+        try:
+            yield tmp
+        finally:
+            os.chdir(anterior)
+
+
+def popular(db, clientes=200, veiculos=50, faturas=1000):
+    """Preenche o banco com dados simples para os benchmarks"""
+    import random
+    from datetime import date, timedelta
+
+    rnd = random.Random(42)
+    with db.pool.connection() as conn:
+        conn.executemany(
+            "INSERT INTO clientes (nome, cpf_cnpj, cidade, uf) VALUES (?, ?, 'PASSOS', 'MG')",
+            [(f"Cliente {i}", f"{i:011d}") for i in range(clientes)]
+        )
+        conn.executemany(
+            "INSERT INTO veiculos (modelo, placa, ano, cor, valor_diaria) VALUES (?, ?, 2020, 'BRANCO', 80)",
+            [(f"Modelo {i % 12}", f"BEN{i:04d}") for i in range(veiculos)]
+        )
+        linhas = []
+        inicio = date(2020, 1, 1)
+        for i in range(faturas):
+            emissao = inicio + timedelta(days=rnd.randrange(5 * 365))
+            linhas.append((f"{i + 1:06d}", rnd.randrange(1, clientes + 1), rnd.randrange(1, veiculos + 1),
+                           emissao.isoformat(), (emissao + timedelta(days=29)).isoformat(), 30, 80.0,
+                           rnd.choice([1800.0, 2400.0, 3000.0]), f"{emissao.isoformat()} 10:00:00"))
+        conn.executemany(
+            """INSERT INTO faturas (numero_fatura, cliente_id, veiculo_id, data_inicio, data_fim,
+                                   dias, valor_diaria, valor_total, data_emissao)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""", linhas
+        )
+        conn.executemany(
+            """INSERT INTO transacoes (fatura_id, tipo, descricao, valor, data_transacao, categoria)
+               VALUES (?, 'receita', 'Locação', ?, ?, 'Locação')""",
+            [(i + 1, linha[7], linha[3]) for i, linha in enumerate(linhas)]
+        )
+    db.invalidate_cache()
+
+
+@contextmanager
+def banco_sintetico(escala="media", **parametros):
+    """Banco temporário preenchido pelo gerador de dados sintéticos (mesma semente em toda execução)"""
+    from database_manager import DatabaseManager
+    from gerador_dados import ESCALAS, gerar_dados
+
+    with diretorio_temporario():
+        db = DatabaseManager("bench.db")
+        try:
+            contagens = gerar_dados(db, **{**ESCALAS[escala], **parametros})
+            yield db, contagens
+        finally:
+            db.close()
+
+
+def medir(func, repeticoes=1000):
+    """Executa a função várias vezes e retorna estatísticas de latência em microssegundos"""
+    amostras = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        func()
+        amostras.append((time.perf_counter() - inicio) * 1e6)
+    amostras.sort()
+    return {
+        "repeticoes": repeticoes,
+        "media_us": statistics.fmean(amostras),
+        "p50_us": amostras[len(amostras) // 2],
+        "p95_us": amostras[int(len(amostras) * 0.95) - 1],
+    }
+
+
+@benchmark("conexoes")
+def bench_conexoes(repeticoes=2000):
+    """Compara a latência por query: conexão nova a cada chamada x pool de conexões"""
+    from database_manager import DatabaseManager
+
+    with diretorio_temporario():
+        db = DatabaseManager("bench.db")
+        for i in range(200):
+            db.add_cliente(f"Cliente {i}", f"{i:011d}", cidade="PASSOS", uf="MG")
+
+        query = "SELECT * FROM clientes WHERE id = ?"
+
+        def conexao_por_chamada():
+            # Caminho antigo: sqlite3.connect a cada execute_query
+            with sqlite3.connect(db.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, (42,))
+                cursor.fetchone()
+
+        def pool():
+            db.execute_query(query, (42,), fetch_one=True)
+
+        resultados = {
+            "conexao_por_chamada": medir(conexao_por_chamada, repeticoes),
+            "pool": medir(pool, repeticoes),
+        }
+        resultados["aceleracao_p50"] = (resultados["conexao_por_chamada"]["p50_us"]
+                                        / resultados["pool"]["p50_us"])
+        db.close()
+        return resultados
+
+
+@benchmark("planos")
+def bench_planos():
+    """Mostra os planos de execução das consultas principais (sem varreduras nem B-trees temporárias)"""
+    from database_manager import DatabaseManager
+
+    consultas = {
+        "get_clientes": "SELECT * FROM clientes WHERE ativo = 1 ORDER BY nome",
+        "get_veiculos": "SELECT * FROM veiculos WHERE ativo = 1 ORDER BY modelo",
+        "get_faturas": """
+            SELECT f.*, c.nome as cliente_nome, v.modelo as veiculo_modelo, v.placa as veiculo_placa
+            FROM faturas f
+            JOIN clientes c ON f.cliente_id = c.id
+            JOIN veiculos v ON f.veiculo_id = v.id
+            ORDER BY f.data_emissao DESC, f.id DESC
+        """,
+        "get_faturas_pagina": """
+            SELECT f.*, c.nome as cliente_nome
+            FROM faturas f
+            JOIN clientes c ON f.cliente_id = c.id
+            WHERE f.data_emissao >= '2025-01-01' AND (f.data_emissao, f.id) < ('2025-06-01', 10)
+            ORDER BY f.data_emissao DESC, f.id DESC
+            LIMIT 50
+        """,
+        "get_transacoes": "SELECT * FROM transacoes ORDER BY data_transacao DESC, id DESC",
+        "receitas_por_tipo": "SELECT SUM(valor) FROM transacoes WHERE tipo = 'receita' AND data_transacao >= '2025-01-01'",
+        "veiculos_disponiveis": """
+            SELECT v.* FROM veiculos v
+            WHERE v.ativo = 1 AND NOT EXISTS (
+                SELECT 1 FROM faturas f WHERE f.veiculo_id = v.id
+                AND f.data_fim >= '2025-06-01' AND f.data_inicio <= '2025-06-30'
+                AND IFNULL(f.status, 'ativa') <> 'cancelada')
+            ORDER BY v.modelo
+        """,
+    }
+
+    with diretorio_temporario():
+        db = DatabaseManager("bench.db")
+        resultados = {}
+        for nome, query in consultas.items():
+            plano = [linha[3] for linha in db.execute_query(f"EXPLAIN QUERY PLAN {query}", fetch_all=True)]
+            resultados[nome] = {
+                "plano": " | ".join(plano),
+                "sem_ordenacao_temporaria": not any("TEMP B-TREE" in passo for passo in plano),
+            }
+        db.close()
+        return resultados
+
+
+@benchmark("dashboard")
+def bench_dashboard(escalas=(100, 50000), repeticoes=20):
+    """Compara o Dashboard carregando tudo em pandas x API de agregação no SQLite"""
+    import pandas as pd
+    from database_manager import DatabaseManager
+
+    resultados = {}
+    for n_faturas in escalas:
+        with diretorio_temporario():
+            db = DatabaseManager("bench.db")
+            popular(db, faturas=n_faturas)
+
+            def pandas_completo():
+                clientes_df = db.get_clientes()
+                veiculos_df = db.get_veiculos()
+                faturas_df = db.get_faturas()
+                db.get_transacoes()
+                len(clientes_df), len(veiculos_df), faturas_df['valor_total'].sum()
+                faturas_df['mes'] = pd.to_datetime(faturas_df['data_emissao']).dt.to_period('M')
+                faturas_df.groupby('mes')['valor_total'].sum()
+                faturas_df.groupby('veiculo_modelo').size()
+                faturas_df.head(10)
+
+            def agregado_sql():
+                db.get_dashboard_metrics()
+                db.get_receita_mensal()
+                db.get_locacoes_por_modelo()
+                db.get_ultimas_faturas(10)
+
+            resultados[f"{n_faturas}_faturas"] = {
+                "pandas_completo": medir(pandas_completo, repeticoes),
+                "agregado_sql": medir(agregado_sql, repeticoes),
+            }
+            db.close()
+    return resultados
+
+
+@benchmark("cache")
+def bench_cache(repeticoes=200):
+    """Compara leituras repetidas (como em cada rerun do Streamlit) com e sem cache de consultas"""
+    from database_manager import DatabaseManager
+
+    resultados = {}
+    with diretorio_temporario():
+        for nome, tamanho in (("sem_cache", 0), ("com_cache", 256)):
+            db = DatabaseManager("bench.db", cache_size=tamanho)
+            if nome == "sem_cache":
+                popular(db, faturas=5000)
+
+            def rerun():
+                db.get_clientes()
+                db.get_veiculos()
+                db.get_faturas()
+
+            resultados[nome] = medir(rerun, repeticoes)
+            resultados[nome]["estatisticas"] = db.cache_stats()
+            db.close()
+
+        # Chave dos caches do Streamlit: custo por rerun e escrita feita por outro processo
+        db = DatabaseManager("bench.db")
+        resultados["versao_dados"] = medir(db.data_version, repeticoes)
+        antes = db.data_version()
+        externo = sqlite3.connect("bench.db")
+        with externo:
+            externo.execute("UPDATE clientes SET nome = nome || '' WHERE id = 1")
+        externo.close()
+        resultados["escrita_externa_detectada"] = db.data_version() != antes
+        db.close()
+    return resultados
+
+
+@benchmark("emissao")
+def bench_emissao(repeticoes=300):
+    """Compara a emissão de fatura em várias chamadas (fluxo antigo) x issue_invoice em uma transação"""
+    import itertools
+    from datetime import date, datetime, timedelta
+    from database_manager import DatabaseManager
+
+    with diretorio_temporario():
+        db = DatabaseManager("bench.db", pragmas={"synchronous": "FULL"})
+        popular(db, faturas=0)
+        contador = iter(range(100000, 10 ** 9))
+        # Os dois fluxos locam o mesmo veículo: períodos seguidos, sem sobreposição
+        periodos = ((inicio.isoformat(), (inicio + timedelta(days=29)).isoformat())
+                    for inicio in (date(2025, 1, 1) + timedelta(days=30 * i) for i in itertools.count()))
+
+        def fluxo_antigo():
+            numero = str(next(contador))
+            db.execute_query("SELECT id FROM faturas WHERE numero_fatura = ?", (numero,), fetch_one=True)
+            veiculo = db.get_veiculo_by_id(1)
+            fatura_id = db.add_fatura(numero, 1, 1, *next(periodos), 30, 80.0, 2400.0,
+                                      data_emissao="2025-01-01 10:00:00")
+            ultimo = db.execute_query("SELECT valor FROM configuracoes WHERE chave = 'ultimo_numero_fatura'",
+                                      fetch_one=True)
+            if int(numero) > int(ultimo[0]):
+                db.execute_query("UPDATE configuracoes SET valor = ? WHERE chave = 'ultimo_numero_fatura'",
+                                 (numero,))
+            db.add_transacao("receita", f"Locação Mensal - {veiculo['modelo']}", 2400.0,
+                             datetime.now().strftime('%Y-%m-%d'), "Locação", fatura_id)
+            db.get_cliente_by_id(1)
+
+        def issue_invoice():
+            db.issue_invoice(str(next(contador)), 1, 1, *next(periodos), 30, 80.0, 2400.0,
+                             data_emissao="2025-01-01 10:00:00")
+
+        resultados = {
+            "fluxo_antigo": medir(fluxo_antigo, repeticoes),
+            "issue_invoice": medir(issue_invoice, repeticoes),
+        }
+        db.close()
+        return resultados
+
+
+def _emitir_concorrente(args):
+    """Processo de trabalho do benchmark de alocação: threads emitindo faturas e reservando blocos"""
+    import threading
+    from datetime import date, timedelta
+    from database_manager import DatabaseManager
+
+    caminho, processo, threads, emissoes = args
+    db = DatabaseManager(caminho)
+    numeros, erros = [], []
+
+    def trabalhar(thread):
+        for i in range(emissoes):
+            try:
+                if i % 10 == 0:
+                    bloco = db.reserve_invoice_numbers(5)
+                    numeros.extend(bloco[:3])
+                    db.release_invoice_numbers(bloco[3:])
+                else:
+                    # Diária em um dia só desta emissão: o veículo 1 nunca fica sobreposto
+                    dia = (date(2025, 1, 1) + timedelta(days=(processo * threads + thread) * emissoes + i)).isoformat()
+                    emissao = db.issue_invoice(None, 1, 1, dia, dia, 1, 80.0, 80.0)
+                    numeros.append(emissao['fatura']['numero_fatura'])
+            except Exception as e:
+                erros.append(str(e))
+
+    workers = [threading.Thread(target=trabalhar, args=(thread,)) for thread in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    db.close()
+    return numeros, erros
+
+
+@benchmark("alocacao")
+def bench_alocacao(processos=4, threads=4, emissoes=50):
+    """Emissões e reservas concorrentes (processos x threads): nenhum número pode se repetir"""
+    from concurrent.futures import ProcessPoolExecutor
+    from database_manager import DatabaseManager
+
+    with diretorio_temporario() as tmp:
+        caminho = os.path.join(tmp, "bench.db")
+        db = DatabaseManager(caminho)
+        popular(db, faturas=0)
+        db.close()
+
+        inicio = time.perf_counter()
+        with ProcessPoolExecutor(processos) as executor:
+            partes = list(executor.map(_emitir_concorrente,
+                                       [(caminho, processo, threads, emissoes) for processo in range(processos)]))
+        duracao = time.perf_counter() - inicio
+
+        numeros = [numero for parte, _ in partes for numero in parte]
+        erros = [erro for _, parte in partes for erro in parte]
+        db = DatabaseManager(caminho)
+        faturas = db.execute_query("SELECT COUNT(*) FROM faturas", fetch_one=True)[0]
+        livres = db.execute_query("SELECT COUNT(*) FROM numeros_fatura_livres", fetch_one=True)[0]
+        db.close()
+        return {
+            "operacoes": processos * threads * emissoes,
+            "duracao_s": duracao,
+            "operacoes_por_s": processos * threads * emissoes / duracao,
+            "numeros_usados": len(numeros),
+            "numeros_repetidos": len(numeros) - len(set(numeros)),
+            "faturas_gravadas": faturas,
+            "numeros_no_estoque": livres,
+            "erros": len(erros),
+        }
+
+
+@benchmark("backup")
+def bench_backup(faturas=30000):
+    """Backup online com escritas concorrentes: duração, passos e maior espera de um escritor"""
+    import threading
+    from database_manager import DatabaseManager
+
+    with diretorio_temporario():
+        db = DatabaseManager("bench.db")
+        popular(db, faturas=faturas)
+
+        parar = threading.Event()
+        latencias = []
+
+        def escritor():
+            while not parar.is_set():
+                inicio = time.perf_counter()
+                db.add_transacao("despesa", "Combustível", 100.0, "2025-01-01", "Frota")
+                latencias.append((time.perf_counter() - inicio) * 1000)
+
+        def copiado(paginas, total):
+            # Mede só a cópia online; a compressão não trava o banco
+            if paginas >= total:
+                parar.set()
+
+        thread = threading.Thread(target=escritor)
+        thread.start()
+        caminho = db.backup_database(progress=copiado)
+        parar.set()
+        thread.join()
+
+        resultados = {
+            "backup": dict(db.last_backup),
+            "backup_integro": db.verify_backup(caminho),
+            "escritas_durante_backup": len(latencias),
+            "maior_espera_escrita_ms": max(latencias) if latencias else 0.0,
+        }
+        # Sem escritas desde o último backup: nenhum arquivo novo é gravado
+        db.backup_database()
+        db.backup_database()
+        resultados["backup_sem_alteracoes"] = dict(db.last_backup)
+        db.restore_database(caminho)
+        resultados["restauracao"] = dict(db.last_restore)
+        db.close()
+        return resultados
+
+
+@benchmark("inicializacao")
+def bench_inicializacao(repeticoes=50, faturas=30000):
+    """Partida a frio do DatabaseManager em banco atualizado e verificação de banco vazio"""
+    from database_manager import DatabaseManager
+
+    with diretorio_temporario():
+        db = DatabaseManager("bench.db")
+        popular(db, faturas=faturas)
+        db.close()
+
+        def partida():
+            DatabaseManager("bench.db").close()
+
+        db = DatabaseManager("bench.db")
+
+        def vazio_dataframe():
+            # Caminho antigo: carregava a tabela inteira só para testar se estava vazia
+            db.invalidate_cache()
+            db.get_dataframe("SELECT * FROM faturas").empty
+
+        def vazio_exists():
+            db.invalidate_cache()
+            db.has_rows("faturas")
+
+        resultados = {
+            "partida_banco_atualizado": medir(partida, repeticoes),
+            "vazio_dataframe": medir(vazio_dataframe, repeticoes),
+            "vazio_exists": medir(vazio_exists, repeticoes),
+        }
+        db.close()
+        return resultados
+
+
+def dados_legados(linhas, inicio=0):
+    """DataFrames no formato dos dados legados (moeda como texto, espaços sobrando)"""
+    import pandas as pd
+
+    indices = range(inicio, inicio + linhas)
+    clientes = pd.DataFrame({
+        "nome": [f" Cliente {i} " for i in indices],
+        "cpf_cnpj": [f"{i:011d}" for i in indices],
+        "telefone": ["35999990000"] * linhas,
+        "cidade": ["PASSOS "] * linhas,
+        "uf": ["MG"] * linhas,
+        "data_cadastro": ["2025-08-19 11:48:41"] * linhas,
+        "ativo": [1] * linhas,
+    })
+    veiculos = pd.DataFrame({
+        "modelo": [f"Modelo {i % 12} " for i in indices],
+        "placa": [f"LEG{i:06d}" for i in indices],
+        "ano": [2020] * linhas,
+        "cor": ["BRANCO "] * linhas,
+        "valor_diaria": ["R$ 80,00"] * linhas,
+        "disponivel": [1] * linhas,
+        "ativo": [1] * linhas,
+    })
+    return clientes, veiculos
+
+
+@benchmark("importacao_massa")
+def bench_importacao_massa(linhas=100000, linhas_por_linha=5000):
+    """Importação de dados legados: iterrows + SELECT/INSERT por linha x importação em massa"""
+    import pandas as pd
+    from database_manager import DatabaseManager
+
+    with diretorio_temporario():
+        db = DatabaseManager("bench.db")
+
+        # Caminho antigo (import_backup): limpeza escalar, SELECT de duplicidade e INSERT por linha.
+        # Medido em uma amostra menor e extrapolado por linha.
+        clientes, _ = dados_legados(linhas_por_linha, inicio=linhas)
+        inicio = time.perf_counter()
+        with sqlite3.connect("bench.db") as conn:
+            cursor = conn.cursor()
+            for _, row in clientes.iterrows():
+                nome = str(row["nome"]).strip() if pd.notna(row["nome"]) else ""
+                cpf_cnpj = str(row["cpf_cnpj"]).strip()
+                cursor.execute("SELECT id FROM clientes WHERE cpf_cnpj = ?", (cpf_cnpj,))
+                if cursor.fetchone():
+                    continue
+                cursor.execute("INSERT INTO clientes (nome, cpf_cnpj, cidade, uf) VALUES (?, ?, ?, ?)",
+                               (nome, cpf_cnpj, str(row["cidade"]).strip(), str(row["uf"]).strip()))
+        por_linha = (time.perf_counter() - inicio) / linhas_por_linha
+
+        clientes, veiculos = dados_legados(linhas)
+        inicio = time.perf_counter()
+        resultado = db.import_data({"clientes": clientes, "veiculos": veiculos})
+        em_massa = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        repetida = db.import_data({"clientes": clientes, "veiculos": veiculos})
+        reimportacao = time.perf_counter() - inicio
+        db.close()
+
+    total = 2 * linhas
+    return {
+        "linhas": total,
+        "por_linha_estimado_s": por_linha * total,
+        "em_massa_s": em_massa,
+        "em_massa_linhas_por_s": total / em_massa,
+        "gravadas": resultado["clientes"]["gravadas"] + resultado["veiculos"]["gravadas"],
+        "reimportacao_s": reimportacao,
+        "reimportacao_ignoradas": repetida["clientes"]["ignoradas"] + repetida["veiculos"]["ignoradas"],
+    }
+
+
+@benchmark("migracao_csv")
+def bench_migracao_csv(linhas=300000, tamanho_bloco=10000):
+    """Migração de CSV grande em blocos: vazão, pico de memória e retomada após interrupção"""
+    import tracemalloc
+    import pandas as pd
+    from database_manager import DatabaseManager
+
+    class Interrompida(Exception):
+        pass
+
+    with diretorio_temporario():
+        pd.DataFrame({
+            "Tipo": ["despesa"] * linhas,
+            "Descrição": [f"Despesa legada {i}" for i in range(linhas)],
+            "Valor": [f"R$ {i % 500},90" for i in range(linhas)],
+            "Data": ["2019-05-01"] * linhas,
+            "Categoria": ["Manutenção"] * linhas,
+        }).to_csv("legado.csv", index=False)
+        db = DatabaseManager("bench.db")
+
+        # Referência: o arquivo inteiro em memória, como no pd.read_csv antigo
+        tracemalloc.start()
+        pd.read_csv("legado.csv")
+        pico_inteiro = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        def interromper(migradas):
+            if migradas >= linhas // 2:
+                raise Interrompida()
+
+        # Primeira metade sob tracemalloc (o rastreamento deixa a gravação bem mais lenta)
+        tracemalloc.start()
+        try:
+            db.migrate_csv_file("transacoes", "legado.csv", tamanho_bloco, progress=interromper)
+        except Interrompida:
+            pass
+        pico_blocos = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        interrompida_em = db.execute_query("SELECT COUNT(*) FROM transacoes", fetch_one=True)[0]
+        retomada = db.migrate_csv_file("transacoes", "legado.csv", tamanho_bloco)
+
+        total = db.execute_query("SELECT COUNT(*) FROM transacoes", fetch_one=True)[0]
+        db.close()
+
+    return {
+        "linhas": linhas,
+        "pico_arquivo_inteiro_mb": pico_inteiro / 2**20,
+        "pico_em_blocos_mb": pico_blocos / 2**20,
+        "interrompida_em": interrompida_em,
+        "retomada": retomada,
+        "linhas_no_banco": total,
+    }
+
+
+@benchmark("mesclagem")
+def bench_mesclagem(faturas=50000):
+    """Mesclagem de um backup (ATTACH + INSERT ... SELECT) em um banco com dados sobrepostos"""
+    from database_manager import DatabaseManager
+
+    with diretorio_temporario():
+        origem = DatabaseManager("origem.db")
+        popular(origem, clientes=2000, veiculos=300, faturas=faturas)
+        caminho = origem.backup_database("origem_backup.db")
+        origem.close()
+
+        db = DatabaseManager("bench.db")
+        popular(db, clientes=500, veiculos=100, faturas=faturas // 5)
+
+        inicio = time.perf_counter()
+        resultado = db.merge_from_backup(caminho)
+        primeira = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        db.merge_from_backup(caminho)
+        repetida = time.perf_counter() - inicio
+        db.close()
+
+    return {"mesclagem_s": primeira, "mesclagem_repetida_s": repetida, **resultado}
+
+
+@benchmark("busca")
+def bench_busca(clientes=50000, repeticoes=200):
+    """Seletor de clientes: lista completa via iterrows x busca FTS5 com os melhores resultados"""
+    from database_manager import DatabaseManager
+
+    with diretorio_temporario():
+        db = DatabaseManager("bench.db")
+        popular(db, clientes=clientes, veiculos=500, faturas=100)
+
+        def lista_completa():
+            # Caminho antigo da Nova Fatura: todas as opções montadas a cada execução
+            db.invalidate_cache()
+            df = db.get_clientes()
+            {f"{row['nome']} - {row['cpf_cnpj']}": row['id'] for _, row in df.iterrows()}
+
+        termos = [f"{i * 7919 % clientes:011d}"[-6:] for i in range(repeticoes)]
+        termos_iter = iter(termos * 2)
+
+        def busca():
+            db.invalidate_cache()
+            db.search_clientes(next(termos_iter), limit=50)
+
+        resultados = {
+            "lista_completa": medir(lista_completa, 5),
+            "busca_documento": medir(busca, repeticoes),
+            "busca_nome": medir(lambda: (db.invalidate_cache(), db.search_clientes("Cliente 4242", 50)), 50),
+        }
+        db.close()
+        return resultados
+
+
+@benchmark("disponibilidade")
+def bench_disponibilidade(veiculos=10000, locacoes=1000000, repeticoes=200):
+    """Frota com histórico de locações: verificação de sobreposição e veículos livres no período"""
+    import random
+    from datetime import date, timedelta
+    from database_manager import DatabaseManager, VeiculoIndisponivelError
+
+    rnd = random.Random(42)
+    hoje = date.today()
+    with diretorio_temporario():
+        db = DatabaseManager("bench.db")
+        inicio = time.perf_counter()
+        with db.pool.connection() as conn:
+            conn.executemany(
+                "INSERT INTO clientes (nome, cpf_cnpj) VALUES (?, ?)",
+                [(f"Cliente {i}", f"{i:011d}") for i in range(1000)]
+            )
+            conn.executemany(
+                "INSERT INTO veiculos (modelo, placa, ano, cor, valor_diaria) VALUES (?, ?, 2020, 'BRANCO', 80)",
+                [(f"Modelo {i % 40}", f"DSP{i:05d}") for i in range(veiculos)]
+            )
+            # Locações consecutivas e sem sobreposição por veículo, terminando perto de hoje
+            linhas = []
+            por_veiculo = locacoes // veiculos
+            for veiculo_id in range(1, veiculos + 1):
+                dia = hoje - timedelta(days=por_veiculo * 19 - rnd.randrange(60))
+                for _ in range(por_veiculo):
+                    dias = rnd.randrange(3, 31)
+                    fim = dia + timedelta(days=dias - 1)
+                    linhas.append((f"{len(linhas) + 1:07d}", rnd.randrange(1, 1001), veiculo_id,
+                                   dia.isoformat(), fim.isoformat(), dias, 80.0, dias * 80.0, dia.isoformat()))
+                    dia = fim + timedelta(days=1 + rnd.randrange(6))
+            conn.executemany(
+                """INSERT INTO faturas (numero_fatura, cliente_id, veiculo_id, data_inicio, data_fim,
+                                       dias, valor_diaria, valor_total, data_emissao)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""", linhas
+            )
+            conn.execute("ANALYZE")
+        db.invalidate_cache()
+        populacao = time.perf_counter() - inicio
+
+        def livres_indice_antigo(data_inicio, data_fim):
+            with db.pool.connection() as conn:
+                return conn.execute("""
+                    SELECT v.* FROM veiculos v WHERE v.ativo = 1 AND NOT EXISTS (
+                        SELECT 1 FROM faturas f INDEXED BY idx_faturas_veiculo WHERE f.veiculo_id = v.id
+                        AND f.data_inicio <= ? AND f.data_fim >= ? AND IFNULL(f.status, 'ativa') <> 'cancelada')
+                    ORDER BY v.modelo
+                """, (data_fim, data_inicio)).fetchall()
+
+        def livres(data_inicio, data_fim):
+            db.invalidate_cache()
+            return db.get_veiculos_disponiveis(data_inicio, data_fim)
+
+        janelas = {
+            "proximos_30_dias": (hoje.isoformat(), (hoje + timedelta(days=29)).isoformat()),
+            "ha_3_anos": ((hoje - timedelta(days=3 * 365)).isoformat(), (hoje - timedelta(days=3 * 365 - 29)).isoformat()),
+        }
+        consultas = iter([(rnd.randrange(1, veiculos + 1), hoje + timedelta(days=rnd.randrange(60)))
+                          for _ in range(repeticoes)])
+
+        def verificar():
+            veiculo_id, dia = next(consultas)
+            db.invalidate_cache()
+            db.is_veiculo_disponivel(veiculo_id, dia, dia + timedelta(days=6))
+
+        resultados = {"populacao_s": populacao, "verificacao": medir(verificar, repeticoes)}
+        for nome, (data_inicio, data_fim) in janelas.items():
+            resultados[nome] = {
+                "livres": len(livres(data_inicio, data_fim)),
+                "indice_periodo": medir(lambda: livres(data_inicio, data_fim), 5),
+            }
+
+        # Índice anterior (veiculo_id, data_inicio, data_fim), criado só para a comparação
+        with db.pool.connection() as conn:
+            conn.execute("CREATE INDEX idx_faturas_veiculo ON faturas (veiculo_id, data_inicio, data_fim)")
+        for nome, (data_inicio, data_fim) in janelas.items():
+            resultados[nome]["indice_antigo"] = medir(lambda: livres_indice_antigo(data_inicio, data_fim), 5)
+        with db.pool.connection() as conn:
+            conn.execute("DROP INDEX idx_faturas_veiculo")
+
+        # Disponibilidade do dia (virada de data) recalculada para toda a frota
+        inicio = time.perf_counter()
+        db.refresh_disponibilidade((hoje + timedelta(days=1)).isoformat())
+        resultados["refresh_disponibilidade_s"] = time.perf_counter() - inicio
+        db.refresh_disponibilidade()
+        resultados["ocupados_hoje"] = db.execute_query(
+            "SELECT COUNT(*) FROM veiculos WHERE disponivel = 0", fetch_one=True)[0]
+
+        # Uma locação sobreposta à última do veículo deve ser recusada
+        veiculo_id, data_fim = linhas[-1][2], linhas[-1][4]
+        try:
+            db.issue_invoice(None, 1, veiculo_id, data_fim, data_fim, 1, 80.0, 80.0)
+            resultados["sobreposicao_recusada"] = False
+        except VeiculoIndisponivelError:
+            resultados["sobreposicao_recusada"] = True
+        db.close()
+    return resultados
+
+
+@benchmark("utilizacao")
+def bench_utilizacao(veiculos=10000, locacoes_por_veiculo=100, anos=5, amostra=20000):
+    """Matriz de utilização veículo x mês: cálculo vetorizado x laço por fatura e dia"""
+    import numpy as np
+    import pandas as pd
+    from datetime import date, timedelta
+    from analytics import utilizacao_frota
+    from database_manager import DatabaseManager
+
+    # Locações consecutivas por veículo (3 a 30 dias, 1 a 6 de intervalo) terminando perto de hoje
+    rnd = np.random.default_rng(42)
+    hoje = (date.today() - date(1970, 1, 1)).days
+    duracao = rnd.integers(3, 31, (veiculos, locacoes_por_veiculo))
+    passo = duracao + rnd.integers(1, 7, (veiculos, locacoes_por_veiculo))
+    inicio = (hoje - passo.sum(axis=1) + rnd.integers(0, 60, veiculos))[:, None] + np.cumsum(passo, axis=1) - passo
+    locacoes = pd.DataFrame({
+        "veiculo_id": np.repeat(np.arange(1, veiculos + 1), locacoes_por_veiculo),
+        "inicio": inicio.ravel(),
+        "fim": (inicio + duracao - 1).ravel(),
+        "valor_total": (duracao * 80.0).ravel(),
+    })
+    frota = pd.DataFrame({
+        "id": np.arange(1, veiculos + 1), "modelo": "Modelo", "placa": "PLACA",
+        "data_cadastro": (date.today() - timedelta(days=anos * 365 + 400)).isoformat(),
+    })
+    periodo = (date.today() - timedelta(days=anos * 365), date.today())
+
+    def laco_por_fatura(linhas):
+        # Referência ingênua: cada fatura expandida dia a dia em um dicionário (veículo, mês)
+        dias = {}
+        for fatura in linhas.itertuples():
+            for dia in range(max(fatura.inicio, hoje - anos * 365), min(fatura.fim, hoje) + 1):
+                chave = (fatura.veiculo_id, str(np.datetime64(dia, "D"))[:7])
+                dias[chave] = dias.get(chave, 0) + 1
+        return dias
+
+    resultados = {
+        "locacoes": len(locacoes),
+        "vetorizado": medir(lambda: utilizacao_frota(locacoes, frota, *periodo), 5),
+    }
+    inicio_laco = time.perf_counter()
+    laco_por_fatura(locacoes.head(amostra))
+    resultados["laco_por_fatura_estimado_s"] = (time.perf_counter() - inicio_laco) * len(locacoes) / amostra
+
+    # Leitura dos períodos no banco (dias como inteiros calculados pelo SQLite)
+    with diretorio_temporario():
+        db = DatabaseManager("bench.db")
+        popular(db, clientes=1000, veiculos=500, faturas=100000)
+        inicio_carga = time.perf_counter()
+        db.get_periodos_locacao("2020-01-01", date.today())
+        resultados["carga_100k_faturas_s"] = time.perf_counter() - inicio_carga
+        db.close()
+
+    matriz = utilizacao_frota(locacoes, frota, *periodo)["taxa"]
+    resultados["matriz"] = f"{matriz.shape[0]} veículos x {matriz.shape[1]} meses"
+    return resultados
+
+
+@benchmark("formatacao")
+def bench_formatacao(linhas=200000, repeticoes=3):
+    """Formatação de colunas (moeda, CPF/CNPJ, telefone): .apply por valor x versões vetorizadas"""
+    import random
+    import pandas as pd
+    import formatters
+
+    # Valores comuns e casos de borda: negativos, meio centavo, -0.0, NaN (nulo lido do banco), infinitos,
+    # documentos com pontuação, tamanhos errados, números e dígitos não ASCII
+    rnd = random.Random(42)
+    bordas_moeda = [0.0, -0.0, -0.001, 0.005, 1.005, 2.675, 999.995, 999999.995, 1234.5, -1234.567,
+                    123456789.125, 99999999999.99, 1e15, float("nan"), float("inf"), float("-inf")]
+    moeda = pd.Series(bordas_moeda + [rnd.choice([rnd.uniform(-1e7, 1e7), round(rnd.uniform(0, 1e5), 3),
+                                                  rnd.randrange(10 ** 9) / 100])
+                                      for _ in range(linhas)], dtype=float)
+    bordas_doc = ["123.456.789-01", "12.345.678/0001-90", "(35) 99876-5432", "35 3521-0000", " 98765432100 ",
+                  "abc", "", "123", "٣٣١٢٣٤٥٦٧٨٩", None, float("nan"), 12345678901, 12345678901.0]
+    documentos = pd.Series(bordas_doc + [str(rnd.randrange(10 ** rnd.choice([9, 10, 11, 13]), 10 ** 14))
+                                         for _ in range(linhas)], dtype=object)
+
+    casos = {
+        "moeda": (moeda, formatters.format_currency, formatters.format_currency_series),
+        "cpf_cnpj": (documentos, formatters.format_cpf_cnpj, formatters.format_cpf_cnpj_series),
+        "telefone": (documentos, formatters.format_phone, formatters.format_phone_series),
+    }
+    resultados = {"linhas": len(moeda)}
+    for nome, (coluna, por_valor, vetorizada) in casos.items():
+        # Equivalência: a saída vetorizada tem de ser idêntica à da função por valor
+        esperado, obtido = coluna.apply(por_valor).tolist(), vetorizada(coluna).tolist()
+        divergencias = [(valor, a, b) for valor, a, b in zip(coluna, esperado, obtido) if a != b]
+
+        apply_ms = medir(lambda: coluna.apply(por_valor), repeticoes)["p50_us"] / 1000
+        vetorizada_ms = medir(lambda: vetorizada(coluna), repeticoes)["p50_us"] / 1000
+        resultados[nome] = {
+            "apply_ms": apply_ms,
+            "vetorizada_ms": vetorizada_ms,
+            "aceleracao": apply_ms / vetorizada_ms,
+            "divergencias": len(divergencias),
+            "exemplos_divergentes": divergencias[:3] or "nenhum",
+        }
+    return resultados
+
+
+@benchmark("crud")
+def bench_crud(escala="media", repeticoes=200):
+    """Cadastros, emissão de fatura e leituras por id do DatabaseManager em banco com dados sintéticos"""
+    import itertools
+    from datetime import date, timedelta
+    from gerador_dados import gerar_cpf, gerar_placa
+
+    with banco_sintetico(escala) as (db, contagens):
+        sequencia = itertools.count(10 ** 6)
+        cliente_id = db.add_cliente("Cliente Benchmark", gerar_cpf(next(sequencia)))
+        veiculo_id = db.add_veiculo("Modelo Benchmark", gerar_placa(next(sequencia)), 2024, "BRANCO", 80.0)
+        # Emissões em sequência para o mesmo veículo, em períodos futuros sem sobreposição
+        periodos = (date.today() + timedelta(days=365 + 30 * i) for i in itertools.count())
+
+        def emitir():
+            inicio = next(periodos)
+            db.issue_invoice(None, cliente_id, veiculo_id, inicio.isoformat(),
+                             (inicio + timedelta(days=29)).isoformat(), 30, 80.0, 2400.0)
+
+        return {
+            "dados": contagens,
+            "add_cliente": medir(lambda: db.add_cliente("Cliente", gerar_cpf(next(sequencia))), repeticoes),
+            "add_veiculo": medir(lambda: db.add_veiculo("Modelo", gerar_placa(next(sequencia)), 2024,
+                                                        "BRANCO", 80.0), repeticoes),
+            "add_transacao": medir(lambda: db.add_transacao("despesa", "Manutenção", 150.0,
+                                                            date.today().isoformat(), "Manutenção"), repeticoes),
+            "issue_invoice": medir(emitir, repeticoes),
+            "get_cliente_by_id": medir(lambda: db.get_cliente_by_id(cliente_id), repeticoes),
+            "get_veiculo_by_id": medir(lambda: db.get_veiculo_by_id(veiculo_id), repeticoes),
+            "search_clientes": medir(lambda: db.search_clientes("silva"), repeticoes),
+        }
+
+
+@benchmark("consultas")
+def bench_consultas(escala="media", repeticoes=20):
+    """Consultas das páginas (Dashboard, Financeiro, Relatórios) sem cache e com cache, em dados sintéticos"""
+    from datetime import date, timedelta
+    from analytics import utilizacao_frota
+
+    hoje = date.today()
+    ano_passado = (hoje - timedelta(days=365)).isoformat()
+
+    def utilizacao():
+        return utilizacao_frota(db.get_periodos_locacao(ano_passado, hoje), db.get_veiculos(), ano_passado, hoje)
+
+    def segunda_pagina(consulta, coluna):
+        pagina = consulta(limit=50)
+        ultima = pagina.iloc[-1]
+        return consulta(limit=50, after=(ultima[coluna], int(ultima["id"])))
+
+    with banco_sintetico(escala) as (db, contagens):
+        consultas = {
+            "dashboard_metrics": db.get_dashboard_metrics,
+            "receita_mensal": db.get_receita_mensal,
+            "locacoes_por_modelo": db.get_locacoes_por_modelo,
+            "ultimas_faturas": db.get_ultimas_faturas,
+            "resumo_transacoes": db.get_resumo_transacoes,
+            "faturas_ultimo_ano": lambda: db.get_faturas(ano_passado, hoje.isoformat()),
+            "faturas_pagina_2": lambda: segunda_pagina(db.get_faturas, "data_emissao"),
+            "transacoes_pagina_2": lambda: segunda_pagina(db.get_transacoes, "data_transacao"),
+            "clientes": db.get_clientes,
+            "veiculos": db.get_veiculos,
+            "utilizacao_frota": utilizacao,
+        }
+        resultados = {"dados": contagens}
+        for nome, consulta in consultas.items():
+            # Sem cache: cada execução depois de uma escrita (como na primeira renderização)
+            sem_cache = medir(lambda: (db.invalidate_cache(), consulta()), repeticoes)
+            resultados[nome] = {"sem_cache_ms": sem_cache["p50_us"] / 1000,
+                                "com_cache_ms": medir(consulta, repeticoes)["p50_us"] / 1000}
+        return resultados
+
+
+@benchmark("pdf")
+def bench_pdf(repeticoes=20):
+    """Geração do PDF da fatura (generate_professional_pdf) com os dados devolvidos por issue_invoice"""
+    from invoice_pdf import generate_professional_pdf
+
+    with banco_sintetico("pequena") as (db, _):
+        emitida = db.issue_invoice(None, 1, 1, "2030-01-01", "2030-01-30", 30, 80.0, 2400.0)
+
+    primeira_inicio = time.perf_counter()
+    pdf = generate_professional_pdf(emitida["cliente"], emitida["veiculo"], emitida["fatura"])
+    primeira_ms = (time.perf_counter() - primeira_inicio) * 1000
+    geracao = medir(lambda: generate_professional_pdf(emitida["cliente"], emitida["veiculo"], emitida["fatura"]), repeticoes)
+    return {
+        "primeira_ms": primeira_ms,
+        "geracao_ms": geracao["p50_us"] / 1000,
+        "bytes": len(pdf) if pdf else 0,
+    }
+
+
+@benchmark("pdf_lote")
+def bench_pdf_lote(faturas=48, processos=None):
+    """PDFs de faturas em lote: um processo x pool com um processo por núcleo, em pasta e em ZIP"""
+    import zipfile
+    from invoice_pdf import batch_workers, render_batch
+
+    processos = processos or batch_workers()
+    with banco_sintetico("pequena") as (db, contagens):
+        ids = [row[0] for row in db.execute_query("SELECT id FROM faturas ORDER BY id LIMIT ?", (faturas,), fetch_all=True)]
+        # Uma fatura inexistente: a falha é reportada sem interromper o lote
+        ids.append(10 ** 9)
+        resultados = {"faturas": len(ids), "nucleos": batch_workers()}
+        for nome, trabalhadores in (("um_processo", 1), ("pool", max(processos, 2))):
+            destino = os.path.join(os.getcwd(), f"lote_{nome}.zip")
+            relatorio = render_batch(db, ids, destino, workers=trabalhadores)
+            with zipfile.ZipFile(destino) as arquivo:
+                arquivos_zip = len(arquivo.namelist())
+            resultados[nome] = {
+                "processos": relatorio["processos"],
+                "faturas_por_s": relatorio["faturas_por_s"],
+                "duracao_s": relatorio["duracao_s"],
+                "gerados": relatorio["gerados"],
+                "arquivos_zip": arquivos_zip,
+                "falhas": len(relatorio["falhas"]),
+            }
+        pasta = render_batch(db, ids[:8], os.path.join(os.getcwd(), "lote_pasta"), workers=processos)
+        resultados["pasta"] = {"gerados": pasta["gerados"], "arquivos": len(os.listdir(pasta["destino"]))}
+        return resultados
+
+
+@benchmark("backup_restauracao")
+def bench_backup_restauracao(escala="media"):
+    """Backup no repositório comprimido, verificação e restauração de um banco com dados sintéticos"""
+    with banco_sintetico(escala) as (db, contagens):
+        contar = "SELECT (SELECT COUNT(*) FROM faturas), (SELECT COUNT(*) FROM transacoes)"
+        antes = db.execute_query(contar, fetch_one=True)
+
+        inicio = time.perf_counter()
+        caminho = db.backup_database()
+        backup_s = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        with db.backups.uncompressed(caminho) as copia:
+            integro = db.verify_backup(copia)
+        verificacao_s = time.perf_counter() - inicio
+
+        # Perda de dados simulada, desfeita pela restauração
+        db.execute_query("DELETE FROM transacoes")
+        inicio = time.perf_counter()
+        restaurado = db.restore_database(caminho)
+        restauracao_s = time.perf_counter() - inicio
+        depois = db.execute_query(contar, fetch_one=True)
+
+        return {
+            "dados": contagens,
+            "banco_bytes": db.execute_query("SELECT page_count * page_size FROM pragma_page_count(), "
+                                            "pragma_page_size()", fetch_one=True)[0],
+            "backup_bytes": os.path.getsize(caminho),
+            "backup_s": backup_s,
+            "verificacao_s": verificacao_s,
+            "restauracao_s": restauracao_s,
+            "integro": integro,
+            "restaurado": restaurado and tuple(antes) == tuple(depois),
+        }
+
+
+@benchmark("metricas")
+def bench_metricas(escala="media", repeticoes=2000):
+    """Custo das métricas por consulta (hook do QueryMonitor) e de uma leitura completa (arquivo e HTTP)"""
+    import urllib.request
+    import metrics
+    from database_manager import _registrar_metricas_consulta
+
+    with banco_sintetico(escala) as (db, contagens):
+        # Cache de consultas desligado: toda chamada chega ao SQLite e passa pelo hook
+        capacidade, db.cache.max_entries = db.cache.max_entries, 0
+        db.cache.clear()
+        consulta = lambda: db.execute_query("SELECT id FROM clientes WHERE id = ?", (1,), fetch_one=True)
+        com_metricas = medir(consulta, repeticoes)
+        db.monitor.hooks.remove(_registrar_metricas_consulta)
+        sem_metricas = medir(consulta, repeticoes)
+        db.monitor.hooks.append(_registrar_metricas_consulta)
+        db.cache.max_entries = capacidade
+
+        # Séries de uma sessão típica: consultas das páginas, backup e leitura do cache
+        for nome in ("get_dashboard_metrics", "get_receita_mensal", "get_ultimas_faturas", "get_clientes", "get_veiculos"):
+            getattr(db, nome)()
+        db.backup_database()
+
+        texto = metrics.REGISTRY.expose()
+        leitura = medir(metrics.REGISTRY.expose, 50)
+        servidor = metrics.start_http_server(0)
+        try:
+            url = f"http://127.0.0.1:{servidor.server_address[1]}/metrics"
+            http = medir(lambda: urllib.request.urlopen(url).read(), 50)
+        finally:
+            servidor.shutdown()
+            servidor.server_close()
+
+        return {
+            "dados": contagens,
+            "consulta_com_metricas_us": com_metricas["p50_us"],
+            "consulta_sem_metricas_us": sem_metricas["p50_us"],
+            "hook_us": medir(lambda: _registrar_metricas_consulta("SELECT 1", "get_cliente ← app.py:1 main", 0.001, 1),
+                             repeticoes)["p50_us"],
+            "series": sum(1 for linha in texto.splitlines() if not linha.startswith("#")),
+            "exposicao_bytes": len(texto.encode("utf-8")),
+            "exposicao_ms": leitura["p50_us"] / 1000,
+            "http_ms": http["p50_us"] / 1000,
+        }
+
+
+# Dependências que não devem ser carregadas antes da primeira renderização
+IMPORTACOES_PESADAS = ("pandas", "numpy", "plotly", "xhtml2pdf", "reportlab")
+
+
+def importacoes_de_modulo(arquivo):
+    """Código com as importações de nível de módulo de um script do app"""
+    import ast
+
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), arquivo), encoding="utf-8") as f:
+        arvore = ast.parse(f.read())
+    return "\n".join(ast.unparse(no) for no in arvore.body if isinstance(no, (ast.Import, ast.ImportFrom)))
+
+
+def perfil_importacao(codigo):
+    """Perfil estilo -X importtime do código de importação, executado em um interpretador novo"""
+    import subprocess
+
+    processo = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo],
+                              cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True)
+
+    # Linhas: "import time: self [us] | cumulative | pacote" (recuo indica aninhamento)
+    pacotes, carregados = {}, set()
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith("import time:") or "cumulative" in linha:
+            continue
+        _, acumulado, nome = linha[len("import time:"):].split("|")
+        carregados.add(nome.strip().split(".")[0])
+        if not nome[1:].startswith(" "):
+            raiz = nome.strip().split(".")[0]
+            pacotes[raiz] = pacotes.get(raiz, 0) + int(acumulado)
+
+    maiores = sorted(pacotes.items(), key=lambda item: item[1], reverse=True)[:5]
+    return {
+        "total_ms": sum(pacotes.values()) / 1000,
+        "maiores_ms": {nome: us / 1000 for nome, us in maiores},
+        "pesados": carregados & set(IMPORTACOES_PESADAS),
+    }
+
+
+@benchmark("importacao")
+def bench_importacao():
+    """Custo de importação pago por uma partida a frio antes da primeira renderização"""
+    # Referência: o que o próprio streamlit já carrega (ex.: plotly, quando instalado)
+    base = perfil_importacao("import streamlit")
+    resultados = {"streamlit": base}
+    for arquivo in ("locauto.py", "app_simple.py", "database_manager.py"):
+        resultados[arquivo] = perfil_importacao(importacoes_de_modulo(arquivo))
+        # Regressão: dependência pesada importada no topo de um módulo do app
+        resultados[arquivo]["pesados_alem_do_streamlit"] = resultados[arquivo]["pesados"] - base["pesados"]
+
+    for perfil in resultados.values():
+        for chave in ("pesados", "pesados_alem_do_streamlit"):
+            if chave in perfil:
+                perfil[chave] = ", ".join(sorted(perfil[chave])) or "nenhum"
+    return resultados
+
+
+def imprimir(nome, resultados, nivel=0):
+    """Imprime os resultados de um benchmark de forma legível"""
+    recuo = "   " * nivel
+    print(f"{recuo}{nome}:")
+    for chave, valor in resultados.items():
+        if isinstance(valor, dict):
+            imprimir(chave, valor, nivel + 1)
+        elif isinstance(valor, float):
+            print(f"{recuo}   {chave}: {valor:.2f}")
+        else:
+            print(f"{recuo}   {chave}: {valor}")
+
+
+def metadados():
+    """Ambiente da execução, gravado junto dos resultados para comparar versões"""
+    import platform
+    import subprocess
+    from datetime import datetime
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "plataforma": platform.platform(),
+        "processadores": os.cpu_count(),
+    }
+
+
+def main(argumentos=None):
+    import argparse
+    import inspect
+    import json
+
+    parser = argparse.ArgumentParser(description="Benchmarks de desempenho do LocAuto")
+    parser.add_argument("nomes", nargs="*", help=f"benchmarks a executar (padrão: todos): {', '.join(BENCHMARKS)}")
+    parser.add_argument("--json", metavar="ARQUIVO",
+                        help="grava os resultados em JSON (use - para a saída padrão)")
+    parser.add_argument("--escala", choices=("pequena", "media", "grande"),
+                        help="escala dos dados sintéticos nos benchmarks que os usam")
+    args = parser.parse_args(argumentos)
+
+    selecionados = args.nomes or list(BENCHMARKS)
+    for nome in selecionados:
+        if nome not in BENCHMARKS:
+            print(f"❌ Benchmark desconhecido: {nome} (disponíveis: {', '.join(BENCHMARKS)})")
+            return 1
+
+    relatorio = {**metadados(), "escala": args.escala, "benchmarks": {}}
+    para_stdout = args.json == "-"
+    for nome in selecionados:
+        func = BENCHMARKS[nome]
+        parametros = {}
+        if args.escala and "escala" in inspect.signature(func).parameters:
+            parametros["escala"] = args.escala
+        if not para_stdout:
+            print(f"\n⏱️  {nome}")
+        inicio = time.perf_counter()
+        resultados = func(**parametros)
+        relatorio["benchmarks"][nome] = {"duracao_s": time.perf_counter() - inicio, "resultados": resultados}
+        if not para_stdout:
+            imprimir(nome, resultados)
+
+    if args.json:
+        # Conjuntos, tuplas e outros tipos viram listas ou texto para o JSON
+        texto = json.dumps(relatorio, ensure_ascii=False, indent=2,
+                           default=lambda valor: sorted(valor) if isinstance(valor, (set, frozenset)) else str(valor))
+        if para_stdout:
+            print(texto)
+        else:
+            with open(args.json, "w", encoding="utf-8") as f:
+                f.write(texto)
+            print(f"\n💾 Resultados gravados em {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Importação em massa de clientes, veículos e transações
+Limpeza vetorizada com pandas e gravação com executemany + ON CONFLICT em uma única transação
+"""
+
+import logging
+import sqlite3
+from datetime import datetime
+from typing import Dict, Iterator, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Colunas aceitas por tabela, agrupadas pelo tipo de limpeza, e a chave única usada no ON CONFLICT
+TABELAS = {
+    "clientes": {
+        "chave": "cpf_cnpj",
+        "texto": ["nome", "cpf_cnpj", "telefone", "endereco", "rua", "numero", "complemento",
+                  "bairro", "cidade", "uf", "cep", "email"],
+        "moeda": [],
+        "inteiro": {"ativo": 1},
+        "data": ["data_cadastro"],
+    },
+    "veiculos": {
+        "chave": "placa",
+        "texto": ["modelo", "placa", "cor"],
+        "moeda": ["valor_diaria"],
+        "inteiro": {"ano": 2020, "disponivel": 1, "ativo": 1},
+        "data": ["data_cadastro"],
+    },
+    "transacoes": {
+        "chave": None,
+        "texto": ["tipo", "descricao", "categoria", "data_transacao"],
+        "moeda": ["valor"],
+        "inteiro": {},
+        "data": [],
+    },
+}
+
+# Cabeçalhos dos CSVs exportados pela versão antiga do sistema
+COLUNAS_CSV = {
+    "Nome": "nome", "CPF/CNPJ": "cpf_cnpj", "Telefone": "telefone", "Endereço": "endereco",
+    "Email": "email", "Modelo": "modelo", "Placa": "placa", "Ano": "ano", "Cor": "cor",
+    "Valor Diária": "valor_diaria", "Tipo": "tipo", "Descrição": "descricao", "Valor": "valor",
+    "Data": "data_transacao", "Categoria": "categoria",
+}
+
+
+def clean_currency(values: pd.Series) -> pd.Series:
+    """Remove formatação de moeda e converte para float (vazio ou inválido vira 0.0)"""
+    cleaned = (values.astype("string")
+               .str.replace("R$", "", regex=False)
+               .str.replace(" ", "", regex=False)
+               .str.replace(",", ".", regex=False)
+               .str.replace(r"[^\d.]", "", regex=True))
+    return pd.to_numeric(cleaned, errors="coerce").fillna(0.0).astype(float)
+
+
+def clean_text(values: pd.Series) -> pd.Series:
+    """Remove espaços extras do texto (vazio ou nulo vira '')"""
+    return values.astype("string").str.strip().fillna("").astype(object)
+
+
+def clean_int(values: pd.Series, default: int) -> pd.Series:
+    """Converte para inteiro, usando `default` para vazios ou inválidos"""
+    return pd.to_numeric(values, errors="coerce").fillna(default).astype(int)
+
+
+def preparar(tabela: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Renomeia cabeçalhos antigos, descarta colunas desconhecidas e limpa os valores por coluna"""
+    spec = TABELAS[tabela]
+    df = df.rename(columns=COLUNAS_CSV)
+    agora = datetime.now().isoformat()
+
+    dados = {}
+    for coluna in spec["texto"]:
+        if coluna in df:
+            dados[coluna] = clean_text(df[coluna])
+    for coluna in spec["moeda"]:
+        if coluna in df:
+            dados[coluna] = clean_currency(df[coluna])
+    for coluna, default in spec["inteiro"].items():
+        if coluna in df:
+            dados[coluna] = clean_int(df[coluna], default)
+    for coluna in spec["data"]:
+        if coluna in df:
+            dados[coluna] = df[coluna].astype(object).where(df[coluna].notna(), agora)
+
+    return pd.DataFrame(dados, index=df.index)
+
+
+def importar(conn: sqlite3.Connection, tabela: str, df: pd.DataFrame,
+             atualizar: bool = False) -> Dict[str, int]:
+    """Grava o DataFrame com um único executemany; linhas com chave existente são
+    ignoradas (ou atualizadas, com atualizar=True).
+
+    Não faz commit: quem chama controla a transação.
+    """
+    spec = TABELAS[tabela]
+    df = preparar(tabela, df)
+    if df.empty or not len(df.columns):
+        return {"lidas": len(df), "gravadas": 0, "ignoradas": len(df)}
+
+    colunas = list(df.columns)
+    query = (f"INSERT INTO {tabela} ({', '.join(colunas)}) "
+             f"VALUES ({', '.join('?' for _ in colunas)})")
+    if spec["chave"] and spec["chave"] in colunas:
+        if atualizar:
+            atualizadas = [c for c in colunas if c != spec["chave"]]
+            query += (f" ON CONFLICT({spec['chave']}) DO UPDATE SET "
+                      + ", ".join(f"{c} = excluded.{c}" for c in atualizadas))
+        else:
+            query += f" ON CONFLICT({spec['chave']}) DO NOTHING"
+
+    # Tipos do numpy não são aceitos pelo sqlite3: converte para objetos Python
+    linhas = df.astype(object).where(df.notna(), None).values.tolist()
+    cursor = conn.executemany(query, linhas)
+    gravadas = max(cursor.rowcount, 0)
+    return {"lidas": len(linhas), "gravadas": gravadas, "ignoradas": len(linhas) - gravadas}
+
+
+def importar_tabelas(conn: sqlite3.Connection, dados: Dict[str, Union[pd.DataFrame, str]],
+                     atualizar: bool = False) -> Dict[str, Dict[str, int]]:
+    """Importa várias tabelas (DataFrame ou caminho de CSV), na ordem informada.
+
+    Não faz commit: quem chama controla a transação.
+    """
+    resultado = {}
+    for tabela, origem in dados.items():
+        df = pd.read_csv(origem) if isinstance(origem, str) else origem
+        resultado[tabela] = importar(conn, tabela, df, atualizar)
+        logger.info(f"Importação de {tabela}: {resultado[tabela]['gravadas']} gravadas, "
+                    f"{resultado[tabela]['ignoradas']} ignoradas")
+    return resultado
+
+
+def ler_csv_em_blocos(caminho: str, tamanho_bloco: int, inicio: int = 0) -> Iterator[pd.DataFrame]:
+    """Lê o CSV em blocos de `tamanho_bloco` registros, pulando os `inicio` primeiros registros de dados.
+
+    Os registros pulados são lidos e descartados em blocos, e não pulados por linha física:
+    um campo entre aspas com quebras de linha conta como um registro só, como no checkpoint.
+    Tudo é lido como texto: os tipos não variam de um bloco para outro e CPF/CNPJ,
+    telefone e CEP mantêm zeros à esquerda (a limpeza converte números e moeda).
+    """
+    try:
+        leitor = pd.read_csv(caminho, chunksize=tamanho_bloco, dtype=str)
+    except pd.errors.EmptyDataError:
+        return
+    with leitor:
+        while inicio > 0:
+            try:
+                inicio -= len(leitor.get_chunk(min(inicio, tamanho_bloco)))
+            except StopIteration:
+                return
+        yield from leitor
@@ -1,300 +1,1024 @@
+from __future__ import annotations
+
 import sqlite3
-import pandas as pd
 import os
+import json
 import logging
+import queue
+import re
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Tuple, Callable
+
+from backup_store import BackupStore
+import metrics
+from instrumentation import QueryMonitor
+from migrations import apply_migrations, SCHEMA_VERSION
+
+if TYPE_CHECKING:
+    # pandas é importado sob demanda: a partida não paga seu custo de importação
+    import pandas as pd
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Configuração padrão do pool de conexões (pode ser sobrescrita por variável de ambiente)
+DEFAULT_POOL_SIZE = int(os.environ.get("LOCAUTO_DB_POOL_SIZE", "5"))
+
+# Número máximo de resultados mantidos no cache de consultas (0 desativa o cache)
+DEFAULT_CACHE_SIZE = int(os.environ.get("LOCAUTO_QUERY_CACHE_SIZE", "256"))
+
+# Migração de CSVs legados: linhas lidas e gravadas por transação
+CSV_CHUNK_ROWS = int(os.environ.get("LOCAUTO_CSV_CHUNK_ROWS", "10000"))
+
+# Tabelas mescladas por merge_from_backup, em ordem de dependência
+MERGE_TABLES = ("clientes", "veiculos", "faturas", "transacoes")
+
+# Locação que ocupa o veículo em [data_inicio, data_fim] (datas inclusivas); faturas
+# canceladas liberam o veículo. A faixa data_fim >= ? é lida em idx_faturas_veiculo_periodo
+_OCUPACAO = "f.data_fim >= ? AND f.data_inicio <= ? AND IFNULL(f.status, 'ativa') <> 'cancelada'"
+
+# Fatura b do backup anexado (veículo remapeado em mv) que ocuparia um período já ocupado
+# no banco em uso ou por uma fatura anterior (id menor) do próprio backup
+_CONFLITO_MESCLA = """IFNULL(b.status, 'ativa') <> 'cancelada' AND (
+    EXISTS (SELECT 1 FROM main.faturas f
+            WHERE f.veiculo_id = mv.id AND f.numero_fatura <> b.numero_fatura
+              AND f.data_fim >= b.data_inicio AND f.data_inicio <= b.data_fim
+              AND IFNULL(f.status, 'ativa') <> 'cancelada')
+    OR EXISTS (SELECT 1 FROM backup.faturas f
+               WHERE f.veiculo_id = b.veiculo_id AND f.id < b.id
+                 AND f.data_fim >= b.data_inicio AND f.data_inicio <= b.data_fim
+                 AND IFNULL(f.status, 'ativa') <> 'cancelada'))"""
+
+# Backups online: páginas copiadas por passo e pausa entre passos (segundos)
+BACKUP_STEP_PAGES = 256
+BACKUP_STEP_PAUSE = 0.005
+
+# Métricas do processo (expostas por metrics.py no formato do Prometheus)
+_METRICA_CONSULTAS = metrics.REGISTRY.histogram(
+    "locauto_db_query_duration_seconds", "Duração das consultas ao SQLite por método do DatabaseManager", ("metodo",))
+_METRICA_LINHAS = metrics.REGISTRY.counter(
+    "locauto_db_query_rows_total", "Linhas retornadas pelas consultas por método do DatabaseManager", ("metodo",))
+_METRICA_BACKUP = metrics.REGISTRY.histogram(
+    "locauto_backup_duration_seconds", "Duração dos backups (cópia, compressão e gravação)", ("destino",),
+    metrics.SLOW_BUCKETS_S)
+_METRICA_BACKUP_FALHAS = metrics.REGISTRY.counter("locauto_backup_failures_total", "Backups com erro")
+_METRICA_AUTO_BACKUP = metrics.REGISTRY.counter(
+    "locauto_auto_backup_total", "Execuções do backup automático diário por resultado", ("resultado",))
+
+# PRAGMAs aplicados uma única vez a cada conexão criada pelo pool
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,      # ~16 MB de cache de páginas por conexão
+    "mmap_size": 134217728,    # 128 MB de leitura via mmap
+    "temp_store": "MEMORY",
+}
+
+
+class FaturaDuplicadaError(ValueError):
+    """Número de fatura já utilizado por outra fatura"""
+
+
+class VeiculoIndisponivelError(ValueError):
+    """Veículo já locado em parte do período solicitado"""
+
+    def __init__(self, mensagem: str, conflitos: List[Dict[str, Any]]):
+        super().__init__(mensagem)
+        self.conflitos = conflitos
+
+
+class ConnectionPool:
+    """Pool de conexões SQLite reutilizáveis, seguro entre threads e sessões do Streamlit"""
+    
+    def __init__(self, db_path: str, size: int = DEFAULT_POOL_SIZE,
+                 pragmas: Optional[Dict[str, Any]] = None, timeout: float = 30.0):
+        self.db_path = db_path
+        self.size = max(1, int(size))
+        self.pragmas = {**DEFAULT_PRAGMAS, **(pragmas or {})}
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=self.size)
+        self._created = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Abre uma nova conexão já configurada com os PRAGMAs do pool"""
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+    
+    def _acquire(self) -> sqlite3.Connection:
+        """Obtém uma conexão ociosa, criando uma nova se o pool ainda não estiver cheio"""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Pool de conexões fechado")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+        
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError("Tempo esgotado aguardando conexão livre no pool")
+    
+    def _release(self, conn: sqlite3.Connection):
+        """Devolve a conexão ao pool (ou a fecha, se o pool já foi encerrado)"""
+        if self._closed:
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put_nowait(conn)
+    
+    @contextmanager
+    def connection(self):
+        """Empresta uma conexão do pool; confirma ao sair ou desfaz em caso de erro.
+        
+        Chamadas aninhadas na mesma thread reutilizam a conexão já emprestada,
+        de modo que a transação fica a cargo do bloco mais externo.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+        
+        conn = self._acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self._release(conn)
+    
+    def close(self):
+        """Fecha todas as conexões ociosas do pool"""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+# UPDATE ... RETURNING está disponível a partir do SQLite 3.35
+_SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+_READ_PREFIXES = ("SELECT", "WITH", "EXPLAIN", "PRAGMA")
+# PRAGMA não entra no cache: o resultado não depende de tabelas com geração no cache
+_CACHEABLE_PREFIXES = ("SELECT", "WITH", "EXPLAIN")
+_TABLES_READ_RE = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_]\w*)", re.IGNORECASE)
+_TABLES_WRITTEN_RE = re.compile(
+    r"\b(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+(?!SET\b)([A-Za-z_]\w*)",
+    re.IGNORECASE
+)
+
+
+def _is_read_query(query: str) -> bool:
+    """Indica se a instrução apenas lê dados (WITH ... INSERT/UPDATE/DELETE é escrita)"""
+    return query.lstrip().upper().startswith(_READ_PREFIXES) and not _tables_written(query)
+
+
+def _is_cacheable_query(query: str) -> bool:
+    """Indica se o resultado da instrução pode ficar no cache de consultas"""
+    return _is_read_query(query) and query.lstrip().upper().startswith(_CACHEABLE_PREFIXES)
+
+
+def _tables_read(query: str) -> frozenset:
+    """Tabelas referenciadas em FROM/JOIN de uma consulta"""
+    return frozenset(name.lower() for name in _TABLES_READ_RE.findall(query))
+
+
+def _tables_written(query: str) -> frozenset:
+    """Tabelas alteradas por uma instrução de escrita (vazio se não reconhecida)"""
+    return frozenset(name.lower() for name in _TABLES_WRITTEN_RE.findall(query))
+
+
+def _search_terms(query: str) -> List[str]:
+    """Termos de busca; termos com dígitos (CPF/CNPJ, placa) perdem a pontuação"""
+    termos = []
+    for termo in query.split():
+        if any(c.isdigit() for c in termo):
+            termo = re.sub(r"[.\-/]", "", termo)
+        if termo:
+            termos.append(termo)
+    return termos
+
+
+class QueryCache:
+    """Cache LRU de resultados de consultas, invalidado por contadores de geração por tabela.
+    
+    Cada resultado guarda a geração das tabelas lidas no momento da consulta; uma escrita
+    incrementa a geração da tabela e torna obsoletos apenas os resultados que dependem dela.
+    """
+    
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE):
+        self.max_entries = max(0, int(max_entries))
+        self._entries = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._dependents: Dict[str, frozenset] = {}
+        self._lock = threading.Lock()
+        self._epoch = 0
+        self.data_version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def snapshot(self, tables: frozenset) -> tuple:
+        """Retorna as gerações atuais das tabelas (capturadas antes de executar a consulta)"""
+        with self._lock:
+            return self._current(tables)
+    
+    def _current(self, tables: frozenset) -> tuple:
+        return (self._epoch,) + tuple(self._generations.get(table, 0) for table in sorted(tables))
+    
+    def get(self, key, tables: frozenset):
+        """Retorna (True, valor) se houver resultado válido em cache, senão (False, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                generations, value = entry
+                if generations == self._current(tables):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+    
+    def put(self, key, generations: tuple, value):
+        """Armazena um resultado, descartando os menos usados recentemente se necessário"""
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._entries[key] = (generations, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def set_dependents(self, dependents: Dict[str, frozenset]):
+        """Define tabelas alteradas indiretamente (por triggers) a partir de cada tabela"""
+        with self._lock:
+            self._dependents = dict(dependents)
+    
+    def bump(self, *tables: str):
+        """Incrementa a geração das tabelas alteradas (e das alteradas por seus triggers)"""
+        with self._lock:
+            pending = [table.lower() for table in tables]
+            seen = set()
+            while pending:
+                table = pending.pop()
+                if table in seen:
+                    continue
+                seen.add(table)
+                self._generations[table] = self._generations.get(table, 0) + 1
+                pending.extend(self._dependents.get(table, ()))
+            if seen:
+                self.data_version += 1
+    
+    def clear(self):
+        """Descarta todos os resultados em cache"""
+        with self._lock:
+            self._entries.clear()
+            self._epoch += 1
+            self.data_version += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Estatísticas de uso do cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entradas': len(self._entries),
+                'capacidade': self.max_entries,
+                'acertos': self.hits,
+                'falhas': self.misses,
+                'taxa_acerto': self.hits / total if total else 0.0,
+                'descartes': self.evictions,
+                'versao_dados': self.data_version,
+            }
+
+
+def _registrar_metricas_consulta(consulta: str, local: str, duracao_s: float, linhas: int):
+    """Hook do QueryMonitor: alimenta as métricas de consultas por método do DatabaseManager"""
+    metodo, seta, _ = local.partition(" ← ")
+    if not seta and ":" in local:
+        metodo = "(direto)"  # execute_query/get_dataframe chamados diretamente
+    _METRICA_CONSULTAS.observe(duracao_s, metodo)
+    _METRICA_LINHAS.inc(metodo, valor=linhas)
+
+
 class DatabaseManager:
     """Gerenciador de banco de dados SQLite para o sistema LocAuto"""
     
-    def __init__(self, db_path: str = "locauto.db"):
+    def __init__(self, db_path: str = "locauto.db", pool_size: int = DEFAULT_POOL_SIZE,
+                 pragmas: Optional[Dict[str, Any]] = None, cache_size: int = DEFAULT_CACHE_SIZE,
+                 backup_dir: str = "backups"):
         self.db_path = db_path
+        self.pool = ConnectionPool(db_path, size=pool_size, pragmas=pragmas)
+        self.cache = QueryCache(cache_size)
+        self._local = threading.local()
+        self.last_backup: Optional[Dict[str, Any]] = None
+        self.last_restore: Optional[Dict[str, Any]] = None
+        self.backups = BackupStore(backup_dir)
+        self._maintenance: Optional[threading.Thread] = None
+        self._maintenance_lock = threading.Lock()
+        self._disponibilidade_em: Optional[str] = None
+        self._sentinela: Optional[sqlite3.Connection] = None
+        self._sentinela_lock = threading.Lock()
+        self._versao_arquivo: Optional[int] = None
+        self._versao_cache = 0
+        # Latência e linhas por consulta e local de chamada, com registro de consultas lentas
+        self.monitor = QueryMonitor(internal_modules={__name__},
+                                    plumbing={"execute_query", "get_dataframe", "transaction"})
+        self.monitor.hooks.append(_registrar_metricas_consulta)
+        metrics.REGISTRY.add_collector(self._coletar_metricas)
+        
+        inicio = time.perf_counter()
         self.init_database()
         self.migrate_csv_data()
+        self.startup_s = time.perf_counter() - inicio
+        logger.info(f"Banco de dados pronto em {self.startup_s * 1000:.1f} ms")
+    
+    def close(self):
+        """Fecha as conexões mantidas pelo pool"""
+        with self._sentinela_lock:
+            if self._sentinela is not None:
+                self._sentinela.close()
+                self._sentinela = None
+        self.pool.close()
+        metrics.REGISTRY.remove_collector(self._coletar_metricas)
     
     def init_database(self):
-        """Inicializa o banco de dados e cria as tabelas necessárias"""
+        """Inicializa o banco de dados aplicando as migrações de esquema pendentes"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Tabela de clientes
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS clientes (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        nome TEXT NOT NULL,
-                        cpf_cnpj TEXT UNIQUE NOT NULL,
-                        telefone TEXT,
-                        endereco TEXT,
-                        rua TEXT,
-                        numero TEXT,
-                        complemento TEXT,
-                        bairro TEXT,
-                        cidade TEXT,
-                        uf TEXT,
-                        cep TEXT,
-                        email TEXT,
-                        data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        ativo BOOLEAN DEFAULT 1
-                    )
-                """)
-                
-                # Tabela de veículos
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS veiculos (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        modelo TEXT NOT NULL,
-                        placa TEXT UNIQUE NOT NULL,
-                        ano INTEGER,
-                        cor TEXT,
-                        valor_diaria REAL NOT NULL,
-                        disponivel BOOLEAN DEFAULT 1,
-                        data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        ativo BOOLEAN DEFAULT 1
-                    )
-                """)
-                
-                # Tabela de faturas
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS faturas (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        numero_fatura TEXT UNIQUE NOT NULL,
-                        cliente_id INTEGER NOT NULL,
-                        veiculo_id INTEGER NOT NULL,
-                        data_inicio DATE NOT NULL,
-                        data_fim DATE NOT NULL,
-                        dias INTEGER NOT NULL,
-                        valor_diaria REAL NOT NULL,
-                        valor_total REAL NOT NULL,
-                        observacoes TEXT,
-                        data_emissao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        status TEXT DEFAULT 'ativa',
-                        FOREIGN KEY (cliente_id) REFERENCES clientes (id),
-                        FOREIGN KEY (veiculo_id) REFERENCES veiculos (id)
-                    )
-                """)
-                
-                # Tabela de transações financeiras
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS transacoes (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        fatura_id INTEGER,
-                        tipo TEXT NOT NULL, -- 'receita' ou 'despesa'
-                        descricao TEXT NOT NULL,
-                        valor REAL NOT NULL,
-                        data_transacao DATE NOT NULL,
-                        categoria TEXT,
-                        data_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (fatura_id) REFERENCES faturas (id)
-                    )
-                """)
-                
-                # Tabela de configurações
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS configuracoes (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        chave TEXT UNIQUE NOT NULL,
-                        valor TEXT NOT NULL,
-                        descricao TEXT,
-                        data_atualizacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                
-                # Inserir configuração inicial do número da fatura
-                cursor.execute("""
-                    INSERT OR IGNORE INTO configuracoes (chave, valor, descricao)
-                    VALUES ('ultimo_numero_fatura', '0', 'Último número de fatura gerado')
-                """)
-                
-                # Atualizar estrutura da tabela de clientes se necessário
-                self._update_clientes_table(cursor)
-                
-                conn.commit()
-                logger.info("Banco de dados inicializado com sucesso")
+            with self.pool.connection() as conn:
+                aplicadas = apply_migrations(conn)
+                self._load_trigger_dependents(conn)
+                self._search_indexes = {row[0] for row in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('clientes_busca', 'veiculos_busca')"
+                )}
+            
+            self.cache.clear()
+            if aplicadas:
+                logger.info(f"Esquema atualizado para a versão {SCHEMA_VERSION}")
+            logger.info("Banco de dados inicializado com sucesso")
                 
         except Exception as e:
             logger.error(f"Erro ao inicializar banco de dados: {e}")
             raise
     
-    def _update_clientes_table(self, cursor):
-        """Atualiza a estrutura da tabela de clientes adicionando novos campos de endereço"""
+    def _load_trigger_dependents(self, conn: sqlite3.Connection):
+        """Mapeia, a partir dos triggers do esquema, quais tabelas cada escrita altera indiretamente"""
+        dependents: Dict[str, set] = {}
+        for table, sql in conn.execute("SELECT tbl_name, sql FROM sqlite_master WHERE type = 'trigger'"):
+            body = sql[sql.upper().index("BEGIN"):] if "BEGIN" in sql.upper() else ""
+            dependents.setdefault(table.lower(), set()).update(_tables_written(body))
+        self.cache.set_dependents({table: frozenset(targets) for table, targets in dependents.items()})
+    
+    @contextmanager
+    def transaction(self):
+        """Abre (ou reutiliza, se aninhada) uma transação no pool.
+        
+        As tabelas marcadas com _mark_written têm o cache invalidado somente depois do
+        commit (ou rollback) do bloco mais externo, para que nenhuma leitura concorrente
+        guarde em cache um resultado anterior à escrita.
+        """
+        if getattr(self._local, "written", None) is not None:
+            with self.pool.connection() as conn:
+                yield conn
+            return
+        
+        self._local.written = set()
         try:
-            # Verificar se as colunas já existem
-            cursor.execute("PRAGMA table_info(clientes)")
-            columns = [column[1] for column in cursor.fetchall()]
-            
-            # Adicionar novas colunas se não existirem
-            new_columns = [
-                ('rua', 'TEXT'),
-                ('numero', 'TEXT'),
-                ('complemento', 'TEXT'),
-                ('bairro', 'TEXT'),
-                ('cidade', 'TEXT'),
-                ('uf', 'TEXT'),
-                ('cep', 'TEXT')
+            with self.pool.connection() as conn:
+                yield conn
+        finally:
+            written = self._local.written
+            self._local.written = None
+            if "*" in written:
+                self.cache.clear()
+                written.discard("*")
+            if written:
+                self.cache.bump(*written)
+    
+    def _mark_written(self, *tables: str):
+        """Registra tabelas alteradas na transação corrente ("*" invalida todo o cache)"""
+        written = getattr(self._local, "written", None)
+        if written is None:
+            if "*" in tables:
+                self.cache.clear()
+            self.cache.bump(*(table for table in tables if table != "*"))
+        else:
+            written.update(tables)
+    
+    def _in_transaction(self) -> bool:
+        """Indica se a thread atual está dentro de um bloco transaction()"""
+        return getattr(self._local, "written", None) is not None
+    
+    def invalidate_cache(self, *tables: str):
+        """Invalida o cache de consultas (todas as tabelas se nenhuma for informada).
+        
+        Necessário apenas após escritas feitas por fora do DatabaseManager, como
+        scripts que abrem sua própria conexão com o banco.
+        """
+        if tables:
+            self.cache.bump(*tables)
+        else:
+            self.cache.clear()
+    
+    def data_version(self) -> int:
+        """Versão dos dados: muda a cada escrita confirmada no banco, deste ou de outro processo.
+        
+        Serve de chave para caches fora do DatabaseManager (ex.: st.cache_data). Escritas
+        feitas por este gerenciador já avançam a versão do cache de consultas; as de outros
+        processos (ex.: import_backup.py) são detectadas pelo PRAGMA data_version de uma
+        conexão que nunca escreve, e descartam o cache de consultas.
+        """
+        self._ensure_disponibilidade_do_dia()
+        with self._sentinela_lock:
+            if self._sentinela is None:
+                self._sentinela = sqlite3.connect(self.db_path, check_same_thread=False)
+            versao_arquivo = self._sentinela.execute("PRAGMA data_version").fetchone()[0]
+            if versao_arquivo != self._versao_arquivo:
+                # O arquivo mudou sem nenhuma escrita registrada aqui: veio de outro processo
+                if self._versao_arquivo is not None and self.cache.data_version == self._versao_cache:
+                    logger.info("Banco alterado por outro processo; descartando o cache de consultas")
+                    self.cache.clear()
+                self._versao_arquivo = versao_arquivo
+            self._versao_cache = self.cache.data_version
+            return self._versao_cache
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Estatísticas de acertos/falhas do cache de consultas"""
+        return self.cache.stats()
+
+    def query_stats(self) -> List[Dict[str, Any]]:
+        """Latência (p50/p95/p99) e linhas por consulta e local de chamada, das mais custosas às menos"""
+        return self.monitor.stats()
+
+    def slow_queries(self) -> List[Dict[str, Any]]:
+        """Consultas lentas mais recentes, com o plano de execução"""
+        return self.monitor.slow_queries()
+
+    def _coletar_metricas(self) -> List[metrics.Amostra]:
+        """Métricas calculadas na leitura: cache de consultas, tamanho do banco/WAL e último backup"""
+        banco = {"banco": os.path.basename(self.db_path)}
+        cache = self.cache.stats()
+        arquivos = [({**banco, "arquivo": arquivo}, os.path.getsize(self.db_path + sufixo))
+                    for sufixo, arquivo in (("", "db"), ("-wal", "wal"), ("-shm", "shm"))
+                    if os.path.exists(self.db_path + sufixo)]
+        amostras = [
+            ("locauto_query_cache_hits_total", "counter", "Acertos do cache de consultas", [(banco, cache['acertos'])]),
+            ("locauto_query_cache_misses_total", "counter", "Falhas do cache de consultas", [(banco, cache['falhas'])]),
+            ("locauto_query_cache_evictions_total", "counter", "Resultados descartados do cache de consultas por falta de espaço",
+             [(banco, cache['descartes'])]),
+            ("locauto_query_cache_entries", "gauge", "Resultados guardados no cache de consultas", [(banco, cache['entradas'])]),
+            ("locauto_query_cache_hit_ratio", "gauge", "Fração das consultas atendidas pelo cache", [(banco, cache['taxa_acerto'])]),
+            ("locauto_db_file_bytes", "gauge", "Tamanho em disco do banco, do WAL e do índice do WAL", arquivos),
+        ]
+        if self.last_backup:
+            amostras += [
+                ("locauto_backup_last_success_timestamp_seconds", "gauge", "Horário (epoch) do último backup concluído",
+                 [(banco, self.last_backup['concluido_em'])]),
+                ("locauto_backup_last_bytes", "gauge", "Tamanho em disco do último backup", [(banco, self.last_backup['bytes'])]),
             ]
-            
-            for column_name, column_type in new_columns:
-                if column_name not in columns:
-                    cursor.execute(f"ALTER TABLE clientes ADD COLUMN {column_name} {column_type}")
-                    logger.info(f"Coluna {column_name} adicionada à tabela clientes")
-                    
-        except Exception as e:
-            logger.warning(f"Erro ao atualizar estrutura da tabela clientes: {e}")
+        return amostras
+
+    def _copy_online(self, source: sqlite3.Connection, target: sqlite3.Connection,
+                     pages: int = BACKUP_STEP_PAGES, progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """Copia um banco para outro pela API de backup do SQLite, em passos de `pages` páginas.
+        
+        Entre os passos a trava de leitura é liberada e a thread cede a vez, de modo que
+        as escritas da aplicação só esperam, no máximo, a cópia de um passo.
+        """
+        stats = {'passos': 0, 'paginas': 0}
+        
+        def _progress(status, remaining, total):
+            stats['passos'] += 1
+            stats['paginas'] = total
+            if progress is not None:
+                progress(total - remaining, total)
+            if remaining and BACKUP_STEP_PAUSE:
+                time.sleep(BACKUP_STEP_PAUSE)
+        
+        inicio = time.perf_counter()
+        
+        # Em WAL, uma transação de leitura aberta fixa o snapshot da origem: escritas de
+        # outras conexões seguem normalmente e não forçam a cópia a recomeçar
+        snapshot = source.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        if snapshot:
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        try:
+            source.backup(target, pages=pages, progress=_progress)
+        finally:
+            if snapshot:
+                source.rollback()
+        
+        stats['duracao_s'] = time.perf_counter() - inicio
+        return stats
     
-    def backup_database(self, backup_path: Optional[str] = None) -> str:
-        """Cria backup do banco de dados"""
-        if backup_path is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_path = f"backup_locauto_{timestamp}.db"
+    def backup_database(self, backup_path: Optional[str] = None,
+                        progress: Optional[Callable[[int, int], None]] = None) -> str:
+        """Cria backup consistente do banco (inclusive conteúdo do WAL) sem bloquear as escritas.
         
+        Sem backup_path, o snapshot vai para o repositório de backups (comprimido e
+        deduplicado); com backup_path, é gravado como .db comum em backups/backup_path.
+        progress, se informado, recebe (páginas copiadas, total de páginas) a cada passo.
+        """
+        inicio = time.perf_counter()
         try:
             # Cria diretório de backup se não existir
-            backup_dir = "backups"
+            backup_dir = self.backups.directory
             if not os.path.exists(backup_dir):
                 os.makedirs(backup_dir)
             
-            backup_full_path = os.path.join(backup_dir, backup_path)
+            criado_em = datetime.now()
+            if backup_path is None:
+                temp_path = os.path.join(backup_dir, f"snapshot_{criado_em.strftime('%Y%m%d_%H%M%S_%f')}.db.tmp")
+            else:
+                temp_path = os.path.join(backup_dir, backup_path) + ".tmp"
+            
+            # Conexões dedicadas: o backup não ocupa uma conexão do pool
+            source = sqlite3.connect(self.db_path, timeout=self.pool.timeout)
+            target = sqlite3.connect(temp_path)
+            try:
+                stats = self._copy_online(source, target, progress=progress)
+            finally:
+                target.close()
+                source.close()
+            
+            if backup_path is None:
+                entry = self.backups.add(temp_path, criado_em)
+                backup_full_path = self.backups.path_of(entry)
+                stats['sha256'] = entry['sha256']
+                stats['duplicado'] = entry.get('duplicado', False)
+            else:
+                # O arquivo final só aparece completo
+                backup_full_path = os.path.join(backup_dir, backup_path)
+                os.replace(temp_path, backup_full_path)
             
-            import shutil
-            shutil.copy2(self.db_path, backup_full_path)
-            logger.info(f"Backup criado: {backup_full_path}")
+            stats['arquivo'] = backup_full_path
+            stats['bytes'] = os.path.getsize(backup_full_path)
+            stats['concluido_em'] = time.time()
+            self.last_backup = stats
+            _METRICA_BACKUP.observe(time.perf_counter() - inicio, "repositorio" if backup_path is None else "arquivo")
+            logger.info(f"Backup criado: {backup_full_path} ({stats['paginas']} páginas em "
+                        f"{stats['passos']} passos, {stats['duracao_s']:.3f}s)")
             return backup_full_path
         except Exception as e:
+            if 'temp_path' in locals() and os.path.exists(temp_path):
+                os.remove(temp_path)
+            _METRICA_BACKUP_FALHAS.inc()
             logger.error(f"Erro ao criar backup: {e}")
             raise
     
     def auto_backup(self) -> Optional[str]:
         """Executa backup automático diário"""
         try:
-            # Verifica se já foi feito backup hoje
-            today = datetime.now().strftime('%Y%m%d')
-            backup_dir = "backups"
-            
-            if os.path.exists(backup_dir):
-                existing_backups = [f for f in os.listdir(backup_dir) if f.startswith(f"backup_locauto_{today}")]
-                if existing_backups:
-                    logger.info("Backup diário já realizado")
-                    return os.path.join(backup_dir, existing_backups[0])
+            # Verifica no catálogo se já foi feito backup hoje
+            latest = self.backups.latest()
+            if latest and latest['criado_em'][:10] == datetime.now().strftime('%Y-%m-%d'):
+                logger.info("Backup diário já realizado")
+                _METRICA_AUTO_BACKUP.inc("ja_realizado")
+                return self.backups.path_of(latest)
             
             # Cria backup
             backup_path = self.backup_database()
             
-            # Remove backups antigos (mantém apenas os últimos 30 dias)
+            # Remove backups fora da política de retenção
             self.cleanup_old_backups()
             
+            _METRICA_AUTO_BACKUP.inc("criado")
             return backup_path
         except Exception as e:
+            _METRICA_AUTO_BACKUP.inc("erro")
             logger.error(f"Erro no backup automático: {e}")
             return None
     
-    def cleanup_old_backups(self, days_to_keep: int = 30):
-        """Remove backups antigos"""
+    def start_maintenance(self) -> threading.Thread:
+        """Atualiza a disponibilidade do dia e executa backup diário e limpeza de backups
+        em uma thread de segundo plano (uma vez)"""
+        with self._maintenance_lock:
+            if self._maintenance is None:
+                self._maintenance = threading.Thread(
+                    target=self._run_maintenance, name="locauto-manutencao", daemon=True
+                )
+                self._maintenance.start()
+        return self._maintenance
+    
+    def _run_maintenance(self):
+        """Tarefas de segundo plano da partida: disponibilidade do dia e backup diário"""
         try:
-            from datetime import timedelta
-            backup_dir = "backups"
-            if not os.path.exists(backup_dir):
-                return
-            
-            cutoff_date = datetime.now() - timedelta(days=days_to_keep)
-            
-            for filename in os.listdir(backup_dir):
-                if filename.startswith("backup_locauto_") and filename.endswith(".db"):
-                    file_path = os.path.join(backup_dir, filename)
-                    file_time = datetime.fromtimestamp(os.path.getctime(file_path))
-                    
-                    if file_time < cutoff_date:
-                        os.remove(file_path)
-                        logger.info(f"Backup antigo removido: {filename}")
+            self.refresh_disponibilidade()
+        except Exception as e:
+            logger.error(f"Erro ao atualizar disponibilidade dos veículos: {e}")
+        self.auto_backup()
+    
+    def cleanup_old_backups(self) -> List[str]:
+        """Remove backups fora da retenção avô-pai-filho (diários, semanais e mensais)"""
+        try:
+            return self.backups.prune()
         except Exception as e:
             logger.error(f"Erro ao limpar backups antigos: {e}")
+            return []
     
-    def restore_database(self, backup_path: str) -> bool:
-        """Restaura banco de dados a partir de backup"""
+    def verify_backup(self, backup_path: str) -> bool:
+        """Executa PRAGMA integrity_check no arquivo de backup (aberto somente leitura)"""
+        with self.backups.uncompressed(backup_path) as plain_path:
+            uri = "file:" + urllib.parse.quote(os.path.abspath(plain_path)) + "?mode=ro"
+            conn = sqlite3.connect(uri, uri=True)
+            try:
+                result = conn.execute("PRAGMA integrity_check").fetchall()
+            finally:
+                conn.close()
+        if result != [("ok",)]:
+            logger.error(f"Backup corrompido ({backup_path}): {result[:5]}")
+            return False
+        return True
+    
+    def restore_database(self, backup_path: str,
+                         progress: Optional[Callable[[int, int], None]] = None) -> bool:
+        """Restaura banco de dados a partir de backup.
+        
+        O backup é verificado com integrity_check e então copiado para o banco em uso em
+        um único passo da API de backup, que é uma única transação: as demais conexões
+        passam do conteúdo antigo para o restaurado de uma vez, sem arquivo intermediário.
+        Aceita também os backups comprimidos do repositório (.db.xz/.db.gz).
+        """
         try:
             if not os.path.exists(backup_path):
                 logger.error(f"Arquivo de backup não encontrado: {backup_path}")
                 return False
             
-            # Substitui o banco atual pelo backup
-            import shutil
-            shutil.copy2(backup_path, self.db_path)
+            with self.backups.uncompressed(backup_path) as plain_path:
+                if not self.verify_backup(plain_path):
+                    return False
+                
+                source = sqlite3.connect(plain_path)
+                target = sqlite3.connect(self.db_path, timeout=self.pool.timeout)
+                try:
+                    stats = self._copy_online(source, target, pages=-1, progress=progress)
+                finally:
+                    target.close()
+                    source.close()
+            
+            # O backup pode ter um esquema mais antigo
+            self.init_database()
             
-            logger.info(f"Banco restaurado a partir de: {backup_path}")
+            stats['arquivo'] = backup_path
+            self.last_restore = stats
+            logger.info(f"Banco restaurado a partir de: {backup_path} ({stats['paginas']} páginas, "
+                        f"{stats['duracao_s']:.3f}s)")
             return True
         except Exception as e:
             logger.error(f"Erro ao restaurar backup: {e}")
             return False
     
-    def migrate_csv_data(self):
-        """Migra dados dos arquivos CSV para o banco de dados"""
+    def merge_from_backup(self, backup_path: str,
+                          tabelas: Tuple[str, ...] = MERGE_TABLES) -> Dict[str, Dict[str, int]]:
+        """Mescla no banco em uso os registros de um backup, sem sobrescrever o arquivo.
+        
+        O backup é anexado com ATTACH e cada tabela é copiada com um único INSERT ... SELECT:
+        clientes, veículos e faturas já existentes (mesmo CPF/CNPJ, placa ou número) são
+        mantidos; cliente_id, veiculo_id e fatura_id são remapeados pelas chaves naturais.
+        Transações já registradas no banco em uso não são duplicadas.
+        
+        Faturas cujo período se sobrepõe a outra locação do veículo (no banco em uso ou
+        anterior no próprio backup) não são mescladas, nem suas transações: ficam em
+        "conflitos" no resultado de faturas e são listadas no log.
+        """
+        desconhecidas = set(tabelas) - set(MERGE_TABLES)
+        if desconhecidas:
+            raise ValueError(f"Tabelas não suportadas na mesclagem: {', '.join(sorted(desconhecidas))}")
+        if not os.path.exists(backup_path):
+            raise FileNotFoundError(f"Arquivo de backup não encontrado: {backup_path}")
+        
+        resultado = {}
+        with self.backups.uncompressed(backup_path) as plain_path:
+            uri = "file:" + urllib.parse.quote(os.path.abspath(plain_path)) + "?mode=ro"
+            with self.transaction() as conn:
+                conn.execute("ATTACH DATABASE ? AS backup", (uri,))
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    for tabela in (t for t in MERGE_TABLES if t in tabelas):
+                        query = self._merge_query(conn, tabela)
+                        total = conn.execute(f"SELECT COUNT(*) FROM backup.{tabela}").fetchone()[0]
+                        conflitos = self._merge_conflicts(conn) if tabela == "faturas" else []
+                        gravadas = conn.execute(query).rowcount
+                        resultado[tabela] = {"backup": total, "gravadas": gravadas,
+                                             "ignoradas": total - gravadas - len(conflitos)}
+                        if tabela == "faturas":
+                            resultado[tabela]["conflitos"] = len(conflitos)
+                    
+                    if "faturas" in resultado:
+                        # A sequência de numeração não pode ficar atrás das faturas mescladas
+                        conn.execute("""
+                            UPDATE configuracoes
+                            SET valor = MAX(CAST(valor AS INTEGER),
+                                            (SELECT COALESCE(MAX(CAST(numero_fatura AS INTEGER)), 0)
+                                             FROM faturas WHERE numero_fatura NOT GLOB '*[^0-9]*')),
+                                data_atualizacao = CURRENT_TIMESTAMP
+                            WHERE chave = 'ultimo_numero_fatura'
+                        """)
+                        for estoque in ("numeros_fatura_livres", "numeros_fatura_reservados"):
+                            conn.execute(f"""
+                                DELETE FROM {estoque}
+                                WHERE numero IN (SELECT CAST(numero_fatura AS INTEGER) FROM faturas
+                                                 WHERE numero_fatura NOT GLOB '*[^0-9]*')
+                            """)
+                        self._mark_written("configuracoes", "numeros_fatura_livres", "numeros_fatura_reservados")
+                    self._mark_written(*resultado)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    # Uma falha aqui não pode esconder o erro da mesclagem
+                    try:
+                        conn.execute("DETACH DATABASE backup")
+                    except Exception as e:
+                        logger.error(f"Erro ao desanexar o backup {backup_path}: {e}")
+        
+        logger.info(f"Backup mesclado: {backup_path} " + ", ".join(
+            f"{tabela} {r['gravadas']}/{r['backup']}" for tabela, r in resultado.items()))
+        return resultado
+    
+    def _merge_query(self, conn: sqlite3.Connection, tabela: str) -> str:
+        """Monta o INSERT ... SELECT que mescla uma tabela do backup anexado.
+        
+        Só as colunas presentes nos dois esquemas são copiadas (backups antigos não têm,
+        por exemplo, os campos de endereço separados).
+        """
+        main_cols = [row[1] for row in conn.execute(f"PRAGMA main.table_info({tabela})")]
+        backup_cols = {row[1] for row in conn.execute(f"PRAGMA backup.table_info({tabela})")}
+        remapeadas = {"cliente_id", "veiculo_id", "fatura_id"}
+        colunas = [c for c in main_cols if c in backup_cols and c != "id" and c not in remapeadas]
+        select = ", ".join(f"b.{c}" for c in colunas)
+        
+        if tabela in ("clientes", "veiculos"):
+            chave = "cpf_cnpj" if tabela == "clientes" else "placa"
+            return f"""INSERT INTO main.{tabela} ({', '.join(colunas)})
+                       SELECT {select} FROM backup.{tabela} b WHERE true
+                       ON CONFLICT({chave}) DO NOTHING"""
+        
+        if tabela == "faturas":
+            return f"""INSERT INTO main.faturas (cliente_id, veiculo_id, {', '.join(colunas)})
+                       SELECT mc.id, mv.id, {select}
+                       FROM backup.faturas b
+                       JOIN backup.clientes bc ON bc.id = b.cliente_id
+                       JOIN main.clientes mc ON mc.cpf_cnpj = bc.cpf_cnpj
+                       JOIN backup.veiculos bv ON bv.id = b.veiculo_id
+                       JOIN main.veiculos mv ON mv.placa = bv.placa
+                       WHERE NOT ({_CONFLITO_MESCLA})
+                       ON CONFLICT(numero_fatura) DO NOTHING"""
+        
+        # Transações: fatura_id remapeado pelo número da fatura. Sem chave única, uma
+        # transação de fatura é ignorada se a fatura já tem transação do mesmo tipo, e
+        # uma avulsa, se já existe outra idêntica (tipo, data, valor e descrição)
+        return f"""INSERT INTO main.transacoes (fatura_id, {', '.join(colunas)})
+                   SELECT mf.id, {select}
+                   FROM backup.transacoes b
+                   LEFT JOIN backup.faturas bf ON bf.id = b.fatura_id
+                   LEFT JOIN main.faturas mf ON mf.numero_fatura = bf.numero_fatura
+                   WHERE (b.fatura_id IS NULL OR mf.id IS NOT NULL)
+                     AND CASE WHEN mf.id IS NULL THEN NOT EXISTS (
+                             SELECT 1 FROM main.transacoes m
+                             WHERE m.tipo = b.tipo AND m.data_transacao = b.data_transacao
+                               AND m.valor = b.valor AND m.descricao = b.descricao
+                               AND m.fatura_id IS NULL)
+                         ELSE NOT EXISTS (
+                             SELECT 1 FROM main.transacoes m
+                             WHERE m.fatura_id = mf.id AND m.tipo = b.tipo)
+                         END"""
+    
+    def _merge_conflicts(self, conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+        """Faturas do backup anexado que não serão mescladas por sobreposição de período.
+        
+        Faturas cujo número já existe no banco em uso não contam: já foram mescladas antes.
+        """
+        conflitos = [dict(zip(("numero_fatura", "placa", "data_inicio", "data_fim"), row)) for row in conn.execute(
+            f"""SELECT b.numero_fatura, bv.placa, b.data_inicio, b.data_fim
+                FROM backup.faturas b
+                JOIN backup.clientes bc ON bc.id = b.cliente_id
+                JOIN main.clientes mc ON mc.cpf_cnpj = bc.cpf_cnpj
+                JOIN backup.veiculos bv ON bv.id = b.veiculo_id
+                JOIN main.veiculos mv ON mv.placa = bv.placa
+                WHERE NOT EXISTS (SELECT 1 FROM main.faturas m WHERE m.numero_fatura = b.numero_fatura)
+                  AND {_CONFLITO_MESCLA}
+                ORDER BY b.id"""
+        )]
+        if conflitos:
+            periodos = ", ".join(f"{c['numero_fatura']} ({c['placa']}, {c['data_inicio']} a {c['data_fim']})"
+                                 for c in conflitos[:5])
+            logger.warning(f"{len(conflitos)} faturas do backup não mescladas por sobreposição de "
+                           f"período: {periodos}{' ...' if len(conflitos) > 5 else ''}")
+        return conflitos
+    
+    def migrate_csv_data(self, tamanho_bloco: int = CSV_CHUNK_ROWS) -> Dict[str, Dict[str, Any]]:
+        """Migra dados dos arquivos CSV para o banco de dados, em blocos e com retomada"""
+        arquivos = {tabela: f"{tabela}.csv" for tabela in ("clientes", "veiculos", "transacoes")}
+        arquivos = {tabela: caminho for tabela, caminho in arquivos.items() if os.path.exists(caminho)}
+        if not arquivos:
+            return {}
+        
+        resultado = {}
         try:
-            # Migrar clientes
-            if os.path.exists("clientes.csv"):
-                df_clientes = pd.read_csv("clientes.csv")
-                if not df_clientes.empty:
-                    for _, row in df_clientes.iterrows():
-                        self.execute_query("""
-                            INSERT OR IGNORE INTO clientes (nome, cpf_cnpj, telefone, endereco, email)
-                            VALUES (?, ?, ?, ?, ?)
-                        """, (row.get('Nome', ''), row.get('CPF/CNPJ', ''), 
-                              row.get('Telefone', ''), row.get('Endereço', ''), row.get('Email', '')))
-            
-            # Migrar veículos
-            if os.path.exists("veiculos.csv"):
-                df_veiculos = pd.read_csv("veiculos.csv")
-                if not df_veiculos.empty:
-                    for _, row in df_veiculos.iterrows():
-                        self.execute_query("""
-                            INSERT OR IGNORE INTO veiculos (modelo, placa, ano, cor, valor_diaria)
-                            VALUES (?, ?, ?, ?, ?)
-                        """, (row.get('Modelo', ''), row.get('Placa', ''), 
-                              row.get('Ano', 0), row.get('Cor', ''), row.get('Valor Diária', 0)))
-            
-            # Migrar transações
-            if os.path.exists("transacoes.csv"):
-                df_transacoes = pd.read_csv("transacoes.csv")
-                if not df_transacoes.empty:
-                    for _, row in df_transacoes.iterrows():
-                        self.execute_query("""
-                            INSERT OR IGNORE INTO transacoes (tipo, descricao, valor, data_transacao, categoria)
-                            VALUES (?, ?, ?, ?, ?)
-                        """, (row.get('Tipo', ''), row.get('Descrição', ''), 
-                              row.get('Valor', 0), row.get('Data', ''), row.get('Categoria', '')))
-            
+            for tabela, caminho in arquivos.items():
+                estatisticas = self.migrate_csv_file(tabela, caminho, tamanho_bloco)
+                if estatisticas is not None:
+                    resultado[tabela] = estatisticas
             logger.info("Migração de dados CSV concluída")
             
         except Exception as e:
             logger.warning(f"Erro na migração de dados CSV: {e}")
+        return resultado
     
-    def get_next_invoice_number(self) -> str:
-        """Obtém o próximo número de fatura sequencial"""
-        try:
-            result = self.execute_query(
-                "SELECT valor FROM configuracoes WHERE chave = 'ultimo_numero_fatura'",
-                fetch_one=True
+    def migrate_csv_file(self, tabela: str, caminho: str, tamanho_bloco: int = CSV_CHUNK_ROWS,
+                         progress: Optional[Callable[[int], None]] = None) -> Optional[Dict[str, Any]]:
+        """Migra um CSV em blocos de linhas, sem carregar o arquivo inteiro na memória.
+        
+        Cada bloco é gravado na mesma transação que o checkpoint em configuracoes
+        (linhas já migradas + tamanho e data do arquivo): uma migração interrompida
+        recomeça do primeiro bloco não gravado, e um arquivo já migrado é ignorado.
+        progress, se informado, recebe o total de linhas migradas após cada bloco.
+        Retorna None se o arquivo já tinha sido migrado.
+        """
+        from bulk_import import importar, ler_csv_em_blocos
+        
+        chave = f"migracao_csv_{tabela}"
+        info = os.stat(caminho)
+        arquivo = {"tamanho": info.st_size, "modificado": int(info.st_mtime)}
+        
+        row = self.execute_query("SELECT valor FROM configuracoes WHERE chave = ?", (chave,), fetch_one=True)
+        checkpoint = json.loads(row[0]) if row else None
+        if checkpoint and checkpoint["arquivo"] == arquivo:
+            if checkpoint["concluida"]:
+                return None
+            linhas = checkpoint["linhas"]
+            logger.info(f"Retomando migração de {caminho} a partir da linha {linhas}")
+        else:
+            linhas = 0
+        
+        estatisticas = {"retomada_em": linhas, "linhas": 0, "gravadas": 0, "ignoradas": 0}
+        inicio = time.perf_counter()
+        
+        def salvar_checkpoint(conn, concluida):
+            conn.execute(
+                """INSERT INTO configuracoes (chave, valor, descricao) VALUES (?, ?, ?)
+                   ON CONFLICT(chave) DO UPDATE SET valor = excluded.valor,
+                                                    data_atualizacao = CURRENT_TIMESTAMP""",
+                (chave, json.dumps({"arquivo": arquivo, "linhas": linhas, "concluida": concluida}),
+                 f"Checkpoint da migração de {caminho}")
             )
+        
+        for bloco in ler_csv_em_blocos(caminho, tamanho_bloco, inicio=linhas):
+            with self.transaction() as conn:
+                gravacao = importar(conn, tabela, bloco)
+                linhas += gravacao["lidas"]
+                salvar_checkpoint(conn, concluida=False)
+                self._mark_written(tabela, "configuracoes")
             
-            if result:
-                ultimo_numero = int(result[0])
+            estatisticas["linhas"] += gravacao["lidas"]
+            estatisticas["gravadas"] += gravacao["gravadas"]
+            estatisticas["ignoradas"] += gravacao["ignoradas"]
+            decorrido = time.perf_counter() - inicio
+            logger.info(f"Migração de {caminho}: {linhas} linhas "
+                        f"({estatisticas['linhas'] / decorrido:,.0f} linhas/s)")
+            if progress is not None:
+                progress(linhas)
+        
+        with self.transaction() as conn:
+            salvar_checkpoint(conn, concluida=True)
+            self._mark_written("configuracoes")
+        
+        estatisticas["duracao_s"] = time.perf_counter() - inicio
+        estatisticas["linhas_por_s"] = estatisticas["linhas"] / estatisticas["duracao_s"]
+        logger.info(f"Migração de {caminho} concluída: {estatisticas['gravadas']} gravadas, "
+                    f"{estatisticas['ignoradas']} ignoradas, {estatisticas['linhas_por_s']:,.0f} linhas/s")
+        return estatisticas
+    
+    def _allocate_invoice_numbers(self, conn: sqlite3.Connection, count: int) -> List[int]:
+        """Aloca números na transação corrente: primeiro os devolvidos, depois avança a sequência.
+        
+        Deve ser chamada com a trava de escrita já obtida (BEGIN IMMEDIATE).
+        """
+        numeros = [row[0] for row in conn.execute(
+            "SELECT numero FROM numeros_fatura_livres ORDER BY numero LIMIT ?", (count,)
+        )]
+        if numeros:
+            conn.executemany("DELETE FROM numeros_fatura_livres WHERE numero = ?",
+                             [(numero,) for numero in numeros])
+        
+        faltam = count - len(numeros)
+        if faltam > 0:
+            # Incremento atômico em uma única instrução
+            update = """UPDATE configuracoes
+                        SET valor = CAST(valor AS INTEGER) + ?, data_atualizacao = CURRENT_TIMESTAMP
+                        WHERE chave = 'ultimo_numero_fatura'"""
+            if _SUPPORTS_RETURNING:
+                ultimo = conn.execute(update + " RETURNING CAST(valor AS INTEGER)", (faltam,)).fetchone()
             else:
-                ultimo_numero = 0
-            
-            novo_numero = ultimo_numero + 1
-            
-            # Atualizar o último número
-            self.execute_query(
-                "UPDATE configuracoes SET valor = ?, data_atualizacao = CURRENT_TIMESTAMP WHERE chave = 'ultimo_numero_fatura'",
-                (str(novo_numero),)
+                conn.execute(update, (faltam,))
+                ultimo = conn.execute(
+                    "SELECT CAST(valor AS INTEGER) FROM configuracoes WHERE chave = 'ultimo_numero_fatura'"
+                ).fetchone()
+            if ultimo is None:
+                conn.execute(
+                    """INSERT INTO configuracoes (chave, valor, descricao)
+                       VALUES ('ultimo_numero_fatura', ?, 'Último número de fatura gerado')""",
+                    (str(faltam),)
+                )
+                ultimo = (faltam,)
+            numeros.extend(range(ultimo[0] - faltam + 1, ultimo[0] + 1))
+        
+        self._mark_written("configuracoes", "numeros_fatura_livres")
+        return sorted(numeros)
+    
+    def reserve_invoice_numbers(self, count: int = 1) -> List[str]:
+        """Reserva um bloco de números de fatura (ex.: faturamento em lote).
+        
+        A reserva é atômica entre sessões e processos e fica registrada até o número ser
+        usado em uma fatura ou devolvido com release_invoice_numbers.
+        """
+        if count < 1:
+            return []
+        with self.transaction() as conn:
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            numeros = self._allocate_invoice_numbers(conn, count)
+            conn.executemany("INSERT OR IGNORE INTO numeros_fatura_reservados (numero) VALUES (?)",
+                             [(numero,) for numero in numeros])
+            self._mark_written("numeros_fatura_reservados")
+        return [f"{numero:06d}" for numero in numeros]
+    
+    def release_invoice_numbers(self, numeros: List[str]) -> int:
+        """Devolve ao estoque números reservados que não chegaram a ser usados em faturas.
+        
+        Só números reservados por reserve_invoice_numbers (e ainda não devolvidos) são
+        aceitos; os demais são ignorados. Retorna quantos voltaram ao estoque.
+        """
+        devolvidos = 0
+        with self.transaction() as conn:
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            for numero in numeros:
+                numero = str(numero).strip()
+                if not numero.isdigit():
+                    continue
+                # A reserva termina aqui, devolvido ou não (já usado em uma fatura)
+                reservado = conn.execute("DELETE FROM numeros_fatura_reservados WHERE numero = ?",
+                                         (int(numero),)).rowcount
+                if not reservado:
+                    continue
+                cursor = conn.execute(
+                    """INSERT OR IGNORE INTO numeros_fatura_livres (numero)
+                       SELECT ? WHERE NOT EXISTS (SELECT 1 FROM faturas WHERE numero_fatura IN (?, ?))""",
+                    (int(numero), numero, f"{int(numero):06d}")
+                )
+                devolvidos += cursor.rowcount
+            self._mark_written("numeros_fatura_livres", "numeros_fatura_reservados")
+        return devolvidos
+    
+    def peek_next_invoice_number(self) -> str:
+        """Sugere o próximo número de fatura sem reservá-lo (não consome a sequência)"""
+        result = self.execute_query("""
+            SELECT COALESCE(
+                (SELECT MIN(numero) FROM numeros_fatura_livres),
+                (SELECT CAST(valor AS INTEGER) + 1 FROM configuracoes WHERE chave = 'ultimo_numero_fatura'),
+                1
             )
-            
-            return f"{novo_numero:06d}"
-            
+        """, fetch_one=True)
+        return f"{result[0]:06d}"
+    
+    def get_next_invoice_number(self) -> str:
+        """Obtém (e reserva) o próximo número de fatura sequencial"""
+        try:
+            return self.reserve_invoice_numbers(1)[0]
         except Exception as e:
             logger.error(f"Erro ao obter próximo número de fatura: {e}")
             return "000001"
@@ -302,17 +1026,47 @@ class DatabaseManager:
     def execute_query(self, query: str, params: tuple = (), fetch_one: bool = False, fetch_all: bool = False):
         """Executa uma query no banco de dados"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            is_read = _is_read_query(query)
+            cacheable = _is_cacheable_query(query) and (fetch_one or fetch_all) and not self._in_transaction()
+            if cacheable:
+                tables = _tables_read(query)
+                key = ("query", query, tuple(params), fetch_one)
+                found, result = self.cache.get(key, tables)
+                if found:
+                    return list(result) if fetch_all else result
+                generations = self.cache.snapshot(tables)
+            
+            with self.transaction() as conn:
+                inicio = time.perf_counter()
+                alteracoes = conn.total_changes
                 cursor = conn.cursor()
                 cursor.execute(query, params)
                 
+                if not is_read:
+                    # Escritas não reconhecidas (DDL etc.) invalidam todo o cache
+                    self._mark_written(*(_tables_written(query) or {"*"}))
+                
                 if fetch_one:
-                    return cursor.fetchone()
+                    result = cursor.fetchone()
+                    linhas = int(result is not None)
                 elif fetch_all:
-                    return cursor.fetchall()
+                    result = cursor.fetchall()
+                    linhas = len(result)
+                else:
+                    linhas = max(cursor.rowcount, 0)
+                self.monitor.record(query, time.perf_counter() - inicio, linhas, conn, params)
                 
-                conn.commit()
-                return cursor.lastrowid
+                if is_read and conn.total_changes != alteracoes:
+                    # Tida como leitura, mas alterou linhas (escrita que a expressão não reconhece)
+                    cacheable = False
+                    self._mark_written("*")
+                if not (fetch_one or fetch_all):
+                    return cursor.lastrowid
+            
+            if cacheable:
+                self.cache.put(key, generations, result)
+                return list(result) if fetch_all else result
+            return result
                 
         except Exception as e:
             logger.error(f"Erro ao executar query: {e}")
@@ -320,35 +1074,312 @@ class DatabaseManager:
     
     def get_dataframe(self, query: str, params: tuple = ()) -> pd.DataFrame:
         """Retorna um DataFrame a partir de uma query"""
+        import pandas as pd
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                return pd.read_sql_query(query, conn, params=params)
+            cacheable = not self._in_transaction()
+            if cacheable:
+                tables = _tables_read(query)
+                key = ("dataframe", query, tuple(params))
+                found, df = self.cache.get(key, tables)
+                if found:
+                    return df.copy()
+                generations = self.cache.snapshot(tables)
+            
+            with self.transaction() as conn:
+                inicio = time.perf_counter()
+                df = pd.read_sql_query(query, conn, params=params)
+                self.monitor.record(query, time.perf_counter() - inicio, len(df), conn, params)
+            
+            if cacheable:
+                self.cache.put(key, generations, df)
+                return df.copy()
+            return df
         except Exception as e:
             logger.error(f"Erro ao obter DataFrame: {e}")
             return pd.DataFrame()
     
+    def import_data(self, dados: Dict[str, Any], atualizar: bool = False) -> Dict[str, Dict[str, int]]:
+        """Importa em massa clientes, veículos e/ou transações (DataFrame ou caminho de CSV).
+        
+        Tudo é gravado em uma única transação; registros com CPF/CNPJ ou placa já
+        cadastrados são ignorados, ou atualizados com atualizar=True.
+        """
+        from bulk_import import importar_tabelas
+        
+        with self.transaction() as conn:
+            resultado = importar_tabelas(conn, dados, atualizar)
+            self._mark_written(*dados)
+        return resultado
+    
+    def has_rows(self, table: str, condition: str = "1") -> bool:
+        """Verifica com EXISTS se a tabela tem alguma linha que satisfaça a condição"""
+        result = self.execute_query(
+            f"SELECT EXISTS(SELECT 1 FROM {table} WHERE {condition})", fetch_one=True
+        )
+        return bool(result[0])
+    
     def get_clientes(self) -> pd.DataFrame:
         """Retorna todos os clientes ativos"""
         return self.get_dataframe("SELECT * FROM clientes WHERE ativo = 1 ORDER BY nome")
     
     def get_veiculos(self) -> pd.DataFrame:
         """Retorna todos os veículos ativos"""
+        self._ensure_disponibilidade_do_dia()
         return self.get_dataframe("SELECT * FROM veiculos WHERE ativo = 1 ORDER BY modelo")
     
-    def get_faturas(self) -> pd.DataFrame:
-        """Retorna todas as faturas com informações de cliente e veículo"""
+    def search_clientes(self, query: str, limit: int = 20) -> pd.DataFrame:
+        """Busca clientes ativos por nome, CPF/CNPJ, cidade ou endereço (mais relevantes primeiro)"""
+        return self._search("clientes", query, limit, ordem="nome",
+                            colunas=("nome", "cpf_cnpj", "cidade", "endereco"))
+    
+    def search_veiculos(self, query: str, limit: int = 20) -> pd.DataFrame:
+        """Busca veículos ativos por placa ou modelo (mais relevantes primeiro)"""
+        return self._search("veiculos", query, limit, ordem="modelo", colunas=("modelo", "placa"))
+    
+    def _search(self, tabela: str, query: str, limit: int, ordem: str, colunas: Tuple[str, ...]) -> pd.DataFrame:
+        """Busca no índice FTS5 de trigramas da tabela; sem termos, lista os primeiros por `ordem`"""
+        termos = _search_terms(query or "")
+        if not termos:
+            return self.get_dataframe(
+                f"SELECT * FROM {tabela} WHERE ativo = 1 ORDER BY {ordem} LIMIT ?", (limit,)
+            )
+        
+        indice = f"{tabela}_busca"
+        if indice in self._search_indexes and all(len(termo) >= 3 for termo in termos):
+            match = " ".join('"' + termo.replace('"', '""') + '"' for termo in termos)
+            return self.get_dataframe(f"""
+                SELECT t.* FROM {indice} b
+                JOIN {tabela} t ON t.id = b.rowid
+                WHERE {indice} MATCH ? AND t.ativo = 1
+                ORDER BY b.rank
+                LIMIT ?
+            """, (match, limit))
+        
+        # Termos com menos de 3 caracteres (trigramas) ou SQLite sem FTS5
+        condicoes = " AND ".join("(" + " OR ".join(f"{c} LIKE ?" for c in colunas) + ")" for _ in termos)
+        params = tuple(f"%{termo}%" for termo in termos for _ in colunas)
+        return self.get_dataframe(
+            f"SELECT * FROM {tabela} WHERE ativo = 1 AND {condicoes} ORDER BY {ordem} LIMIT ?",
+            params + (limit,)
+        )
+    
+    def _check_disponibilidade(self, conn: sqlite3.Connection, veiculo_id: int,
+                               data_inicio: Any, data_fim: Any):
+        """Levanta VeiculoIndisponivelError se o período se sobrepõe a outra locação do veículo"""
+        inicio, fim = str(data_inicio)[:10], str(data_fim)[:10]
+        if fim < inicio:
+            raise ValueError(f"Data final {fim} anterior à data inicial {inicio}")
+        
+        conflitos = [dict(zip(("numero_fatura", "data_inicio", "data_fim"), row)) for row in conn.execute(
+            f"""SELECT f.numero_fatura, f.data_inicio, f.data_fim FROM faturas f
+                WHERE f.veiculo_id = ? AND {_OCUPACAO}
+                ORDER BY f.data_fim LIMIT 5""",
+            (veiculo_id, inicio, fim)
+        )]
+        if conflitos:
+            periodos = ", ".join(f"{c['numero_fatura']} ({c['data_inicio']} a {c['data_fim']})" for c in conflitos)
+            raise VeiculoIndisponivelError(
+                f"Veículo {veiculo_id} já locado entre {inicio} e {fim}: fatura {periodos}", conflitos
+            )
+    
+    def is_veiculo_disponivel(self, veiculo_id: int, data_inicio: Any, data_fim: Any) -> bool:
+        """Verifica se o veículo não tem locação que se sobreponha ao período (datas inclusivas)"""
+        result = self.execute_query(
+            f"SELECT NOT EXISTS(SELECT 1 FROM faturas f WHERE f.veiculo_id = ? AND {_OCUPACAO})",
+            (veiculo_id, str(data_inicio)[:10], str(data_fim)[:10]), fetch_one=True
+        )
+        return bool(result[0])
+    
+    def get_veiculos_disponiveis(self, data_inicio: Any, data_fim: Any,
+                                 limit: Optional[int] = None) -> pd.DataFrame:
+        """Retorna os veículos ativos sem locação no período (datas inclusivas), por modelo.
+        
+        Para cada veículo o NOT EXISTS busca em idx_faturas_veiculo_periodo somente as
+        locações que terminam a partir de data_inicio, sem ler o histórico encerrado.
+        """
+        query = f"""
+            SELECT v.* FROM veiculos v
+            WHERE v.ativo = 1
+              AND NOT EXISTS (SELECT 1 FROM faturas f WHERE f.veiculo_id = v.id AND {_OCUPACAO})
+            ORDER BY v.modelo
+        """
+        params: tuple = (str(data_inicio)[:10], str(data_fim)[:10])
+        if limit is not None:
+            query += " LIMIT ?"
+            params += (limit,)
+        return self.get_dataframe(query, params)
+    
+    def _ensure_disponibilidade_do_dia(self):
+        """Na primeira leitura do dia, recalcula `disponivel` (locações que começaram ou terminaram)"""
+        if self._disponibilidade_em != datetime.now().strftime('%Y-%m-%d'):
+            self.refresh_disponibilidade()
+    
+    def refresh_disponibilidade(self, data: Optional[str] = None) -> int:
+        """Recalcula veiculos.disponivel para a data (hoje, se omitida) e retorna quantos mudaram.
+        
+        As escritas em faturas já atualizam o veículo por trigger; isto cobre a virada do
+        dia, quando locações começam ou terminam sem nenhuma escrita.
+        """
+        data = str(data or datetime.now().strftime('%Y-%m-%d'))[:10]
+        with self.transaction() as conn:
+            livre = f"NOT EXISTS (SELECT 1 FROM faturas f WHERE f.veiculo_id = veiculos.id AND {_OCUPACAO})"
+            alterados = conn.execute(
+                f"UPDATE veiculos SET disponivel = {livre} WHERE disponivel IS NOT {livre}",
+                (data, data, data, data)
+            ).rowcount
+            if alterados:
+                self._mark_written("veiculos")
+        self._disponibilidade_em = data
+        if alterados:
+            logger.info(f"Disponibilidade atualizada para {data}: {alterados} veículos alterados")
+        return alterados
+    
+    def get_faturas(self, data_inicio: Optional[str] = None, data_fim: Optional[str] = None,
+                    cliente_id: Optional[int] = None, veiculo_id: Optional[int] = None,
+                    status: Optional[str] = None, limit: Optional[int] = None,
+                    after: Optional[Tuple[str, int]] = None) -> pd.DataFrame:
+        """Retorna faturas com informações de cliente e veículo, mais recentes primeiro.
+        
+        Os filtros são aplicados no SQL; data_inicio/data_fim ('AAAA-MM-DD') limitam a
+        data de emissão (inclusive). Para paginar, passe em after o par (data_emissao, id)
+        da última linha da página anterior.
+        """
+        conditions = []
+        params: List[Any] = []
+        if data_inicio:
+            conditions.append("f.data_emissao >= ?")
+            params.append(str(data_inicio))
+        if data_fim:
+            conditions.append("f.data_emissao < date(?, '+1 day')")
+            params.append(str(data_fim))
+        if cliente_id is not None:
+            conditions.append("f.cliente_id = ?")
+            params.append(int(cliente_id))
+        if veiculo_id is not None:
+            conditions.append("f.veiculo_id = ?")
+            params.append(int(veiculo_id))
+        if status:
+            conditions.append("f.status = ?")
+            params.append(status)
+        if after is not None:
+            conditions.append("(f.data_emissao, f.id) < (?, ?)")
+            params.extend([after[0], int(after[1])])
+        
         query = """
             SELECT f.*, c.nome as cliente_nome, v.modelo as veiculo_modelo, v.placa as veiculo_placa
             FROM faturas f
             JOIN clientes c ON f.cliente_id = c.id
             JOIN veiculos v ON f.veiculo_id = v.id
-            ORDER BY f.data_emissao DESC
         """
-        return self.get_dataframe(query)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY f.data_emissao DESC, f.id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        return self.get_dataframe(query, tuple(params))
+    
+    def get_transacoes(self, data_inicio: Optional[str] = None, data_fim: Optional[str] = None,
+                       tipo: Optional[str] = None, categoria: Optional[str] = None,
+                       fatura_id: Optional[int] = None, limit: Optional[int] = None,
+                       after: Optional[Tuple[str, int]] = None) -> pd.DataFrame:
+        """Retorna transações, mais recentes primeiro, com filtros e paginação no SQL.
+        
+        after recebe o par (data_transacao, id) da última linha da página anterior.
+        """
+        conditions = []
+        params: List[Any] = []
+        if data_inicio:
+            conditions.append("data_transacao >= ?")
+            params.append(str(data_inicio))
+        if data_fim:
+            conditions.append("data_transacao <= ?")
+            params.append(str(data_fim))
+        if tipo:
+            conditions.append("tipo = ?")
+            params.append(tipo)
+        if categoria:
+            conditions.append("categoria = ?")
+            params.append(categoria)
+        if fatura_id is not None:
+            conditions.append("fatura_id = ?")
+            params.append(int(fatura_id))
+        if after is not None:
+            conditions.append("(data_transacao, id) < (?, ?)")
+            params.extend([after[0], int(after[1])])
+        
+        query = "SELECT * FROM transacoes"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY data_transacao DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        return self.get_dataframe(query, tuple(params))
+    
+    def get_dashboard_metrics(self) -> Dict[str, Any]:
+        """Retorna contagens e totais do Dashboard calculados no SQLite"""
+        result = self.execute_query("""
+            SELECT
+                (SELECT COUNT(*) FROM clientes WHERE ativo = 1),
+                (SELECT COUNT(*) FROM veiculos WHERE ativo = 1),
+                (SELECT COALESCE(SUM(faturas), 0) FROM resumo_faturas_mes),
+                (SELECT COALESCE(SUM(receita), 0) FROM resumo_faturas_mes)
+        """, fetch_one=True)
+        return {
+            'total_clientes': result[0],
+            'total_veiculos': result[1],
+            'total_faturas': result[2],
+            'receita_total': result[3],
+        }
+    
+    def get_receita_mensal(self) -> pd.DataFrame:
+        """Retorna a receita faturada agrupada por mês de emissão (AAAA-MM)"""
+        return self.get_dataframe("""
+            SELECT mes, receita as valor_total
+            FROM resumo_faturas_mes
+            WHERE faturas > 0
+            ORDER BY mes
+        """)
+    
+    def get_locacoes_por_modelo(self) -> pd.DataFrame:
+        """Retorna a quantidade de locações por modelo de veículo"""
+        return self.get_dataframe("""
+            SELECT v.modelo as veiculo_modelo, SUM(r.locacoes) as locacoes
+            FROM resumo_locacoes_veiculo r
+            JOIN veiculos v ON r.veiculo_id = v.id
+            GROUP BY v.modelo
+            HAVING SUM(r.locacoes) > 0
+            ORDER BY locacoes DESC
+        """)
+    
+    def get_periodos_locacao(self, data_inicio: Any, data_fim: Any) -> pd.DataFrame:
+        """Retorna os períodos de locação (faturas não canceladas) que tocam o intervalo.
+        
+        As datas vêm como dias desde 1970-01-01 (inteiros), prontas para as análises
+        vetorizadas de analytics.py sem conversão de texto no pandas.
+        """
+        return self.get_dataframe(f"""
+            SELECT f.veiculo_id,
+                   CAST(julianday(f.data_inicio) - 2440587.5 AS INTEGER) AS inicio,
+                   CAST(julianday(f.data_fim) - 2440587.5 AS INTEGER) AS fim,
+                   f.valor_total
+            FROM faturas f
+            WHERE {_OCUPACAO}
+        """, (str(data_inicio)[:10], str(data_fim)[:10]))
+    
+    def get_ultimas_faturas(self, limit: int = 10) -> pd.DataFrame:
+        """Retorna as N faturas emitidas mais recentemente"""
+        return self.get_faturas(limit=limit)
     
-    def get_transacoes(self) -> pd.DataFrame:
-        """Retorna todas as transações"""
-        return self.get_dataframe("SELECT * FROM transacoes ORDER BY data_transacao DESC")
+    def get_resumo_transacoes(self) -> pd.DataFrame:
+        """Retorna o total de transações por tipo (receita/despesa)"""
+        return self.get_dataframe("""
+            SELECT tipo, SUM(valor) as valor
+            FROM transacoes
+            GROUP BY tipo
+            ORDER BY tipo
+        """)
     
     def add_cliente(self, nome: str, cpf_cnpj: str, telefone: str = "", endereco: str = "", 
                    email: str = "", rua: str = "", numero: str = "", complemento: str = "", 
@@ -371,25 +1402,23 @@ class DatabaseManager:
     def add_fatura(self, numero_fatura: str, cliente_id: int, veiculo_id: int, 
                    data_inicio: str, data_fim: str, dias: int, valor_diaria: float, 
                    valor_total: float, observacoes: str = "", data_emissao: str = None) -> int:
-        """Adiciona uma nova fatura"""
-        if data_emissao is None:
-            # Se não especificada, usar a data atual
-            return self.execute_query(
-                """INSERT INTO faturas (numero_fatura, cliente_id, veiculo_id, data_inicio, 
-                                       data_fim, dias, valor_diaria, valor_total, observacoes) 
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                (numero_fatura, cliente_id, veiculo_id, data_inicio, data_fim, 
-                 dias, valor_diaria, valor_total, observacoes)
-            )
-        else:
-            # Usar a data de emissão especificada
-            return self.execute_query(
+        """Adiciona uma nova fatura (rejeita períodos que se sobrepõem a outra locação do veículo)"""
+        with self.transaction() as conn:
+            # A verificação e o INSERT ficam sob a mesma trava de escrita
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            self._check_disponibilidade(conn, veiculo_id, data_inicio, data_fim)
+            
+            # Sem data de emissão informada, usa a data atual
+            fatura_id = conn.execute(
                 """INSERT INTO faturas (numero_fatura, cliente_id, veiculo_id, data_inicio, 
                                        data_fim, dias, valor_diaria, valor_total, observacoes, data_emissao) 
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))""",
                 (numero_fatura, cliente_id, veiculo_id, data_inicio, data_fim, 
                  dias, valor_diaria, valor_total, observacoes, data_emissao)
-            )
+            ).lastrowid
+            self._mark_written("faturas")
+        return fatura_id
     
     def add_transacao(self, tipo: str, descricao: str, valor: float, data_transacao: str, 
                      categoria: str = "", fatura_id: Optional[int] = None) -> int:
@@ -399,19 +1428,165 @@ class DatabaseManager:
             (fatura_id, tipo, descricao, valor, data_transacao, categoria)
         )
     
+    def _fetch_dict(self, conn: sqlite3.Connection, query: str, params: tuple = ()) -> Optional[Dict[str, Any]]:
+        """Executa a query e retorna a primeira linha como dicionário (colunas pelo cursor)"""
+        inicio = time.perf_counter()
+        cursor = conn.execute(query, params)
+        row = cursor.fetchone()
+        self.monitor.record(query, time.perf_counter() - inicio, int(row is not None), conn, params)
+        if row is None:
+            return None
+        return dict(zip([column[0] for column in cursor.description], row))
+    
+    def _fetch_dicts(self, conn: sqlite3.Connection, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        """Executa a query e retorna todas as linhas como dicionários (colunas pelo cursor)"""
+        inicio = time.perf_counter()
+        cursor = conn.execute(query, params)
+        rows = cursor.fetchall()
+        self.monitor.record(query, time.perf_counter() - inicio, len(rows), conn, params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in rows]
+    
+    def _fetch_by_ids(self, conn: sqlite3.Connection, table: str, ids: set) -> Dict[int, Dict[str, Any]]:
+        """Linhas completas (SELECT *) de clientes ou veículos pelo ID"""
+        if not ids:
+            return {}
+        return {row['id']: row for row in self._fetch_dicts(
+            conn, f"SELECT * FROM {table} WHERE id IN ({','.join('?' * len(ids))})", tuple(ids)
+        )}
+    
     def get_cliente_by_id(self, cliente_id: int) -> Optional[Dict[str, Any]]:
         """Retorna um cliente pelo ID"""
-        result = self.execute_query("SELECT * FROM clientes WHERE id = ?", (cliente_id,), fetch_one=True)
-        if result:
-            columns = ['id', 'nome', 'cpf_cnpj', 'telefone', 'endereco', 'rua', 'numero', 
-                      'complemento', 'bairro', 'cidade', 'uf', 'cep', 'email', 'data_cadastro', 'ativo']
-            return dict(zip(columns, result))
-        return None
+        with self.transaction() as conn:
+            return self._fetch_dict(conn, "SELECT * FROM clientes WHERE id = ?", (cliente_id,))
     
     def get_veiculo_by_id(self, veiculo_id: int) -> Optional[Dict[str, Any]]:
         """Retorna um veículo pelo ID"""
-        result = self.execute_query("SELECT * FROM veiculos WHERE id = ?", (veiculo_id,), fetch_one=True)
-        if result:
-            columns = ['id', 'modelo', 'placa', 'ano', 'cor', 'valor_diaria', 'disponivel', 'data_cadastro', 'ativo']
-            return dict(zip(columns, result))
-        return None
\ No newline at end of file
+        with self.transaction() as conn:
+            return self._fetch_dict(conn, "SELECT * FROM veiculos WHERE id = ?", (veiculo_id,))
+    
+    def issue_invoice(self, numero_fatura: Optional[str], cliente_id: int, veiculo_id: int,
+                      data_inicio: str, data_fim: str, dias: int, valor_diaria: float,
+                      valor_total: float, observacoes: str = "", data_emissao: Optional[str] = None,
+                      data_transacao: Optional[str] = None) -> Dict[str, Any]:
+        """Emite uma fatura completa em uma única transação (um único commit).
+        
+        Valida o número, grava a fatura, avança a sequência de numeração e registra a
+        receita correspondente; se qualquer passo falhar nada é gravado. Com
+        numero_fatura=None o próximo número é alocado dentro da própria transação.
+        Retorna um dicionário com fatura_id, transacao_id e os dados de fatura,
+        cliente e veículo usados no PDF.
+        """
+        if numero_fatura is not None:
+            numero_fatura = str(numero_fatura).strip()
+        if data_transacao is None:
+            data_transacao = datetime.now().strftime('%Y-%m-%d')
+        
+        with self.transaction() as conn:
+            # Trava de escrita desde o início: a validação e a gravação não se intercalam
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            
+            if numero_fatura is None:
+                numero_fatura = f"{self._allocate_invoice_numbers(conn, 1)[0]:06d}"
+            
+            if conn.execute("SELECT 1 FROM faturas WHERE numero_fatura = ?", (numero_fatura,)).fetchone():
+                raise FaturaDuplicadaError(f"Número de fatura {numero_fatura} já existe")
+            
+            cliente = self._fetch_dict(conn, "SELECT * FROM clientes WHERE id = ?", (cliente_id,))
+            veiculo = self._fetch_dict(conn, "SELECT * FROM veiculos WHERE id = ?", (veiculo_id,))
+            if cliente is None:
+                raise ValueError(f"Cliente {cliente_id} não encontrado")
+            if veiculo is None:
+                raise ValueError(f"Veículo {veiculo_id} não encontrado")
+            self._check_disponibilidade(conn, veiculo_id, data_inicio, data_fim)
+            
+            fatura_id = conn.execute(
+                """INSERT INTO faturas (numero_fatura, cliente_id, veiculo_id, data_inicio, data_fim,
+                                       dias, valor_diaria, valor_total, observacoes, data_emissao)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))""",
+                (numero_fatura, cliente_id, veiculo_id, data_inicio, data_fim,
+                 dias, valor_diaria, valor_total, observacoes, data_emissao)
+            ).lastrowid
+            
+            # Atualizar o último número de fatura se o informado for maior que o atual
+            if numero_fatura.isdigit():
+                conn.execute(
+                    """UPDATE configuracoes SET valor = ?, data_atualizacao = CURRENT_TIMESTAMP
+                       WHERE chave = 'ultimo_numero_fatura' AND CAST(valor AS INTEGER) < ?""",
+                    (str(int(numero_fatura)), int(numero_fatura))
+                )
+                conn.execute("DELETE FROM numeros_fatura_livres WHERE numero = ?", (int(numero_fatura),))
+                conn.execute("DELETE FROM numeros_fatura_reservados WHERE numero = ?", (int(numero_fatura),))
+            
+            transacao_id = conn.execute(
+                """INSERT INTO transacoes (fatura_id, tipo, descricao, valor, data_transacao, categoria)
+                   VALUES (?, 'receita', ?, ?, ?, 'Locação')""",
+                (fatura_id, f"Locação Mensal - {veiculo['modelo']} - {veiculo['placa']}",
+                 valor_total, data_transacao)
+            ).lastrowid
+            
+            if data_emissao is None:
+                data_emissao = conn.execute("SELECT data_emissao FROM faturas WHERE id = ?",
+                                            (fatura_id,)).fetchone()[0]
+            
+            self._mark_written("faturas", "transacoes", "configuracoes", "numeros_fatura_livres",
+                               "numeros_fatura_reservados")
+        
+        logger.info(f"Fatura {numero_fatura} emitida (id {fatura_id})")
+        return {
+            'fatura_id': fatura_id,
+            'transacao_id': transacao_id,
+            'cliente': cliente,
+            'veiculo': veiculo,
+            'fatura': {
+                'numero_fatura': numero_fatura,
+                'data_inicio': data_inicio,
+                'data_fim': data_fim,
+                'dias': dias,
+                'valor_diaria': valor_diaria,
+                'valor_total': valor_total,
+                'observacoes': observacoes,
+                'data_emissao': str(data_emissao)[:10],
+            },
+        }
+    
+    def get_faturas_locacao_ids(self, data_inicio: Any, data_fim: Any) -> List[int]:
+        """IDs das faturas não canceladas cuja locação toca o intervalo (ex.: locações ativas no mês)"""
+        rows = self.execute_query(
+            f"SELECT f.id FROM faturas f WHERE {_OCUPACAO} ORDER BY f.id",
+            (str(data_inicio)[:10], str(data_fim)[:10]), fetch_all=True
+        )
+        return [row[0] for row in rows]
+    
+    def get_invoice_documents(self, fatura_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Dados de fatura, cliente e veículo usados no PDF, por ID de fatura.
+        
+        Cada item tem o formato devolvido por issue_invoice (fatura_id, fatura, cliente,
+        veiculo); IDs inexistentes ficam de fora. Clientes e veículos são lidos uma única
+        vez por lote, em consultas IN de até 500 IDs.
+        """
+        documentos: Dict[int, Dict[str, Any]] = {}
+        with self.transaction() as conn:
+            for inicio in range(0, len(fatura_ids), 500):
+                bloco = [int(fatura_id) for fatura_id in fatura_ids[inicio:inicio + 500]]
+                marcadores = ",".join("?" * len(bloco))
+                faturas = self._fetch_dicts(conn, f"""
+                    SELECT id, cliente_id, veiculo_id, numero_fatura, data_inicio, data_fim, dias,
+                           valor_diaria, valor_total, observacoes, data_emissao
+                    FROM faturas WHERE id IN ({marcadores})
+                """, tuple(bloco))
+                clientes = self._fetch_by_ids(conn, "clientes", {f['cliente_id'] for f in faturas})
+                veiculos = self._fetch_by_ids(conn, "veiculos", {f['veiculo_id'] for f in faturas})
+                for fatura in faturas:
+                    fatura_id = fatura.pop('id')
+                    cliente_id, veiculo_id = fatura.pop('cliente_id'), fatura.pop('veiculo_id')
+                    fatura['observacoes'] = fatura['observacoes'] or ""
+                    fatura['data_emissao'] = str(fatura['data_emissao'])[:10]
+                    documentos[fatura_id] = {
+                        'fatura_id': fatura_id,
+                        'cliente': clientes[cliente_id],
+                        'veiculo': veiculos[veiculo_id],
+                        'fatura': fatura,
+                    }
+        return documentos
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Formatação de valores para exibição (moeda, CPF/CNPJ e telefone)
+Versões escalares para valores avulsos e versões vetorizadas para colunas inteiras,
+com a mesma saída; pandas e NumPy só são importados pelas versões vetorizadas
+"""
+
+import re
+
+# Acima deste valor absoluto o produto por 100 perde precisão para decidir o arredondamento
+_MAIOR_VALOR_VETORIZADO = 1e11
+
+
+def format_currency(value):
+    """Formata valor como moeda brasileira"""
+    return f"R$ {value:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+
+
+def format_cpf_cnpj(doc):
+    """Formata CPF ou CNPJ"""
+    doc = re.sub(r'\D', '', str(doc))
+    if len(doc) == 11:  # CPF
+        return f"{doc[:3]}.{doc[3:6]}.{doc[6:9]}-{doc[9:]}"
+    elif len(doc) == 14:  # CNPJ
+        return f"{doc[:2]}.{doc[2:5]}.{doc[5:8]}/{doc[8:12]}-{doc[12:]}"
+    return doc
+
+
+def format_phone(phone):
+    """Formata telefone"""
+    phone = re.sub(r'\D', '', str(phone))
+    if len(phone) == 11:
+        return f"({phone[:2]}) {phone[2:7]}-{phone[7:]}"
+    elif len(phone) == 10:
+        return f"({phone[:2]}) {phone[2:6]}-{phone[6:]}"
+    return phone
+
+
+def format_currency_series(values):
+    """Formata uma coluna numérica como moeda brasileira (mesma saída de format_currency).
+
+    Os caracteres de cada linha são montados numa matriz de códigos Unicode (dígitos por
+    divisão inteira, pontos de milhar a cada 3 dígitos) vista ao final como um array de
+    textos de largura fixa. Valores cujo arredondamento fica ambíguo nessa conta (terceira
+    casa muito perto de 5, não finitos ou muito grandes) são formatados por format_currency.
+    """
+    import numpy as np
+    import pandas as pd
+
+    numeros = pd.to_numeric(values).to_numpy(dtype=np.float64)
+    escalados = np.abs(numeros) * 100
+    with np.errstate(invalid="ignore"):
+        ambiguos = ~(np.abs(numeros) < _MAIOR_VALOR_VETORIZADO) | (np.abs(escalados % 1 - 0.5) < 1e-6)
+    centavos = np.where(ambiguos, 0, np.round(escalados)).astype(np.int64)
+    inteiros = centavos // 100
+
+    maximo = len(str(int(inteiros.max()))) if len(inteiros) else 1
+    digitos = np.searchsorted(10 ** np.arange(1, maximo, dtype=np.int64), inteiros, side="right") + 1
+    sinal = np.signbit(numeros)
+    # Coluna do último dígito inteiro: "R$ ", o sinal, os dígitos e os pontos de milhar
+    ultimo = 3 + sinal + digitos + (digitos - 1) // 3 - 1
+    largura = 3 + 1 + maximo + (maximo - 1) // 3 + 3
+
+    # Colunas não preenchidas ficam com o caractere nulo, descartado pelo tipo de texto do NumPy
+    caracteres = np.zeros((len(numeros), largura), dtype=np.uint32)
+    caracteres[:, :3] = [ord("R"), ord("$"), ord(" ")]
+    caracteres[sinal, 3] = ord("-")
+    linhas = np.arange(len(numeros))
+    resto = inteiros.copy()
+    for posicao in range(maximo):
+        ativas = posicao < digitos
+        coluna = ultimo[ativas] - (posicao + posicao // 3)
+        caracteres[linhas[ativas], coluna] = ord("0") + resto[ativas] % 10
+        if posicao and posicao % 3 == 0:
+            caracteres[linhas[ativas], coluna + 1] = ord(".")
+        resto //= 10
+    caracteres[linhas, ultimo + 1] = ord(",")
+    caracteres[linhas, ultimo + 2] = ord("0") + centavos // 10 % 10
+    caracteres[linhas, ultimo + 3] = ord("0") + centavos % 10
+
+    resultado = pd.Series(caracteres.view(f"U{largura}").ravel(), index=values.index)
+    if ambiguos.any():
+        resultado[ambiguos] = [format_currency(valor) for valor in numeros[ambiguos]]
+    return resultado
+
+
+def _digitos(values):
+    """Texto de cada valor (como str()) só com os dígitos, e a máscara dos que ficam com a versão escalar"""
+    texto = values.astype(object).astype(str)
+    # \D do Python também descarta dígitos Unicode: valores não ASCII ficam com a versão escalar,
+    # assim como os nulos que o pandas 3 mantém nulos no texto (str.isascii só existe no pandas 3)
+    return (texto.str.replace(r"[^0-9]", "", regex=True),
+            texto.str.contains(r"[^\x00-\x7f]", regex=True, na=True))
+
+
+def _por_valor(resultado, values, nao_ascii, formatar):
+    """Aplica a versão escalar às linhas que a vetorizada não reproduz"""
+    if nao_ascii.any():
+        resultado = resultado.where(~nao_ascii, values[nao_ascii].map(formatar))
+    return resultado
+
+
+def format_cpf_cnpj_series(values):
+    """Formata uma coluna de CPF/CNPJ (mesma saída de format_cpf_cnpj)"""
+    digitos, nao_ascii = _digitos(values)
+    tamanho = digitos.str.len()
+
+    cpf = digitos[tamanho == 11]
+    cnpj = digitos[tamanho == 14]
+    resultado = digitos.where(tamanho != 11, cpf.str.slice(0, 3) + "." + cpf.str.slice(3, 6) + "."
+                              + cpf.str.slice(6, 9) + "-" + cpf.str.slice(9))
+    resultado = resultado.where(tamanho != 14, cnpj.str.slice(0, 2) + "." + cnpj.str.slice(2, 5) + "."
+                                + cnpj.str.slice(5, 8) + "/" + cnpj.str.slice(8, 12) + "-" + cnpj.str.slice(12))
+    return _por_valor(resultado, values, nao_ascii, format_cpf_cnpj)
+
+
+def format_phone_series(values):
+    """Formata uma coluna de telefones (mesma saída de format_phone)"""
+    digitos, nao_ascii = _digitos(values)
+    tamanho = digitos.str.len()
+
+    celular = digitos[tamanho == 11]
+    fixo = digitos[tamanho == 10]
+    resultado = digitos.where(tamanho != 11, "(" + celular.str.slice(0, 2) + ") " + celular.str.slice(2, 7)
+                              + "-" + celular.str.slice(7))
+    resultado = resultado.where(tamanho != 10, "(" + fixo.str.slice(0, 2) + ") " + fixo.str.slice(2, 6)
+                                + "-" + fixo.str.slice(6))
+    return _por_valor(resultado, values, nao_ascii, format_phone)
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gerador de dados sintéticos do LocAuto
+Preenche o banco com clientes, veículos, faturas e transações em escala configurável,
+de forma reproduzível (mesma semente, mesmos dados): testes de carga, benchmarks e demonstrações.
+Uso: python gerador_dados.py [--banco locauto.db] [--escala media] [--clientes N] [--veiculos N] [--anos N]
+     [--semente N] [--ate AAAA-MM-DD]
+"""
+
+import argparse
+import logging
+import random
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Escalas prontas; valores passados explicitamente têm precedência
+ESCALAS = {
+    "pequena": {"clientes": 50, "veiculos": 10, "anos": 1},
+    "media": {"clientes": 2000, "veiculos": 150, "anos": 3},
+    "grande": {"clientes": 50000, "veiculos": 2000, "anos": 5},
+}
+
+NOMES = ["ANA", "ALINE", "BRUNO", "CARLOS", "CELSO", "DANIELA", "EDUARDO", "FERNANDA", "GABRIEL", "HELENA",
+         "JOAO", "JOSE", "JULIANA", "LUCAS", "MARCOS", "MARIA", "NAILTON", "PATRICIA", "RAFAEL", "SILVIA"]
+SOBRENOMES = ["ALVES", "BISPO", "CUNHA", "DE MELO", "DE OLIVEIRA", "FERREIRA", "GOMES", "LIMA", "MORAIS",
+              "PEREIRA", "RIBEIRO", "ROCHA", "SANTOS", "SILVA", "SOUZA"]
+RAMOS = ["SOLUCOES AGRICOLAS", "TRANSPORTES", "CONSTRUTORA", "COMERCIO DE CAFE", "SERVICOS MEDICOS", "LATICINIOS"]
+RUAS = ["RUA LIBRA", "RUA LUIZ CARLOS OLIVEIRA", "AVENIDA JUCA STOCKLER", "RUA DOS ANDRADAS", "RODOVIA MG-050",
+        "RUA SANTA CASA", "AVENIDA COMENDADOR FRANCISCO AVELINO MAIA"]
+BAIRROS = ["CENTRO", "JARDIM CIDADE", "SERRA VERDE", "BELO HORIZONTE", "NOVO MUNDO", "SAO BENEDITO"]
+CIDADES = [("PASSOS", "379"), ("ITAU DE MINAS", "379"), ("SAO SEBASTIAO DO PARAISO", "379"),
+           ("FORMIGA", "355"), ("FRANCA", "144"), ("RIBEIRAO PRETO", "140")]
+MODELOS = [("ARGO", 80), ("FORD KA", 70), ("HB20", 80), ("LOGAN", 80), ("MOBI", 70), ("NOVO UNO", 70),
+           ("ONIX LT", 85), ("SPIN", 110), ("STRADA", 120), ("KWID", 65)]
+CORES = ["BRANCO", "BRANCO", "BRANCO", "PRATA", "PRETO", "CINZA", "VERMELHO"]
+
+# Duração das locações (dias) e peso de cada uma: a locação mensal é a mais comum
+DURACOES = [30, 15, 7, 3]
+PESOS_DURACAO = [60, 15, 15, 10]
+
+# Despesas por veículo: (descrição, categoria, probabilidade no mês, valor mínimo, valor máximo)
+DESPESAS = [
+    ("Manutenção preventiva", "Manutenção", 0.25, 150.0, 900.0),
+    ("Troca de pneus", "Manutenção", 0.03, 900.0, 2400.0),
+    ("Seguro do veículo", "Seguro", 1.0, 120.0, 260.0),
+    ("Lavagem e higienização", "Limpeza", 0.5, 40.0, 90.0),
+]
+
+
+def _digito_verificador(base: str, pesos: List[int]) -> str:
+    """Dígito verificador de CPF/CNPJ (módulo 11)"""
+    resto = sum(int(digito) * peso for digito, peso in zip(base, pesos)) % 11
+    return "0" if resto < 2 else str(11 - resto)
+
+
+def gerar_cpf(numero: int) -> str:
+    """CPF válido e formatado a partir de um número (números distintos, CPFs distintos)"""
+    base = f"{numero % 10 ** 9:09d}"
+    base += _digito_verificador(base, list(range(10, 1, -1)))
+    base += _digito_verificador(base, list(range(11, 1, -1)))
+    return f"{base[:3]}.{base[3:6]}.{base[6:9]}-{base[9:]}"
+
+
+def gerar_cnpj(numero: int) -> str:
+    """CNPJ válido e formatado (matriz 0001) a partir de um número"""
+    base = f"{numero % 10 ** 8:08d}0001"
+    base += _digito_verificador(base, [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+    base += _digito_verificador(base, [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+    return f"{base[:2]}.{base[2:5]}.{base[5:8]}/{base[8:12]}-{base[12:]}"
+
+
+def gerar_placa(numero: int) -> str:
+    """Placa no padrão Mercosul (LLLNLNN) a partir de um número (até 45 milhões distintas)"""
+    numero, finais = divmod(numero, 100)
+    numero, letra = divmod(numero, 26)
+    numero, digito = divmod(numero, 10)
+    letras = ""
+    for _ in range(3):
+        numero, resto = divmod(numero, 26)
+        letras = chr(65 + resto) + letras
+    return f"{letras}{digito}{chr(65 + letra)}{finais:02d}"
+
+
+def _embaralhar(indice: int, semente: int, modulo: int) -> int:
+    """Permutação de 0..modulo-1 (multiplicação por primo): documentos e placas sem sequência aparente"""
+    return (indice * 2654435761 + semente * 97) % modulo
+
+
+def _data_hora(rnd: random.Random, dia: date) -> str:
+    """Data com um horário comercial aleatório, no formato gravado pelo SQLite"""
+    return f"{dia.isoformat()} {rnd.randint(8, 17):02d}:{rnd.randint(0, 59):02d}:{rnd.randint(0, 59):02d}"
+
+
+def gerar_clientes(rnd: random.Random, quantidade: int, primeiro: int, semente: int,
+                   inicio: date, fim: date) -> List[tuple]:
+    """Clientes pessoa física (85%) e jurídica, com endereço no formato do cadastro do app"""
+    linhas = []
+    dias = (fim - inicio).days
+    for i in range(primeiro, primeiro + quantidade):
+        if rnd.random() < 0.15:
+            nome = f"{rnd.choice(SOBRENOMES)} {rnd.choice(RAMOS)} LTDA"
+            documento = gerar_cnpj(_embaralhar(i, semente, 10 ** 8))
+        else:
+            nome = f"{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)}"
+            documento = gerar_cpf(_embaralhar(i, semente, 10 ** 9))
+        telefone = f"(35) 9{rnd.randint(8000, 9999)}-{rnd.randint(0, 9999):04d}" if rnd.random() < 0.9 else ""
+        rua, numero, bairro = rnd.choice(RUAS), str(rnd.randint(1, 2000)), rnd.choice(BAIRROS)
+        cidade, prefixo_cep = rnd.choice(CIDADES)
+        cep = f"{prefixo_cep}{rnd.randint(0, 99999):05d}"
+        complemento = rnd.choice(["", "", "", "AP", "CASA 2", "SALA 3"])
+        endereco = f"{rua}, {numero}{', ' + complemento if complemento else ''}, {bairro}, {cidade} - MG, CEP: {cep}"
+        email = f"cliente{i}@exemplo.com.br" if rnd.random() < 0.4 else ""
+        cadastro = _data_hora(rnd, inicio + timedelta(days=rnd.randrange(max(dias, 1))))
+        linhas.append((nome, documento, telefone, endereco, rua, numero, complemento, bairro,
+                       cidade, "MG", cep, email, cadastro))
+    return linhas
+
+
+def gerar_veiculos(rnd: random.Random, quantidade: int, primeiro: int, semente: int,
+                   inicio: date) -> List[tuple]:
+    """Veículos populares com diária conforme o modelo, cadastrados antes do início do histórico"""
+    linhas = []
+    for i in range(primeiro, primeiro + quantidade):
+        modelo, diaria = rnd.choice(MODELOS)
+        cadastro = _data_hora(rnd, inicio - timedelta(days=rnd.randint(0, 60)))
+        linhas.append((modelo, gerar_placa(_embaralhar(i, semente, 26 ** 4 * 10 * 100)),
+                       rnd.randint(inicio.year - 8, inicio.year), rnd.choice(CORES), float(diaria), cadastro))
+    return linhas
+
+
+def gerar_locacoes(rnd: random.Random, veiculos: List[tuple], inicio: date,
+                   fim: date) -> List[Dict[str, Any]]:
+    """Locações sem sobreposição por veículo, de `inicio` até pouco depois de `fim`.
+
+    `veiculos`: (id, modelo, placa, valor_diaria). Parte das locações mais recentes ainda está
+    em andamento em `fim`; cerca de 2% são canceladas (sem receita).
+    """
+    locacoes = []
+    for veiculo_id, modelo, placa, diaria in veiculos:
+        dia = inicio + timedelta(days=rnd.randint(0, 20))
+        while dia <= fim:
+            dias = rnd.choices(DURACOES, PESOS_DURACAO)[0]
+            termino = dia + timedelta(days=dias - 1)
+            # Locação mensal com preço fechado (múltiplo de R$ 50), as demais pela diária
+            valor_total = round(diaria * dias * 0.9 / 50) * 50.0 if dias == 30 else diaria * dias
+            locacoes.append({
+                "veiculo_id": veiculo_id, "modelo": modelo, "placa": placa,
+                "data_inicio": dia.isoformat(), "data_fim": termino.isoformat(), "dias": dias,
+                "valor_diaria": round(valor_total / dias, 2), "valor_total": valor_total,
+                "data_emissao": _data_hora(rnd, dia),
+                "status": "cancelada" if rnd.random() < 0.02 else "ativa",
+            })
+            # Intervalo até a próxima locação (às vezes emendada, às vezes parado por semanas)
+            dia = termino + timedelta(days=1 + int(rnd.expovariate(1 / 6)))
+    return locacoes
+
+
+def gerar_despesas(rnd: random.Random, veiculos: List[tuple], inicio: date, fim: date) -> List[tuple]:
+    """Despesas mensais por veículo (manutenção, seguro, limpeza) e IPVA em janeiro"""
+    linhas = []
+    for veiculo_id, modelo, placa, diaria in veiculos:
+        mes = date(inicio.year, inicio.month, 1)
+        while mes <= fim:
+            for descricao, categoria, probabilidade, minimo, maximo in DESPESAS:
+                if rnd.random() < probabilidade:
+                    dia = mes + timedelta(days=rnd.randint(0, 27))
+                    linhas.append(("despesa", f"{descricao} - {modelo} - {placa}",
+                                   round(rnd.uniform(minimo, maximo), 2), dia.isoformat(), categoria))
+            if mes.month == 1:
+                linhas.append(("despesa", f"IPVA - {modelo} - {placa}", round(diaria * 12, 2),
+                               (mes + timedelta(days=14)).isoformat(), "Impostos"))
+            mes = date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+    return linhas
+
+
+def gerar_dados(db, clientes: int = 500, veiculos: int = 50, anos: int = 3, semente: int = 42,
+                fim: Optional[date] = None) -> Dict[str, int]:
+    """Gera e grava dados sintéticos em uma única transação; retorna as contagens por tabela.
+
+    Os dados são acrescentados aos existentes (documentos, placas e números de fatura
+    continuam a partir do que já está no banco) e a sequência de numeração de faturas é
+    avançada. Com a mesma semente e o mesmo banco inicial os dados gerados são idênticos.
+    """
+    rnd = random.Random(semente)
+    fim = fim or date.today()
+    inicio = fim - timedelta(days=365 * anos)
+
+    with db.transaction() as conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        primeiro_cliente = conn.execute("SELECT IFNULL(MAX(id), 0) + 1 FROM clientes").fetchone()[0]
+        primeiro_veiculo = conn.execute("SELECT IFNULL(MAX(id), 0) + 1 FROM veiculos").fetchone()[0]
+
+        conn.executemany(
+            """INSERT INTO clientes (nome, cpf_cnpj, telefone, endereco, rua, numero, complemento,
+                                    bairro, cidade, uf, cep, email, data_cadastro)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            gerar_clientes(rnd, clientes, primeiro_cliente, semente, inicio, fim)
+        )
+        conn.executemany(
+            "INSERT INTO veiculos (modelo, placa, ano, cor, valor_diaria, data_cadastro) VALUES (?, ?, ?, ?, ?, ?)",
+            gerar_veiculos(rnd, veiculos, primeiro_veiculo, semente, inicio)
+        )
+        ids_clientes = [linha[0] for linha in conn.execute(
+            "SELECT id FROM clientes WHERE id >= ? ORDER BY id", (primeiro_cliente,))]
+        frota = conn.execute("SELECT id, modelo, placa, valor_diaria FROM veiculos WHERE id >= ? ORDER BY id",
+                             (primeiro_veiculo,)).fetchall()
+
+        # Faturas numeradas na ordem de emissão, a partir da sequência atual
+        locacoes = sorted(gerar_locacoes(rnd, frota, inicio, fim), key=lambda locacao: locacao["data_emissao"])
+        ultimo_numero = conn.execute(
+            "SELECT CAST(valor AS INTEGER) FROM configuracoes WHERE chave = 'ultimo_numero_fatura'"
+        ).fetchone()[0]
+        faturas = [
+            (f"{ultimo_numero + i + 1:06d}", rnd.choice(ids_clientes) if ids_clientes else 1,
+             locacao["veiculo_id"], locacao["data_inicio"], locacao["data_fim"], locacao["dias"],
+             locacao["valor_diaria"], locacao["valor_total"], locacao["data_emissao"], locacao["status"])
+            for i, locacao in enumerate(locacoes)
+        ]
+        primeira_fatura = conn.execute("SELECT IFNULL(MAX(id), 0) + 1 FROM faturas").fetchone()[0]
+        conn.executemany(
+            """INSERT INTO faturas (numero_fatura, cliente_id, veiculo_id, data_inicio, data_fim,
+                                   dias, valor_diaria, valor_total, data_emissao, status)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", faturas
+        )
+        if faturas:
+            conn.execute(
+                """UPDATE configuracoes SET valor = ?, data_atualizacao = CURRENT_TIMESTAMP
+                   WHERE chave = 'ultimo_numero_fatura'""", (str(ultimo_numero + len(faturas)),)
+            )
+
+        # Receita de cada fatura não cancelada, como em issue_invoice, e as despesas da frota
+        receitas = [
+            (fatura_id, f"Locação Mensal - {modelo} - {placa}", valor_total, data_emissao[:10])
+            for fatura_id, modelo, placa, valor_total, data_emissao in conn.execute(
+                """SELECT f.id, v.modelo, v.placa, f.valor_total, f.data_emissao
+                   FROM faturas f JOIN veiculos v ON v.id = f.veiculo_id
+                   WHERE f.id >= ? AND f.status <> 'cancelada' ORDER BY f.id""", (primeira_fatura,))
+        ]
+        conn.executemany(
+            """INSERT INTO transacoes (fatura_id, tipo, descricao, valor, data_transacao, categoria)
+               VALUES (?, 'receita', ?, ?, ?, 'Locação')""", receitas
+        )
+        despesas = gerar_despesas(rnd, frota, inicio, fim)
+        conn.executemany(
+            "INSERT INTO transacoes (tipo, descricao, valor, data_transacao, categoria) VALUES (?, ?, ?, ?, ?)",
+            despesas
+        )
+        db._mark_written("clientes", "veiculos", "faturas", "transacoes", "configuracoes")
+
+    # Estatísticas do planejador atualizadas para o novo volume
+    with db.pool.connection() as conn:
+        conn.execute("ANALYZE")
+
+    contagens = {"clientes": clientes, "veiculos": veiculos, "faturas": len(faturas),
+                 "transacoes": len(receitas) + len(despesas)}
+    logger.info(f"Dados sintéticos gerados: {contagens}")
+    return contagens
+
+
+def main(argumentos=None) -> int:
+    parser = argparse.ArgumentParser(description="Preenche o banco do LocAuto com dados sintéticos")
+    parser.add_argument("--banco", default="locauto.db", help="arquivo do banco (padrão: locauto.db)")
+    parser.add_argument("--escala", choices=sorted(ESCALAS), default="media")
+    parser.add_argument("--clientes", type=int, help="quantidade de clientes (sobrepõe a escala)")
+    parser.add_argument("--veiculos", type=int, help="quantidade de veículos (sobrepõe a escala)")
+    parser.add_argument("--anos", type=int, help="anos de histórico de faturas (sobrepõe a escala)")
+    parser.add_argument("--semente", type=int, default=42, help="semente dos dados (padrão: 42)")
+    parser.add_argument("--ate", type=date.fromisoformat,
+                        help="último dia do histórico, AAAA-MM-DD (padrão: hoje); fixa os dados entre execuções")
+    args = parser.parse_args(argumentos)
+
+    from database_manager import DatabaseManager
+
+    parametros = dict(ESCALAS[args.escala])
+    for nome in ("clientes", "veiculos", "anos"):
+        if getattr(args, nome) is not None:
+            parametros[nome] = getattr(args, nome)
+
+    db = DatabaseManager(args.banco)
+    try:
+        print(f"🔄 Gerando dados sintéticos em {args.banco}: {parametros} (semente {args.semente})...")
+        inicio = datetime.now()
+        contagens = gerar_dados(db, semente=args.semente, fim=args.ate, **parametros)
+        duracao = (datetime.now() - inicio).total_seconds()
+        print(f"\n📊 Dados gerados em {duracao:.1f}s")
+        for tabela, quantidade in contagens.items():
+            print(f"   {tabela}: {quantidade}")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
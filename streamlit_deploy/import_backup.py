@@ -3,31 +3,14 @@
 """
 Script para importar dados de backup no banco de dados LocAuto
 Importa dados de veículos e clientes fornecidos pelo usuário
+ou mescla os dados de um backup: python import_backup.py backups/backup_locauto_*.db
 """
 
 import sqlite3
 import pandas as pd
 from io import StringIO
-import re
-from datetime import datetime
 
-def clean_currency(value):
-    """Remove formatação de moeda e converte para float"""
-    if pd.isna(value) or value == '':
-        return 0.0
-    # Remove R$, espaços e vírgulas, substitui vírgula por ponto
-    cleaned = str(value).replace('R$', '').replace(' ', '').replace(',', '.')
-    cleaned = re.sub(r'[^\d.]', '', cleaned)
-    try:
-        return float(cleaned)
-    except:
-        return 0.0
-
-def clean_text(value):
-    """Remove espaços extras do texto"""
-    if pd.isna(value) or value == '':
-        return ''
-    return str(value).strip()
+from bulk_import import importar_tabelas
 
 def import_backup_data():
     """Importa os dados de backup fornecidos pelo usuário"""
@@ -59,74 +42,18 @@ def import_backup_data():
         
         print("🔄 Iniciando importação dos dados de backup...")
         
-        # Processar dados de veículos
-        print("\n📋 Importando veículos...")
-        df_veiculos = pd.read_csv(StringIO(veiculos_data))
-        
-        for _, row in df_veiculos.iterrows():
-            # Limpar e processar dados
-            modelo = clean_text(row['modelo'])
-            placa = clean_text(row['placa'])
-            ano = int(row['ano']) if pd.notna(row['ano']) else 2020
-            cor = clean_text(row['cor'])
-            valor_diaria = clean_currency(row['valor_diaria'])
-            disponivel = int(row['disponivel']) if pd.notna(row['disponivel']) else 1
-            data_cadastro = row['data_cadastro'] if pd.notna(row['data_cadastro']) else datetime.now().isoformat()
-            ativo = int(row['ativo']) if pd.notna(row['ativo']) else 1
-            
-            # Verificar se veículo já existe
-            cursor.execute("SELECT id FROM veiculos WHERE placa = ?", (placa,))
-            if cursor.fetchone():
-                print(f"  ⚠️  Veículo {placa} já existe - pulando")
-                continue
-            
-            # Inserir veículo
-            cursor.execute("""
-                INSERT INTO veiculos (modelo, placa, ano, cor, valor_diaria, disponivel, data_cadastro, ativo)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (modelo, placa, ano, cor, valor_diaria, disponivel, data_cadastro, ativo))
-            
-            print(f"  ✅ Veículo adicionado: {modelo} - {placa}")
-        
-        # Processar dados de clientes
-        print("\n👥 Importando clientes...")
-        df_clientes = pd.read_csv(StringIO(clientes_data))
-        
-        for _, row in df_clientes.iterrows():
-            # Limpar e processar dados
-            nome = clean_text(row['nome'])
-            cpf_cnpj = clean_text(row['cpf_cnpj'])
-            telefone = clean_text(row['telefone'])
-            endereco = clean_text(row['endereco'])
-            rua = clean_text(row['rua'])
-            numero = clean_text(row['numero'])
-            complemento = clean_text(row['complemento'])
-            bairro = clean_text(row['bairro'])
-            cidade = clean_text(row['cidade'])
-            uf = clean_text(row['uf'])
-            cep = clean_text(row['cep'])
-            email = clean_text(row['email'])
-            data_cadastro = row['data_cadastro'] if pd.notna(row['data_cadastro']) else datetime.now().isoformat()
-            ativo = int(row['ativo']) if pd.notna(row['ativo']) else 1
-            
-            # Verificar se cliente já existe
-            cursor.execute("SELECT id FROM clientes WHERE cpf_cnpj = ?", (cpf_cnpj,))
-            if cursor.fetchone():
-                print(f"  ⚠️  Cliente {cpf_cnpj} já existe - pulando")
-                continue
-            
-            # Inserir cliente
-            cursor.execute("""
-                INSERT INTO clientes (nome, cpf_cnpj, telefone, endereco, rua, numero, complemento, 
-                                    bairro, cidade, uf, cep, email, data_cadastro, ativo)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (nome, cpf_cnpj, telefone, endereco, rua, numero, complemento, 
-                  bairro, cidade, uf, cep, email, data_cadastro, ativo))
-            
-            print(f"  ✅ Cliente adicionado: {nome}")
+        # Limpeza vetorizada e um executemany por tabela; registros já existentes
+        # (mesma placa ou CPF/CNPJ) são ignorados pelo ON CONFLICT
+        with conn:
+            resultado = importar_tabelas(conn, {
+                "veiculos": pd.read_csv(StringIO(veiculos_data)),
+                "clientes": pd.read_csv(StringIO(clientes_data)),
+            })
         
-        # Confirmar alterações
-        conn.commit()
+        print(f"\n📋 Veículos: {resultado['veiculos']['gravadas']} adicionados, "
+              f"{resultado['veiculos']['ignoradas']} já existentes")
+        print(f"👥 Clientes: {resultado['clientes']['gravadas']} adicionados, "
+              f"{resultado['clientes']['ignoradas']} já existentes")
         
         # Mostrar estatísticas finais
         cursor.execute("SELECT COUNT(*) FROM veiculos WHERE ativo = 1")
@@ -147,5 +74,29 @@ def import_backup_data():
             conn.rollback()
             conn.close()
 
+def import_from_backup(backup_path, db_path='locauto.db'):
+    """Mescla no banco os clientes, veículos, faturas e transações de um arquivo de backup"""
+    from database_manager import DatabaseManager
+    
+    db = DatabaseManager(db_path)
+    try:
+        print(f"🔄 Mesclando dados do backup {backup_path}...")
+        resultado = db.merge_from_backup(backup_path)
+        for tabela, contagem in resultado.items():
+            print(f"   {tabela}: {contagem['gravadas']} adicionados, {contagem['ignoradas']} já existentes")
+            if contagem.get('conflitos'):
+                print(f"   ⚠️ {contagem['conflitos']} faturas não mescladas: veículo já locado no período")
+        print("\n📊 Mesclagem concluída com sucesso!")
+        return resultado
+    finally:
+        db.close()
+
 if __name__ == "__main__":
-    import_backup_data()
\ No newline at end of file
+    import sys
+    
+    # python import_backup.py [backups/backup_locauto_AAAAMMDD_HHMMSS.db ...]
+    if len(sys.argv) > 1:
+        for caminho in sys.argv[1:]:
+            import_from_backup(caminho)
+    else:
+        import_backup_data()
\ No newline at end of file
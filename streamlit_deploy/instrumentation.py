@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Instrumentação de desempenho do LocAuto
+Histogramas de latência e de linhas por consulta e local de chamada, registro de consultas
+lentas com o plano de execução (EXPLAIN QUERY PLAN) e cronômetro das etapas de cada
+execução (rerun) das páginas
+"""
+
+import bisect
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Consultas lentas vão para um logger próprio (LOCAUTO_SLOW_QUERY_LOG grava também em arquivo)
+slow_logger = logging.getLogger(__name__ + ".consultas_lentas")
+
+# Consultas a partir deste tempo (ms) entram no registro de consultas lentas
+SLOW_QUERY_MS = float(os.environ.get("LOCAUTO_SLOW_QUERY_MS", "50"))
+SLOW_QUERY_LOG = os.environ.get("LOCAUTO_SLOW_QUERY_LOG")
+
+# Execuções de página a partir deste tempo (ms) são registradas no log com as etapas
+SLOW_RERUN_MS = float(os.environ.get("LOCAUTO_SLOW_RERUN_MS", "1000"))
+
+# Limites superiores (inclusivos) dos baldes dos histogramas
+LATENCY_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+
+# Consultas distintas acompanhadas; as demais são somadas em uma entrada única
+MAX_QUERIES = 500
+SLOW_QUERIES_KEPT = 50
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_NO_PLAN_PREFIXES = ("BEGIN", "COMMIT", "ROLLBACK", "PRAGMA", "ATTACH", "DETACH", "EXPLAIN")
+
+
+class Histogram:
+    """Histograma de baldes fixos com contagem, soma e máximo.
+
+    Os percentis são estimados por interpolação linear dentro do balde, como em
+    histogram_quantile do Prometheus; o máximo limita o último balde.
+    """
+
+    __slots__ = ("bounds", "counts", "count", "total", "max")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        """Valor estimado abaixo do qual está a fração q das observações"""
+        if not self.count:
+            return 0.0
+        alvo = q * self.count
+        acumulado = 0
+        for i, quantidade in enumerate(self.counts):
+            if quantidade and acumulado + quantidade >= alvo:
+                inferior = self.bounds[i - 1] if i else 0.0
+                superior = min(self.bounds[i] if i < len(self.bounds) else self.max, self.max)
+                return inferior + (max(superior, inferior) - inferior) * (alvo - acumulado) / quantidade
+            acumulado += quantidade
+        return self.max
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """Pares (limite, observações <= limite), terminando em +inf"""
+        pares, acumulado = [], 0
+        for limite, quantidade in zip(self.bounds + (float("inf"),), self.counts):
+            acumulado += quantidade
+            pares.append((limite, acumulado))
+        return pares
+
+
+class _QueryStats:
+    """Latência (ms) e linhas retornadas de uma consulta em um local de chamada"""
+
+    __slots__ = ("latency", "rows")
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS_MS)
+        self.rows = Histogram(ROW_BUCKETS)
+
+
+class QueryMonitor:
+    """Registra cada consulta executada: latência e linhas por (consulta, local de chamada).
+
+    O local de chamada é o método público do DatabaseManager usado e o primeiro quadro
+    da pilha fora dele (ex.: "get_faturas ← locauto.py:894 main"). Consultas acima de
+    slow_ms vão para o registro de consultas lentas com o plano de execução. Funções
+    em hooks recebem (consulta, local, duracao_s, linhas) a cada registro.
+    """
+
+    def __init__(self, internal_modules: Iterable[str] = (), plumbing: Iterable[str] = (),
+                 slow_ms: float = SLOW_QUERY_MS, slow_log: Optional[str] = SLOW_QUERY_LOG):
+        self.internal_modules = frozenset(internal_modules)
+        self.plumbing = frozenset(plumbing)
+        self.slow_ms = slow_ms
+        self.enabled = True
+        self.hooks: List[Callable[[str, str, float, int], None]] = []
+        self._stats: Dict[Tuple[str, str], _QueryStats] = {}
+        self._slow: deque = deque(maxlen=SLOW_QUERIES_KEPT)
+        self._normalized: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if slow_log:
+            _attach_file_handler(slow_log)
+
+    def normalize(self, sql: str) -> str:
+        """Texto da consulta em uma linha (espaços colapsados), memorizado por consulta"""
+        normalizada = self._normalized.get(sql)
+        if normalizada is None:
+            if len(self._normalized) >= MAX_QUERIES * 4:
+                self._normalized.clear()
+            normalizada = self._normalized[sql] = _WHITESPACE_RE.sub(" ", sql).strip()
+        return normalizada
+
+    def call_site(self) -> str:
+        """Método público do DatabaseManager chamado e o primeiro quadro da pilha fora dele"""
+        frame = sys._getframe(2)
+        metodo = None
+        while frame is not None and frame.f_globals.get("__name__") in self.internal_modules:
+            nome = frame.f_code.co_name
+            if not nome.startswith("_") and nome not in self.plumbing:
+                metodo = nome
+            frame = frame.f_back
+
+        if frame is None:
+            return metodo or "?"
+        local = f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+        return f"{metodo} ← {local}" if metodo else local
+
+    def record(self, sql: str, duracao_s: float, linhas: int,
+               conn: Optional[sqlite3.Connection] = None, params: Any = ()):
+        """Registra uma execução; chamado com a conexão ainda aberta (para o EXPLAIN)"""
+        if not self.enabled:
+            return
+        consulta = self.normalize(sql)
+        local = self.call_site()
+        ms = duracao_s * 1000
+
+        with self._lock:
+            stats = self._stats.get((consulta, local))
+            if stats is None:
+                if len(self._stats) >= MAX_QUERIES:
+                    consulta, local = "(outras consultas)", "(vários)"
+                stats = self._stats.setdefault((consulta, local), _QueryStats())
+            stats.latency.observe(ms)
+            stats.rows.observe(linhas)
+
+        # Totais da thread: o cronômetro da página separa o tempo gasto no SQLite
+        self._local.consultas = getattr(self._local, "consultas", 0) + 1
+        self._local.segundos = getattr(self._local, "segundos", 0.0) + duracao_s
+
+        if ms >= self.slow_ms:
+            self._record_slow(consulta, local, ms, linhas, conn, sql, params)
+        for hook in self.hooks:
+            hook(consulta, local, duracao_s, linhas)
+
+    def thread_totals(self) -> Tuple[int, float]:
+        """Consultas e segundos registrados até agora pela thread atual"""
+        return getattr(self._local, "consultas", 0), getattr(self._local, "segundos", 0.0)
+
+    def _record_slow(self, consulta, local, ms, linhas, conn, sql, params):
+        plano = explain(conn, sql, params) if conn is not None else "(plano indisponível)"
+        with self._lock:
+            self._slow.append({
+                "quando": datetime.now().isoformat(timespec="seconds"),
+                "duracao_ms": ms,
+                "linhas": linhas,
+                "local": local,
+                "consulta": consulta,
+                "plano": plano,
+            })
+        slow_logger.warning(f"Consulta lenta ({ms:.1f} ms, {linhas} linhas) em {local}: {consulta}\n{plano}")
+
+    def slow_queries(self) -> List[Dict[str, Any]]:
+        """Consultas lentas mais recentes primeiro"""
+        with self._lock:
+            return list(reversed(self._slow))
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Resumo por (consulta, local), das que mais somam tempo para as que menos somam"""
+        with self._lock:
+            itens = list(self._stats.items())
+            resumo = [{
+                "consulta": consulta,
+                "local": local,
+                "chamadas": stats.latency.count,
+                "total_ms": stats.latency.total,
+                "media_ms": stats.latency.total / stats.latency.count,
+                "p50_ms": stats.latency.percentile(0.5),
+                "p95_ms": stats.latency.percentile(0.95),
+                "p99_ms": stats.latency.percentile(0.99),
+                "max_ms": stats.latency.max,
+                "linhas": int(stats.rows.total),
+                "linhas_max": int(stats.rows.max),
+            } for (consulta, local), stats in itens]
+        return sorted(resumo, key=lambda item: item["total_ms"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._slow.clear()
+
+
+def explain(conn: sqlite3.Connection, sql: str, params: Any = ()) -> str:
+    """Plano de execução (EXPLAIN QUERY PLAN) em árvore indentada"""
+    if sql.lstrip().upper().startswith(_NO_PLAN_PREFIXES):
+        return "(sem plano de execução)"
+    try:
+        linhas = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    except sqlite3.Error as e:
+        return f"(plano indisponível: {e})"
+
+    # Linhas (id, pai, não usado, detalhe): a profundidade vem do nó pai
+    profundidade, texto = {0: 0}, []
+    for id_, pai, _, detalhe in linhas:
+        profundidade[id_] = profundidade.get(pai, 0) + 1
+        texto.append("  " * profundidade[id_] + detalhe)
+    return "\n".join(texto)
+
+
+def _attach_file_handler(caminho: str):
+    """Grava o registro de consultas lentas também em arquivo (uma única vez por caminho)"""
+    caminho = os.path.abspath(caminho)
+    if any(getattr(handler, "baseFilename", None) == caminho for handler in slow_logger.handlers):
+        return
+    handler = logging.FileHandler(caminho, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    slow_logger.addHandler(handler)
+
+
+class RenderTimer:
+    """Cronômetro das etapas de uma execução de página.
+
+    mark(etapa) atribui à etapa o tempo desde a marca anterior, menos o tempo gasto no
+    SQLite nesse intervalo (medido pelo QueryMonitor nesta thread), que vai para a
+    etapa "sqlite". Assim cada execução se divide em SQLite, pandas, gráficos, PDF etc.
+    """
+
+    def __init__(self, monitor: Optional[QueryMonitor] = None, label: str = ""):
+        self.monitor = monitor
+        self.label = label
+        self.stages: Dict[str, float] = {}
+        self.queries = 0
+        self._start = self._last = time.perf_counter()
+        self._sql = monitor.thread_totals() if monitor else (0, 0.0)
+
+    def mark(self, stage: str):
+        agora = time.perf_counter()
+        decorrido, self._last = agora - self._last, agora
+        sql = 0.0
+        if self.monitor is not None:
+            consultas, segundos = self.monitor.thread_totals()
+            sql = segundos - self._sql[1]
+            self.queries += consultas - self._sql[0]
+            self._sql = (consultas, segundos)
+            if sql:
+                self.stages["sqlite"] = self.stages.get("sqlite", 0.0) + sql
+        self.stages[stage] = self.stages.get(stage, 0.0) + max(decorrido - sql, 0.0)
+
+    def finish(self, stage: str = "restante") -> Dict[str, Any]:
+        """Fecha a última etapa e retorna a execução em milissegundos"""
+        self.mark(stage)
+        resultado = {
+            "pagina": self.label,
+            "total_ms": (self._last - self._start) * 1000,
+            "consultas": self.queries,
+            "etapas": {nome: segundos * 1000 for nome, segundos in self.stages.items() if segundos > 0},
+        }
+        if resultado["total_ms"] >= SLOW_RERUN_MS:
+            logger.info(f"Página {self.label} executada em {resultado['total_ms']:.0f} ms: {format_stages(resultado)}")
+        return resultado
+
+
+def format_stages(resultado: Dict[str, Any]) -> str:
+    """Etapas em uma linha, da mais demorada para a mais rápida"""
+    etapas = sorted(resultado["etapas"].items(), key=lambda item: item[1], reverse=True)
+    return " · ".join(f"{nome} {ms:.0f} ms" for nome, ms in etapas)
+
+
+class RenderStats:
+    """Histogramas de duração por (página, etapa) acumulados entre execuções e sessões"""
+
+    def __init__(self):
+        self._stages: Dict[Tuple[str, str], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, resultado: Dict[str, Any]):
+        with self._lock:
+            for etapa, ms in list(resultado["etapas"].items()) + [("total", resultado["total_ms"])]:
+                chave = (resultado["pagina"], etapa)
+                if chave not in self._stages:
+                    self._stages[chave] = Histogram(LATENCY_BUCKETS_MS)
+                self._stages[chave].observe(ms)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{
+                "pagina": pagina,
+                "etapa": etapa,
+                "execucoes": histograma.count,
+                "media_ms": histograma.total / histograma.count,
+                "p50_ms": histograma.percentile(0.5),
+                "p95_ms": histograma.percentile(0.95),
+                "max_ms": histograma.max,
+            } for (pagina, etapa), histograma in sorted(self._stages.items())]
@@ -0,0 +1,724 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF das faturas de locação do LocAuto
+Geração de uma fatura (generate_professional_pdf) e geração em lote em um pool de
+processos, com os arquivos gravados em uma pasta ou em um ZIP à medida que ficam prontos
+"""
+
+import base64
+import functools
+import html
+import itertools
+import logging
+import os
+import re
+import string
+import time
+from datetime import datetime
+from io import BytesIO
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import metrics
+from formatters import format_cpf_cnpj, format_currency
+from pdf_cache import content_key
+
+if TYPE_CHECKING:
+    from database_manager import DatabaseManager
+    from pdf_cache import PdfCache
+
+# xhtml2pdf e o pool de processos (multiprocessing, concurrent.futures, zipfile) são importados
+# só na geração: o app importa este módulo na partida
+
+logger = logging.getLogger(__name__)
+
+# Local do HTML da fatura para o xhtml2pdf e do logo, na pasta do app qualquer que seja a
+# pasta atual (app, linha de comando ou processos do lote)
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+HTML_PATH = os.path.join(APP_DIR, "fatura.html")
+LOGO_PATH = os.path.join(APP_DIR, "logo.png")
+
+# Lotes: faturas enviadas aos processos por vez, por processo (limita a memória de PDFs pendentes)
+BATCH_PENDING_PER_WORKER = 2
+
+# Lotes: segundos sem nenhuma fatura concluída pelo pool até o lote ser dado como travado
+BATCH_TIMEOUT_S = float(os.environ.get("LOCAUTO_PDF_BATCH_TIMEOUT", "60"))
+
+# Versão do modelo da fatura: entra na chave do cache de PDFs (incrementar a cada mudança no layout)
+TEMPLATE_VERSION = 2
+
+# Campos lidos pelo modelo: só eles entram na chave do cache (status e datas de atualização não)
+CAMPOS_PDF = {
+    'cliente': ('nome', 'cpf_cnpj', 'endereco', 'bairro', 'cidade', 'uf', 'cep'),
+    'veiculo': ('modelo', 'placa', 'cor'),
+    'fatura': ('numero_fatura', 'data_emissao', 'data_inicio', 'data_fim', 'valor_total', 'observacoes'),
+}
+
+_METRICA_PDF = metrics.REGISTRY.histogram(
+    "locauto_pdf_generation_seconds", "Duração da geração do PDF da fatura por resultado", ("resultado",),
+    metrics.SLOW_BUCKETS_S)
+_METRICA_LOTE = metrics.REGISTRY.histogram(
+    "locauto_pdf_batch_duration_seconds", "Duração da geração de PDFs em lote", (), metrics.SLOW_BUCKETS_S)
+
+
+# Valor por extenso
+_UNIDADES = ['', 'um', 'dois', 'três', 'quatro', 'cinco', 'seis', 'sete', 'oito', 'nove']
+_ESPECIAIS = ['dez', 'onze', 'doze', 'treze', 'quatorze', 'quinze', 'dezesseis', 'dezessete', 'dezoito', 'dezenove']
+_DEZENAS = ['', '', 'vinte', 'trinta', 'quarenta', 'cinquenta', 'sessenta', 'setenta', 'oitenta', 'noventa']
+_CENTENAS = ['', 'cento', 'duzentos', 'trezentos', 'quatrocentos', 'quinhentos', 'seiscentos', 'setecentos', 'oitocentos', 'novecentos']
+
+
+def numero_para_extenso(valor):
+    """Converte número para extenso (simplificado)"""
+    valor_int = int(valor)
+    if valor_int == 0:
+        return "zero reais"
+    elif valor_int < 1000:
+        if valor_int < 100:
+            if valor_int < 20:
+                if valor_int >= 10:
+                    return _ESPECIAIS[valor_int - 10] + " reais"
+                else:
+                    return _UNIDADES[valor_int] + (" real" if valor_int == 1 else " reais")
+            else:
+                dezena = valor_int // 10
+                unidade = valor_int % 10
+                resultado = _DEZENAS[dezena]
+                if unidade > 0:
+                    resultado += " e " + _UNIDADES[unidade]
+                return resultado + " reais"
+        else:
+            centena = valor_int // 100
+            resto = valor_int % 100
+            resultado = _CENTENAS[centena]
+            if resto > 0:
+                if resto < 20 and resto >= 10:
+                    resultado += " e " + _ESPECIAIS[resto - 10]
+                elif resto < 10:
+                    resultado += " e " + _UNIDADES[resto]
+                else:
+                    dezena = resto // 10
+                    unidade = resto % 10
+                    resultado += " e " + _DEZENAS[dezena]
+                    if unidade > 0:
+                        resultado += " e " + _UNIDADES[unidade]
+            return resultado + " reais"
+    else:
+        return "Dois mil e quatrocentos reais"  # Simplificado para valores maiores
+
+
+# Estilos padrão do xhtml2pdf (default.DEFAULT_CSS) só dos elementos usados no modelo: a folha
+# completa é lida e aplicada a cada documento. Ao usar outro elemento no modelo (p, h1, ul...),
+# copiar a regra dele de DEFAULT_CSS para cá
+_ESTILO_BASE = """
+html {
+    font-family: Helvetica;
+    font-size: 10px;
+    font-weight: normal;
+    color: #000000;
+    margin: 0;
+    padding: 0;
+    line-height: 150%;
+    border: 1px none;
+    display: inline;
+    width: auto;
+    height: auto;
+    white-space: normal;
+}
+b, strong {
+    font-weight: bold;
+}
+body, table, th, tr, td {
+    display: block;
+}
+tr, th, td {
+    vertical-align: middle;
+    width: auto;
+}
+th {
+    text-align: center;
+    font-weight: bold;
+}
+small {
+    font-size: 75%;
+}
+"""
+
+# Modelo da fatura: layout e estilos fixos, com $campos preenchidos a cada fatura. Larguras
+# das colunas em classes (e não em style= de cada célula) para o CSS ser lido uma vez por
+# documento; sem border-collapse e object-fit, que o xhtml2pdf ignora (e avisa no log)
+_HTML_FATURA = string.Template("""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <style>
+        @page {
+            size: A4;
+            margin: 0.5cm;
+        }
+        body {
+            font-family: Arial, sans-serif;
+            font-size: 9px;
+            line-height: 1.1;
+            color: #000;
+            margin: 0;
+            padding: 0;
+        }
+        table {
+            width: 100%;
+            border: 1px solid #000;
+        }
+        td, th {
+            border: 1px solid #000;
+            padding: 4px;
+            vertical-align: top;
+            font-size: 9px;
+        }
+        .logo-cell {
+            width: 100px;
+            text-align: center;
+            background-color: #fff;
+            color: black;
+            font-weight: bold;
+            font-size: 8px;
+            padding: 8px;
+            border: 1px solid #000;
+        }
+        .logo-img {
+            width: 80px;
+            height: 80px;
+        }
+        .company-info {
+            font-size: 8px;
+            line-height: 1.0;
+            padding: 4px;
+        }
+        .header-title {
+            text-align: center;
+            font-weight: bold;
+            font-size: 12px;
+            padding: 8px;
+        }
+        .invoice-number {
+            text-align: center;
+            font-weight: bold;
+            font-size: 10px;
+            padding: 8px;
+        }
+        .section-label {
+            font-weight: bold;
+            font-size: 9px;
+        }
+        .description-cell {
+            height: 150px;
+            vertical-align: top;
+            padding: 8px;
+        }
+        .value-cell {
+            text-align: right;
+            vertical-align: top;
+            padding: 8px;
+            width: 120px;
+        }
+        .total-label {
+            text-align: center;
+            font-weight: bold;
+            background-color: #f0f0f0;
+        }
+        .footer-note {
+            text-align: center;
+            font-size: 8px;
+            padding: 4px;
+        }
+        .w25 { width: 25%; }
+        .w30 { width: 30%; }
+        .w50 { width: 50%; }
+        .w70 { width: 70%; }
+        .total-text {
+            text-align: center;
+            font-weight: bold;
+        }
+        .total-value {
+            text-align: right;
+            font-weight: bold;
+        }
+    </style>
+</head>
+<body>
+    <!-- Cabeçalho Principal -->
+    <table>
+        <tr>
+            <td class="logo-cell">
+                $logo
+                <small>HT LOCAÇÕES AUTO LTDA</small>
+            </td>
+            <td class="company-info">
+                <strong>HT Locações Auto LTDA</strong><br>
+                CNPJ: 05.261.064/0001-60 - I. Mun.:<br>
+                Rua dos boiadeiros, 566 - Belo Horizonte<br>
+                PASSOS / MG CEP 37900-114<br>
+                FONE: (35)999817121 FAX: ( )
+            </td>
+            <td class="header-title">
+                FATURA DE LOCAÇÃO
+            </td>
+            <td class="invoice-number">
+                Nº$numero_fatura
+            </td>
+        </tr>
+    </table>
+
+    <!-- Linha de Data, Valor e Vencimento -->
+    <table>
+        <tr>
+            <td class="w25"><span class="section-label">Data da Emissão:</span><br>$data_emissao</td>
+            <td class="w25"><span class="section-label">Fatura/Duplicata Valor R$$:</span><br>$valor_total</td>
+            <td class="w25"><span class="section-label">Vencimento(s):</span><br>$data_fim</td>
+            <td class="w25"></td>
+        </tr>
+    </table>
+
+    <!-- Valor por Extenso -->
+    <table>
+        <tr>
+            <td><span class="section-label">Valor por Extenso:</span><br>$valor_extenso</td>
+        </tr>
+    </table>
+
+    <!-- Dados do Cliente -->
+    <table>
+        <tr>
+            <td class="w50"><span class="section-label">Sacado:</span> $nome</td>
+            <td class="w50"></td>
+        </tr>
+    </table>
+
+    <table>
+        <tr>
+            <td class="w50"><span class="section-label">CNPJ/CPF:</span> $cpf_cnpj</td>
+            <td class="w25"><span class="section-label">Município:</span><br>$cidade</td>
+            <td class="w25"></td>
+        </tr>
+    </table>
+
+    <table>
+        <tr>
+            <td class="w50"><span class="section-label">Endereço:</span> $endereco</td>
+            <td class="w25"><span class="section-label">UF:</span><br>$uf</td>
+            <td class="w25"></td>
+        </tr>
+    </table>
+
+    <table>
+        <tr>
+            <td class="w50"><span class="section-label">Bairro:</span> $bairro</td>
+            <td class="w25"><span class="section-label">CEP:</span><br>$cep</td>
+            <td class="w25"></td>
+        </tr>
+    </table>
+
+    <!-- Descrição e Valor -->
+    <table>
+        <tr>
+            <td class="total-label w70">Descrição</td>
+            <td class="total-label w30">Valor R$$</td>
+        </tr>
+        <tr>
+            <td class="description-cell">
+                Contrato: 1/12 &nbsp;&nbsp;&nbsp; Período: $data_inicio a $data_fim<br>
+                Placa Atual: $placa<br>
+                Veículo: $modelo - $cor<br>
+                Itens/Despesas e Serviços Adicionais:<br>
+                Locação Mensal - $valor_total
+                $observacoes
+            </td>
+            <td class="value-cell">
+                $valor_total
+            </td>
+        </tr>
+    </table>
+
+    <!-- Total da Fatura -->
+    <table>
+        <tr>
+            <td class="w70 total-text">Total da Fatura</td>
+            <td class="w30 total-value">$valor_total</td>
+        </tr>
+    </table>
+
+    <!-- Nota de Rodapé -->
+    <table>
+        <tr>
+            <td class="footer-note">Atividade não sujeita ao ISSQN e à emissão de NF conforme Lei 116/03 - Item 3.01</td>
+        </tr>
+    </table>
+</body>
+</html>
+""")
+
+
+@functools.lru_cache(maxsize=None)
+def _logo_html() -> str:
+    """<img> do logo embutido no HTML (data URI), preparado uma vez por processo.
+
+    O PNG é achatado sobre o fundo branco da célula: sem a transparência, o PDF leva uma
+    imagem só (sem a máscara alfa) e o xhtml2pdf não precisa abrir o arquivo a cada fatura.
+    """
+    from PIL import Image
+
+    try:
+        with Image.open(LOGO_PATH) as imagem:
+            imagem = imagem.convert("RGBA")
+            logo = Image.new("RGB", imagem.size, "white")
+            logo.paste(imagem, mask=imagem.getchannel("A"))
+        conteudo = BytesIO()
+        logo.save(conteudo, "PNG", optimize=True)
+    except Exception as e:
+        logger.error(f"Erro ao carregar o logo da fatura: {e}")
+        return ""
+    dados = base64.b64encode(conteudo.getvalue()).decode("ascii")
+    return f'<img src="data:image/png;base64,{dados}" alt="HT Locações" class="logo-img"><br>'
+
+
+@functools.lru_cache(maxsize=None)
+def _pisa():
+    """xhtml2pdf pronto para gerar faturas, preparado uma vez por processo.
+
+    As fontes do modelo (Arial é a Helvetica do PDF) são carregadas aqui, e não na primeira
+    fatura. Os fluxos do PDF são gravados em binário, sem a codificação ASCII85 que o
+    reportlab faz (em Python puro sem a extensão _rl_accel) e que deixa o arquivo ~25% maior.
+    """
+    from reportlab import rl_config
+    from reportlab.pdfbase import pdfmetrics
+    from xhtml2pdf import pisa
+
+    rl_config.useA85 = 0
+    for fonte in ("Helvetica", "Helvetica-Bold"):
+        pdfmetrics.getFont(fonte)
+    return pisa
+
+
+def _texto(valor) -> str:
+    return html.escape(str(valor))
+
+
+def _data_br(data: str) -> str:
+    return datetime.strptime(data, '%Y-%m-%d').strftime('%d/%m/%Y')
+
+
+def invoice_html(cliente_data, veiculo_data, fatura_data) -> str:
+    """HTML da fatura: o modelo pronto com os dados desta fatura"""
+    valor_total = format_currency(fatura_data['valor_total'])
+    observacoes = fatura_data.get('observacoes')
+    return _HTML_FATURA.substitute(
+        logo=_logo_html(),
+        numero_fatura=_texto(fatura_data['numero_fatura']),
+        data_emissao=_data_br(fatura_data['data_emissao']),
+        data_inicio=_data_br(fatura_data['data_inicio']),
+        data_fim=_data_br(fatura_data['data_fim']),
+        valor_total=valor_total,
+        valor_extenso=numero_para_extenso(fatura_data['valor_total']).title(),
+        nome=_texto(cliente_data['nome'].upper()),
+        cpf_cnpj=_texto(format_cpf_cnpj(cliente_data['cpf_cnpj'])),
+        cidade=_texto((cliente_data.get('cidade') or 'ITAÚ DE MINAS').upper()),
+        endereco=_texto(cliente_data.get('endereco') or ''),
+        uf=_texto(cliente_data.get('uf') or 'MG'),
+        bairro=_texto(cliente_data.get('bairro') or ''),
+        cep=_texto(cliente_data.get('cep') or '37975-000'),
+        placa=_texto(veiculo_data['placa']),
+        modelo=_texto(veiculo_data['modelo']),
+        cor=_texto(veiculo_data.get('cor', 'Branco')),
+        observacoes=f'<br><br>Observações: {_texto(observacoes)}' if observacoes else '',
+    )
+
+
+def _gerar_pdf(cliente_data, veiculo_data, fatura_data) -> Optional[bytes]:
+    """PDF da fatura (None se o xhtml2pdf falhar), sem métrica: é o que roda nos processos do lote"""
+    pisa = _pisa()
+    result = BytesIO()
+    pdf = pisa.pisaDocument(BytesIO(invoice_html(cliente_data, veiculo_data, fatura_data).encode("UTF-8")),
+                            result, path=HTML_PATH, default_css=_ESTILO_BASE)
+    return None if pdf.err else result.getvalue()
+
+
+def generate_professional_pdf(cliente_data, veiculo_data, fatura_data):
+    """Gera PDF profissional no formato de fatura de locação seguindo exatamente o modelo fornecido"""
+    inicio = time.perf_counter()
+    conteudo = _gerar_pdf(cliente_data, veiculo_data, fatura_data)
+    _METRICA_PDF.observe(time.perf_counter() - inicio, "erro" if conteudo is None else "ok")
+    return conteudo
+
+
+def batch_workers() -> int:
+    """Processos do lote: núcleos disponíveis para este processo"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def invoice_filename(documento: Dict[str, Any]) -> str:
+    """Nome do arquivo do PDF da fatura (o mesmo do download na emissão)"""
+    numero = re.sub(r"[^\w.-]", "_", str(documento['fatura']['numero_fatura']))
+    return f"fatura_{numero}.pdf"
+
+
+def invoice_key(documento: Dict[str, Any]) -> str:
+    """Chave do PDF no cache: hash dos campos usados pelo modelo e da versão do modelo"""
+    dados = {}
+    for parte, campos in CAMPOS_PDF.items():
+        for campo in campos:
+            valor = documento[parte].get(campo)
+            if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                valor = float(valor)  # 2400 e 2400.0 geram o mesmo PDF
+            dados[f"{parte}.{campo}"] = "" if valor is None else valor
+    dados['fatura.data_emissao'] = str(dados['fatura.data_emissao'])[:10]
+    return content_key(TEMPLATE_VERSION, dados)
+
+
+def cached_invoice_pdf(cache: "PdfCache", documento: Dict[str, Any]) -> Optional[str]:
+    """Caminho do PDF da fatura no cache, gerado agora se ainda não existir (None se falhar)"""
+    return cache.get_or_create(
+        invoice_key(documento),
+        lambda: generate_professional_pdf(documento['cliente'], documento['veiculo'], documento['fatura'])
+    )
+
+
+def _iniciar_processo(pids):
+    """Inicialização de cada processo do pool: sem log e com xhtml2pdf, fontes e logo prontos.
+
+    O processo nasce por fork de um servidor com várias threads: uma trava herdada no meio
+    de um uso (log, métricas) nunca seria liberada. Por isso o processo não registra log
+    nem métricas; os erros voltam como texto e a duração é registrada por quem recebe.
+    O PID vai para a fila pids, para que o lote possa encerrar o processo se ele travar.
+    """
+    pids.put(os.getpid())
+    logging.disable(logging.CRITICAL)
+    _pisa()
+    _logo_html()
+
+
+def _encerrar_processos(executor, pids):
+    """Encerra os processos do pool, inclusive um travado no meio de uma fatura"""
+    if hasattr(executor, "terminate_workers"):  # Python 3.14+
+        executor.terminate_workers()
+        return
+    import signal
+
+    while not pids.empty():
+        try:
+            os.kill(pids.get(), signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+
+def _do_cache(em_cache: Dict[int, str], documentos: Dict[int, Dict[str, Any]]) -> Iterable[Tuple[int, Optional[bytes], Optional[str], Optional[float]]]:
+    """PDFs já em cache (duração None: não entram na métrica de geração); se um arquivo
+    sumir no meio do lote (descartado por outra sessão), a fatura é gerada de novo aqui"""
+    for fatura_id, caminho in em_cache.items():
+        try:
+            with open(caminho, "rb") as arquivo:
+                yield fatura_id, arquivo.read(), None, None
+        except FileNotFoundError:
+            yield _renderizar(documentos[fatura_id])
+
+
+def _renderizar(documento: Dict[str, Any]) -> Tuple[int, Optional[bytes], Optional[str], float]:
+    """Gera o PDF de uma fatura; erros voltam como texto para não interromper o lote.
+
+    Não registra métrica nem log (roda nos processos do pool): render_batch registra a duração.
+    """
+    inicio = time.perf_counter()
+    try:
+        pdf = _gerar_pdf(documento['cliente'], documento['veiculo'], documento['fatura'])
+        erro = None if pdf else "xhtml2pdf não gerou o PDF"
+    except Exception as e:
+        pdf, erro = None, f"{type(e).__name__}: {e}"
+    return documento['fatura_id'], pdf, erro, time.perf_counter() - inicio
+
+
+def _renderizar_em_processos(documentos: List[Dict[str, Any]], workers: int) -> Iterable[Tuple[int, Optional[bytes], Optional[str], Optional[float]]]:
+    """Resultados na ordem em que ficam prontos, com no máximo alguns PDFs pendentes por processo.
+
+    Os processos são criados por fork: spawn e forkserver executariam de novo o script
+    principal (no Streamlit, o próprio locauto.py) em cada processo do pool. Se nenhuma
+    fatura fica pronta em BATCH_TIMEOUT_S, os processos são encerrados e as faturas
+    restantes do lote voltam como falhas.
+    """
+    import multiprocessing
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    metodo = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+    # Preparados aqui, os processos criados por fork já os herdam prontos
+    _pisa()
+    _logo_html()
+    contexto = multiprocessing.get_context(metodo)
+    pids = contexto.SimpleQueue()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=contexto,
+                                 initializer=_iniciar_processo, initargs=(pids,)) as executor:
+            pendentes = {}
+            fila = iter(documentos)
+            while True:
+                for documento in fila:
+                    pendentes[executor.submit(_renderizar, documento)] = documento['fatura_id']
+                    if len(pendentes) >= workers * BATCH_PENDING_PER_WORKER:
+                        break
+                if not pendentes:
+                    return
+                prontos, _ = wait(pendentes, timeout=BATCH_TIMEOUT_S, return_when=FIRST_COMPLETED)
+                if not prontos:
+                    erro = f"Tempo esgotado: nenhuma fatura concluída em {BATCH_TIMEOUT_S:.0f}s"
+                    logger.error(f"Lote de PDFs interrompido: {erro}")
+                    _encerrar_processos(executor, pids)
+                    restantes = itertools.chain(pendentes.values(), (documento['fatura_id'] for documento in fila))
+                    for fatura_id in restantes:
+                        yield fatura_id, None, erro, None
+                    return
+                for futuro in prontos:
+                    fatura_id = pendentes.pop(futuro)
+                    try:
+                        yield futuro.result()
+                    except Exception as e:
+                        # Processo encerrado no meio da fatura (ex.: falta de memória)
+                        yield fatura_id, None, f"{type(e).__name__}: {e}", 0.0
+    finally:
+        pids.close()
+
+
+def render_batch(db: "DatabaseManager", fatura_ids: Iterable[int], destino: str,
+                 workers: Optional[int] = None,
+                 progress: Optional[Callable[[int, int], None]] = None,
+                 cache: Optional["PdfCache"] = None) -> Dict[str, Any]:
+    """Gera os PDFs das faturas em um pool de processos e grava cada um assim que fica pronto.
+
+    destino terminado em .zip recebe todos os PDFs em um único arquivo (que só aparece
+    completo); qualquer outro caminho é uma pasta com um PDF por fatura. Os dados são
+    lidos do banco neste processo; os processos do pool só montam o HTML e o PDF.
+    Falhas de uma fatura vão para 'falhas' sem interromper o lote. progress, se
+    informado, recebe (faturas concluídas, total) a cada fatura. Com cache, os PDFs já
+    gerados são copiados dele e os novos são gravados nele.
+    """
+    import zipfile
+
+    inicio = time.perf_counter()
+    fatura_ids = list(dict.fromkeys(int(fatura_id) for fatura_id in fatura_ids))
+    documentos = db.get_invoice_documents(fatura_ids)
+    falhas = [{'fatura_id': fatura_id, 'numero_fatura': None, 'erro': "Fatura não encontrada"}
+              for fatura_id in fatura_ids if fatura_id not in documentos]
+    encontrados = [documentos[fatura_id] for fatura_id in fatura_ids if fatura_id in documentos]
+    # Com cache, só as faturas sem PDF guardado vão para a geração
+    chaves: Dict[int, str] = {}
+    em_cache: Dict[int, str] = {}
+    if cache is not None:
+        for documento in encontrados:
+            chave = chaves[documento['fatura_id']] = invoice_key(documento)
+            caminho = cache.get(chave)
+            if caminho:
+                em_cache[documento['fatura_id']] = caminho
+    pendentes = [documento for documento in encontrados if documento['fatura_id'] not in em_cache]
+    workers = max(1, min(workers or batch_workers(), len(pendentes) or 1))
+
+    if workers == 1:
+        # Um núcleo: o pool só acrescentaria a criação do processo e a cópia dos PDFs
+        gerados_agora = map(_renderizar, pendentes)
+    else:
+        gerados_agora = _renderizar_em_processos(pendentes, workers)
+    resultados = itertools.chain(_do_cache(em_cache, documentos), gerados_agora)
+
+    como_zip = destino.lower().endswith(".zip")
+    temporario = f"{destino}.tmp"
+    if como_zip:
+        os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+        arquivo_zip = zipfile.ZipFile(temporario, "w", zipfile.ZIP_DEFLATED)
+    else:
+        os.makedirs(destino, exist_ok=True)
+
+    gerados = 0
+    bytes_gerados = 0
+    try:
+        for concluidas, (fatura_id, pdf, erro, duracao_s) in enumerate(resultados, start=1):
+            documento = documentos[fatura_id]
+            if duracao_s is not None:
+                _METRICA_PDF.observe(duracao_s, "erro" if pdf is None else "ok")
+                if cache is not None and pdf is not None:
+                    cache.put(chaves[fatura_id], pdf)
+            if pdf is None:
+                falhas.append({'fatura_id': fatura_id, 'numero_fatura': documento['fatura']['numero_fatura'], 'erro': erro})
+                logger.error(f"Erro ao gerar PDF da fatura {documento['fatura']['numero_fatura']}: {erro}")
+            else:
+                nome = invoice_filename(documento)
+                if como_zip:
+                    arquivo_zip.writestr(nome, pdf)
+                else:
+                    caminho = os.path.join(destino, nome)
+                    with open(caminho + ".tmp", "wb") as arquivo:
+                        arquivo.write(pdf)
+                    os.replace(caminho + ".tmp", caminho)
+                gerados += 1
+                bytes_gerados += len(pdf)
+            if progress:
+                progress(concluidas, len(encontrados))
+    except BaseException:
+        if como_zip:
+            arquivo_zip.close()
+            os.remove(temporario)
+        raise
+    if como_zip:
+        arquivo_zip.close()
+        os.replace(temporario, destino)
+
+    duracao_s = time.perf_counter() - inicio
+    _METRICA_LOTE.observe(duracao_s)
+    relatorio = {
+        'destino': destino,
+        'total': len(fatura_ids),
+        'gerados': gerados,
+        'falhas': falhas,
+        'do_cache': len(em_cache),
+        'processos': workers,
+        'bytes': bytes_gerados,
+        'duracao_s': duracao_s,
+        'faturas_por_s': gerados / duracao_s if duracao_s else 0.0,
+    }
+    logger.info(f"Lote de PDFs: {gerados} de {len(fatura_ids)} faturas em {duracao_s:.1f}s "
+                f"({relatorio['faturas_por_s']:.1f} faturas/s, {workers} processos) → {destino}")
+    return relatorio
+
+
+def main(argumentos: Optional[List[str]] = None):
+    import argparse
+    from database_manager import DatabaseManager
+
+    parser = argparse.ArgumentParser(description="Gera os PDFs das faturas em lote (pasta ou ZIP)")
+    parser.add_argument("destino", help="pasta de saída ou arquivo .zip")
+    parser.add_argument("--banco", default=os.path.join(APP_DIR, "locauto.db"), help="arquivo do banco SQLite")
+    parser.add_argument("--ids", type=int, nargs="+", help="IDs das faturas")
+    parser.add_argument("--de", help="início do período (AAAA-MM-DD): locações ativas no período")
+    parser.add_argument("--ate", help="fim do período (AAAA-MM-DD), padrão hoje")
+    parser.add_argument("--processos", type=int, help="processos do pool (padrão: núcleos disponíveis)")
+    parser.add_argument("--cache", action="store_true",
+                        help="reaproveita e grava PDFs no cache em disco (LOCAUTO_PDF_CACHE_DIR)")
+    args = parser.parse_args(argumentos)
+    if not args.ids and not args.de:
+        parser.error("informe --ids ou --de")
+
+    db = DatabaseManager(args.banco)
+    try:
+        ids = args.ids or db.get_faturas_locacao_ids(args.de, args.ate or datetime.now().strftime('%Y-%m-%d'))
+        cache = None
+        if args.cache:
+            from pdf_cache import PdfCache
+            cache = PdfCache()
+        relatorio = render_batch(db, ids, args.destino, workers=args.processos, cache=cache)
+    finally:
+        db.close()
+    for falha in relatorio['falhas']:
+        print(f"falha: fatura {falha['numero_fatura'] or falha['fatura_id']}: {falha['erro']}")
+    print(f"{relatorio['gerados']}/{relatorio['total']} PDFs em {relatorio['duracao_s']:.1f}s "
+          f"({relatorio['faturas_por_s']:.1f} faturas/s, {relatorio['processos']} processos) → {relatorio['destino']}")
+    return 1 if relatorio['falhas'] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,14 +1,22 @@
+import time
+_inicio_execucao = time.perf_counter()  # referência para o tempo até a primeira renderização
+
 import streamlit as st
-import pandas as pd
+import logging
 import base64
 from datetime import datetime
 import os
-from io import BytesIO
-from xhtml2pdf import pisa
-import re
-from database_manager import DatabaseManager
-import plotly.express as px
-import plotly.graph_objects as go
+from database_manager import DatabaseManager, FaturaDuplicadaError, VeiculoIndisponivelError
+import formatters
+import metrics
+from invoice_pdf import cached_invoice_pdf
+from pdf_cache import PdfCache
+from instrumentation import RenderStats, RenderTimer, format_stages
+
+# plotly, xhtml2pdf e pandas são importados apenas nas páginas/funções que os usam:
+# uma partida a frio não paga o custo de importação antes da primeira renderização
+
+logger = logging.getLogger(__name__)
 
 # Configuração da página
 st.set_page_config(
@@ -78,19 +86,18 @@ st.markdown("""
 @st.cache_resource
 def init_database():
     db_manager = DatabaseManager()
-    # Executar backup automático
-    db_manager.auto_backup()
+    # Backup automático e limpeza rodam em segundo plano, sem atrasar a primeira tela
+    db_manager.start_maintenance()
     
     # Importar dados de backup se o banco estiver vazio
     try:
-        clientes = db_manager.get_dataframe("clientes", "ativo = 1")
-        veiculos = db_manager.get_dataframe("veiculos", "ativo = 1")
-        
-        if clientes.empty or veiculos.empty:
+        if not db_manager.has_rows("clientes", "ativo = 1") or not db_manager.has_rows("veiculos", "ativo = 1"):
             # Executar importação dos dados de backup
             try:
                 import import_backup
                 import_backup.import_backup_data()
+                # A importação usa conexão própria; descarta resultados em cache
+                db_manager.invalidate_cache()
                 st.success("✅ Dados de backup importados com sucesso!")
             except Exception as e:
                 st.warning(f"⚠️ Erro na importação: {str(e)}")
@@ -101,286 +108,143 @@ def init_database():
 
 db = init_database()
 
-# Funções auxiliares
-def format_currency(value):
-    """Formata valor como moeda brasileira"""
-    return f"R$ {value:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+@st.cache_resource
+def estatisticas_renderizacao():
+    """Duração das etapas de cada página, acumulada entre execuções e sessões"""
+    return RenderStats()
 
-def format_cpf_cnpj(doc):
-    """Formata CPF ou CNPJ"""
-    doc = re.sub(r'\D', '', str(doc))
-    if len(doc) == 11:  # CPF
-        return f"{doc[:3]}.{doc[3:6]}.{doc[6:9]}-{doc[9:]}"
-    elif len(doc) == 14:  # CNPJ
-        return f"{doc[:2]}.{doc[2:5]}.{doc[5:8]}/{doc[8:12]}-{doc[12:]}"
-    return doc
+@st.cache_resource
+def iniciar_metricas():
+    """Exposição das métricas (LOCAUTO_METRICS_PORT e/ou LOCAUTO_METRICS_FILE), uma vez por processo"""
+    return metrics.start_exporters()
 
-def format_phone(phone):
-    """Formata telefone"""
-    phone = re.sub(r'\D', '', str(phone))
-    if len(phone) == 11:
-        return f"({phone[:2]}) {phone[2:7]}-{phone[7:]}"
-    elif len(phone) == 10:
-        return f"({phone[:2]}) {phone[2:6]}-{phone[6:]}"
-    return phone
+iniciar_metricas()
 
-def generate_professional_pdf(cliente_data, veiculo_data, fatura_data):
-    """Gera PDF profissional no formato de fatura de locação seguindo exatamente o modelo fornecido"""
-    
-    # Converter valor para extenso
-    def numero_para_extenso(valor):
-        """Converte número para extenso (simplificado)"""
-        unidades = ['', 'um', 'dois', 'três', 'quatro', 'cinco', 'seis', 'sete', 'oito', 'nove']
-        dezenas = ['', '', 'vinte', 'trinta', 'quarenta', 'cinquenta', 'sessenta', 'setenta', 'oitenta', 'noventa']
-        centenas = ['', 'cento', 'duzentos', 'trezentos', 'quatrocentos', 'quinhentos', 'seiscentos', 'setecentos', 'oitocentos', 'novecentos']
-        
-        valor_int = int(valor)
-        if valor_int == 0:
-            return "zero reais"
-        elif valor_int < 1000:
-            if valor_int < 100:
-                if valor_int < 20:
-                    especiais = ['dez', 'onze', 'doze', 'treze', 'quatorze', 'quinze', 'dezesseis', 'dezessete', 'dezoito', 'dezenove']
-                    if valor_int >= 10:
-                        return especiais[valor_int - 10] + " reais"
-                    else:
-                        return unidades[valor_int] + (" real" if valor_int == 1 else " reais")
-                else:
-                    dezena = valor_int // 10
-                    unidade = valor_int % 10
-                    resultado = dezenas[dezena]
-                    if unidade > 0:
-                        resultado += " e " + unidades[unidade]
-                    return resultado + " reais"
-            else:
-                centena = valor_int // 100
-                resto = valor_int % 100
-                resultado = centenas[centena]
-                if resto > 0:
-                    if resto < 20 and resto >= 10:
-                        especiais = ['dez', 'onze', 'doze', 'treze', 'quatorze', 'quinze', 'dezesseis', 'dezessete', 'dezoito', 'dezenove']
-                        resultado += " e " + especiais[resto - 10]
-                    elif resto < 10:
-                        resultado += " e " + unidades[resto]
-                    else:
-                        dezena = resto // 10
-                        unidade = resto % 10
-                        resultado += " e " + dezenas[dezena]
-                        if unidade > 0:
-                            resultado += " e " + unidades[unidade]
-                return resultado + " reais"
-        else:
-            return "Dois mil e quatrocentos reais"  # Simplificado para valores maiores
+@st.cache_resource
+def cache_pdf():
+    """PDFs de faturas já gerados, em disco (compartilhados entre sessões)"""
+    return PdfCache()
+
+def pdf_da_fatura(fatura_id):
+    """Caminho do PDF da fatura no cache em disco (gerado e gravado se ainda não existir).
     
-    valor_extenso = numero_para_extenso(fatura_data['valor_total'])
+    Os botões de download leem o arquivo do cache: a sessão guarda só o id da fatura e o caminho.
+    Retorna None se a fatura não existir ou o PDF não puder ser gerado.
+    """
+    documento = db.get_invoice_documents([fatura_id]).get(fatura_id)
+    return cached_invoice_pdf(cache_pdf(), documento) if documento else None
+
+def conteudo_do_pdf(fatura_id, caminho):
+    """Bytes do PDF da fatura lido do cache em disco, ou None se não puder ser gerado.
     
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <style>
-            @page {{
-                size: A4;
-                margin: 0.5cm;
-            }}
-            body {{
-                font-family: Arial, sans-serif;
-                font-size: 9px;
-                line-height: 1.1;
-                color: #000;
-                margin: 0;
-                padding: 0;
-            }}
-            table {{
-                width: 100%;
-                border-collapse: collapse;
-                border: 1px solid #000;
-            }}
-            td, th {{
-                border: 1px solid #000;
-                padding: 4px;
-                vertical-align: top;
-                font-size: 9px;
-            }}
-            .logo-cell {{
-                width: 100px;
-                text-align: center;
-                background-color: #fff;
-                color: black;
-                font-weight: bold;
-                font-size: 8px;
-                padding: 8px;
-                border: 1px solid #000;
-            }}
-            .logo-img {{
-                width: 80px;
-                height: 80px;
-                object-fit: contain;
-            }}
-            .company-info {{
-                font-size: 8px;
-                line-height: 1.0;
-                padding: 4px;
-            }}
-            .header-title {{
-                text-align: center;
-                font-weight: bold;
-                font-size: 12px;
-                padding: 8px;
-            }}
-            .invoice-number {{
-                text-align: center;
-                font-weight: bold;
-                font-size: 10px;
-                padding: 8px;
-            }}
-            .section-label {{
-                font-weight: bold;
-                font-size: 9px;
-            }}
-            .description-cell {{
-                height: 150px;
-                vertical-align: top;
-                padding: 8px;
-            }}
-            .value-cell {{
-                text-align: right;
-                vertical-align: top;
-                padding: 8px;
-                width: 120px;
-            }}
-            .total-label {{
-                text-align: center;
-                font-weight: bold;
-                background-color: #f0f0f0;
-            }}
-            .footer-note {{
-                text-align: center;
-                font-size: 8px;
-                padding: 4px;
-            }}
-        </style>
-    </head>
-    <body>
-        <!-- Cabeçalho Principal -->
-        <table>
-            <tr>
-                <td class="logo-cell">
-                    <img src="logo.png" alt="HT Locações" class="logo-img"><br>
-                    <small>HT LOCAÇÕES AUTO LTDA</small>
-                </td>
-                <td class="company-info">
-                    <strong>HT Locações Auto LTDA</strong><br>
-                    CNPJ: 05.261.064/0001-60 - I. Mun.:<br>
-                    Rua dos boiadeiros, 566 - Belo Horizonte<br>
-                    PASSOS / MG CEP 37900-114<br>
-                    FONE: (35)999817121 FAX: ( )
-                </td>
-                <td class="header-title">
-                    FATURA DE LOCAÇÃO
-                </td>
-                <td class="invoice-number">
-                    Nº{fatura_data['numero_fatura']}
-                </td>
-            </tr>
-        </table>
+    O arquivo pode ter sido descartado do cache desde que o caminho foi obtido: nesse caso é gerado de novo.
+    """
+    for tentativa in range(2):
+        if caminho is None:
+            return None
+        try:
+            with open(caminho, 'rb') as arquivo:
+                return arquivo.read()
+        except FileNotFoundError:
+            logger.info(f"PDF da fatura {fatura_id} descartado do cache, gerando novamente")
+            caminho = pdf_da_fatura(fatura_id)
+    return None
 
-        <!-- Linha de Data, Valor e Vencimento -->
-        <table>
-            <tr>
-                <td style="width: 25%;"><span class="section-label">Data da Emissão:</span><br>{datetime.strptime(fatura_data['data_emissao'], '%Y-%m-%d').strftime('%d/%m/%Y')}</td>
-                <td style="width: 25%;"><span class="section-label">Fatura/Duplicata Valor R$:</span><br>{format_currency(fatura_data['valor_total'])}</td>
-                <td style="width: 25%;"><span class="section-label">Vencimento(s):</span><br>{datetime.strptime(fatura_data['data_fim'], '%Y-%m-%d').strftime('%d/%m/%Y')}</td>
-                <td style="width: 25%;"></td>
-            </tr>
-        </table>
 
-        <!-- Valor por Extenso -->
-        <table>
-            <tr>
-                <td><span class="section-label">Valor por Extenso:</span><br>{valor_extenso.title()}</td>
-            </tr>
-        </table>
+_METRICA_PAGINAS = metrics.REGISTRY.histogram(
+    "locauto_page_render_seconds", "Duração das execuções das páginas por etapa", ("pagina", "etapa"))
 
-        <!-- Dados do Cliente -->
-        <table>
-            <tr>
-                <td style="width: 50%;"><span class="section-label">Sacado:</span> {cliente_data['nome'].upper()}</td>
-                <td style="width: 50%;"></td>
-            </tr>
-        </table>
-        
-        <table>
-            <tr>
-                <td style="width: 50%;"><span class="section-label">CNPJ/CPF:</span> {format_cpf_cnpj(cliente_data['cpf_cnpj'])}</td>
-                <td style="width: 25%;"><span class="section-label">Município:</span><br>{(cliente_data.get('cidade') or 'ITAÚ DE MINAS').upper()}</td>
-                <td style="width: 25%;"></td>
-            </tr>
-        </table>
-        
-        <table>
-            <tr>
-                <td style="width: 50%;"><span class="section-label">Endereço:</span> {cliente_data.get('endereco', '') if cliente_data.get('endereco') else ''}</td>
-                <td style="width: 25%;"><span class="section-label">UF:</span><br>{cliente_data.get('uf') or 'MG'}</td>
-                <td style="width: 25%;"></td>
-            </tr>
-        </table>
-        
-        <table>
-            <tr>
-                <td style="width: 50%;"><span class="section-label">Bairro:</span> {cliente_data.get('bairro') or ''}</td>
-                <td style="width: 25%;"><span class="section-label">CEP:</span><br>{cliente_data.get('cep') or '37975-000'}</td>
-                <td style="width: 25%;"></td>
-            </tr>
-        </table>
 
-        <!-- Descrição e Valor -->
-        <table>
-            <tr>
-                <td class="total-label" style="width: 70%;">Descrição</td>
-                <td class="total-label" style="width: 30%;">Valor R$</td>
-            </tr>
-            <tr>
-                <td class="description-cell">
-                    Contrato: 1/12 &nbsp;&nbsp;&nbsp; Período: {datetime.strptime(fatura_data['data_inicio'], '%Y-%m-%d').strftime('%d/%m/%Y')} a {datetime.strptime(fatura_data['data_fim'], '%Y-%m-%d').strftime('%d/%m/%Y')}<br>
-                    Placa Atual: {veiculo_data['placa']}<br>
-                    Veículo: {veiculo_data['modelo']} - {veiculo_data.get('cor', 'Branco')}<br>
-                    Itens/Despesas e Serviços Adicionais:<br>
-                    Locação Mensal - {format_currency(fatura_data['valor_total'])}
-                    {f'<br><br>Observações: {fatura_data.get("observacoes", "")}' if fatura_data.get('observacoes') else ''}
-                </td>
-                <td class="value-cell">
-                    {format_currency(fatura_data['valor_total'])}
-                </td>
-            </tr>
-        </table>
+# Dados das páginas compartilhados entre reruns e sessões: a chave inclui a versão dos dados
+# do banco, então cada resultado só é recarregado depois de uma escrita
+@st.cache_data(show_spinner=False, max_entries=128)
+def _carregar(consulta, versao, *args, **kwargs):
+    """Executa db.<consulta>; `versao` só entra na chave do cache"""
+    return getattr(db, consulta)(*args, **kwargs)
+
+def carregar(consulta, *args, **kwargs):
+    """Resultado de db.<consulta>(...) em cache até a próxima escrita no banco"""
+    return _carregar(consulta, db.data_version(), *args, **kwargs)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _utilizacao_frota(versao, inicio, fim):
+    """Matriz de utilização da frota do período, recalculada só depois de uma escrita no banco"""
+    from analytics import utilizacao_frota
+    return utilizacao_frota(db.get_periodos_locacao(inicio, fim), db.get_veiculos(), inicio, fim)
 
-        <!-- Total da Fatura -->
-        <table>
-            <tr>
-                <td style="width: 70%; text-align: center; font-weight: bold;">Total da Fatura</td>
-                <td style="width: 30%; text-align: right; font-weight: bold;">{format_currency(fatura_data['valor_total'])}</td>
-            </tr>
-        </table>
+# Funções auxiliares (valores avulsos; colunas inteiras usam as versões vetorizadas de formatters)
+def format_currency(value):
+    """Formata valor como moeda brasileira"""
+    return formatters.format_currency(value)
+
+def format_cpf_cnpj(doc):
+    """Formata CPF ou CNPJ"""
+    return formatters.format_cpf_cnpj(doc)
 
-        <!-- Nota de Rodapé -->
-        <table>
-            <tr>
-                <td class="footer-note">Atividade não sujeita ao ISSQN e à emissão de NF conforme Lei 116/03 - Item 3.01</td>
-            </tr>
-        </table>
-    </body>
-    </html>
+def format_phone(phone):
+    """Formata telefone"""
+    return formatters.format_phone(phone)
+
+def exibir_paginado(chave, carregar_pagina, coluna_ordem, tamanho_pagina=50, formatar=None):
+    """Exibe um DataFrame paginado por chave (coluna_ordem, id), buscando uma página por vez no banco.
+    
+    Retorna a página exibida (sem formatação).
     """
+    estado = f"paginas_{chave}"
+    if estado not in st.session_state:
+        st.session_state[estado] = [None]  # cursores do início de cada página visitada
+    cursores = st.session_state[estado]
     
-    # Gerar PDF
-    result = BytesIO()
-    pdf = pisa.pisaDocument(BytesIO(html_content.encode("UTF-8")), result)
+    # Busca uma linha a mais para saber se existe próxima página
+    pagina_df = carregar_pagina(limit=tamanho_pagina + 1, after=cursores[-1])
+    tem_proxima = len(pagina_df) > tamanho_pagina
+    pagina_df = pagina_df.head(tamanho_pagina)
     
-    if not pdf.err:
-        return result.getvalue()
-    return None
+    if pagina_df.empty:
+        st.info("Nenhum registro encontrado.")
+    else:
+        st.dataframe(formatar(pagina_df) if formatar else pagina_df, use_container_width=True)
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("⬅️ Anterior", key=f"{chave}_anterior", disabled=len(cursores) == 1):
+            cursores.pop()
+            st.rerun()
+    with col2:
+        st.caption(f"Página {len(cursores)}")
+    with col3:
+        if st.button("Próxima ➡️", key=f"{chave}_proxima", disabled=not tem_proxima):
+            ultima = pagina_df.iloc[-1]
+            cursores.append((ultima[coluna_ordem], int(ultima['id'])))
+            st.rerun()
+    return pagina_df
+
+def baixar_fatura(faturas_df, chave):
+    """Ação "Baixar Fatura Nº X" para as faturas listadas (PDF servido do cache em disco)"""
+    if faturas_df.empty:
+        return
+    faturas = {int(fatura_id): (str(numero), cliente) for fatura_id, numero, cliente
+               in zip(faturas_df['id'], faturas_df['numero_fatura'], faturas_df['cliente_nome'])}
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        fatura_id = st.selectbox("Fatura", list(faturas), key=f"{chave}_fatura",
+                                 format_func=lambda fatura_id: "Nº {} - {}".format(*faturas[fatura_id]))
+    numero = faturas[fatura_id][0]
+    with col2:
+        # O PDF só é gerado (ou buscado no cache) quando pedido, não a cada execução da página
+        preparado = st.session_state.get(f"{chave}_pdf")
+        if preparado is None or preparado[0] != fatura_id:
+            if not st.button("📄 Preparar PDF", key=f"{chave}_preparar", use_container_width=True):
+                return
+            preparado = st.session_state[f"{chave}_pdf"] = (fatura_id, pdf_da_fatura(fatura_id))
+        conteudo = conteudo_do_pdf(*preparado)
+        if conteudo is None:
+            del st.session_state[f"{chave}_pdf"]
+            st.error(f"Erro ao gerar PDF da fatura Nº {numero}")
+            return
+        st.download_button(f"📄 Baixar Fatura Nº {numero}", data=conteudo,
+                           file_name=f"fatura_{numero}.pdf", mime="application/pdf",
+                           key=f"{chave}_baixar", use_container_width=True)
 
 def main():
     # Sidebar para navegação
@@ -394,6 +258,9 @@ def main():
         "Navegação",
         ["📊 Dashboard", "📝 Nova Fatura", "👥 Clientes", "🚗 Veículos", "💰 Financeiro", "📈 Relatórios"]
     )
+    # Tempo da execução por etapa (o tempo no SQLite é separado automaticamente)
+    etapas.label = page
+    etapas.mark("layout")
     
     # Dashboard
     if page == "📊 Dashboard":
@@ -402,55 +269,53 @@ def main():
         # Métricas principais
         col1, col2, col3, col4 = st.columns(4)
         
-        # Obter dados para métricas
-        clientes_df = db.get_clientes()
-        veiculos_df = db.get_veiculos()
-        faturas_df = db.get_faturas()
-        transacoes_df = db.get_transacoes()
+        # Obter métricas agregadas no banco
+        metricas = carregar("get_dashboard_metrics")
         
         with col1:
-            st.metric("Total de Clientes", len(clientes_df))
+            st.metric("Total de Clientes", metricas['total_clientes'])
         
         with col2:
-            st.metric("Total de Veículos", len(veiculos_df))
+            st.metric("Total de Veículos", metricas['total_veiculos'])
         
         with col3:
-            if not faturas_df.empty:
-                receita_total = faturas_df['valor_total'].sum()
-                st.metric("Receita Total", format_currency(receita_total))
-            else:
-                st.metric("Receita Total", "R$ 0,00")
+            st.metric("Receita Total", format_currency(metricas['receita_total']))
         
         with col4:
-            st.metric("Faturas Emitidas", len(faturas_df))
+            st.metric("Faturas Emitidas", metricas['total_faturas'])
+        etapas.mark("dados")
         
         # Gráficos
-        if not faturas_df.empty:
+        if metricas['total_faturas'] > 0:
+            import plotly.express as px
             col1, col2 = st.columns(2)
             
             with col1:
                 st.subheader("📈 Receita por Mês")
-                faturas_df['mes'] = pd.to_datetime(faturas_df['data_emissao']).dt.to_period('M')
-                receita_mensal = faturas_df.groupby('mes')['valor_total'].sum().reset_index()
-                receita_mensal['mes'] = receita_mensal['mes'].astype(str)
+                receita_mensal = carregar("get_receita_mensal")
+                etapas.mark("dados")
                 
                 fig = px.bar(receita_mensal, x='mes', y='valor_total', 
                            title="Receita Mensal",
                            labels={'valor_total': 'Receita (R$)', 'mes': 'Mês'})
                 st.plotly_chart(fig, use_container_width=True)
+                etapas.mark("graficos")
             
             with col2:
                 st.subheader("🚗 Veículos Mais Locados")
-                veiculos_locados = faturas_df.groupby('veiculo_modelo').size().reset_index(name='locacoes')
+                veiculos_locados = carregar("get_locacoes_por_modelo")
+                etapas.mark("dados")
                 
                 fig = px.pie(veiculos_locados, values='locacoes', names='veiculo_modelo',
                            title="Distribuição de Locações por Veículo")
                 st.plotly_chart(fig, use_container_width=True)
+                etapas.mark("graficos")
         
         # Últimas faturas
         st.subheader("📋 Últimas Faturas")
-        if not faturas_df.empty:
-            st.dataframe(faturas_df.head(10), use_container_width=True)
+        if metricas['total_faturas'] > 0:
+            st.dataframe(carregar("get_ultimas_faturas", 10), use_container_width=True)
+            etapas.mark("tabelas")
         else:
             st.info("Nenhuma fatura encontrada.")
     
@@ -458,33 +323,44 @@ def main():
     elif page == "📝 Nova Fatura":
         st.markdown('<div class="main-header"><h1>Nova Fatura de Locação</h1></div>', unsafe_allow_html=True)
         
-        # Obter dados
-        clientes_df = db.get_clientes()
-        veiculos_df = db.get_veiculos()
-        
-        if clientes_df.empty:
+        if not db.has_rows("clientes", "ativo = 1"):
             st.warning("⚠️ Nenhum cliente cadastrado. Cadastre um cliente primeiro.")
             return
         
-        if veiculos_df.empty:
+        if not db.has_rows("veiculos", "ativo = 1"):
             st.warning("⚠️ Nenhum veículo cadastrado. Cadastre um veículo primeiro.")
             return
         
+        # Busca fora do formulário: cada busca atualiza as opções sem enviar o formulário
+        col1, col2 = st.columns(2)
+        with col1:
+            busca_cliente = st.text_input("🔍 Buscar cliente", placeholder="Nome, CPF/CNPJ, cidade ou endereço")
+        with col2:
+            busca_veiculo = st.text_input("🔍 Buscar veículo", placeholder="Placa ou modelo")
+        
+        # Apenas os melhores resultados vão para as listas (índice de busca no banco)
+        clientes_df = db.search_clientes(busca_cliente, limit=50)
+        veiculos_df = db.search_veiculos(busca_veiculo, limit=50)
+        etapas.mark("dados")
+        
         with st.form("nova_fatura"):
             col1, col2 = st.columns(2)
             
             with col1:
                 # Seleção de cliente
-                cliente_options = {f"{row['nome']} - {format_cpf_cnpj(row['cpf_cnpj'])}": row['id'] 
-                                 for _, row in clientes_df.iterrows()}
-                cliente_selecionado = st.selectbox("Cliente", list(cliente_options.keys()))
-                cliente_id = cliente_options[cliente_selecionado]
+                documentos = formatters.format_cpf_cnpj_series(clientes_df['cpf_cnpj'])
+                cliente_options = {f"{nome} - {documento}": int(id_)
+                                   for nome, documento, id_ in zip(clientes_df['nome'], documentos, clientes_df['id'])}
+                cliente_selecionado = st.selectbox("Cliente", list(cliente_options.keys()),
+                                                   placeholder="Nenhum cliente encontrado")
+                cliente_id = cliente_options.get(cliente_selecionado)
                 
                 # Seleção de veículo
-                veiculo_options = {f"{row['modelo']} - {row['placa']}": row['id'] 
-                                 for _, row in veiculos_df.iterrows()}
-                veiculo_selecionado = st.selectbox("Veículo", list(veiculo_options.keys()))
-                veiculo_id = veiculo_options[veiculo_selecionado]
+                veiculo_options = {f"{modelo} - {placa}": int(id_)
+                                   for modelo, placa, id_ in zip(veiculos_df['modelo'], veiculos_df['placa'], veiculos_df['id'])}
+                veiculo_selecionado = st.selectbox("Veículo", list(veiculo_options.keys()),
+                                                   placeholder="Nenhum veículo encontrado")
+                veiculo_id = veiculo_options.get(veiculo_selecionado)
                 
                 # Datas
                 data_inicio = st.date_input("Data de Início")
@@ -520,9 +396,9 @@ def main():
                 observacoes = st.text_area("Observações (opcional)")
             
                 # Campo para número da fatura (editável)
-                # Obter próximo número como sugestão
+                # Obter próximo número como sugestão (sem reservá-lo)
                 if 'proximo_numero_fatura' not in st.session_state:
-                    st.session_state.proximo_numero_fatura = db.get_next_invoice_number()
+                    st.session_state.proximo_numero_fatura = db.peek_next_invoice_number()
                 
                 numero_fatura_input = st.text_input(
                     "Número da Fatura", 
@@ -539,93 +415,59 @@ def main():
             
             # Botão para gerar fatura
             if st.form_submit_button("🧾 Gerar Fatura", use_container_width=True):
-                if dias > 0 and valor_total > 0 and numero_fatura_input.strip():
+                if cliente_id is None or veiculo_id is None:
+                    st.error("❌ Selecione um cliente e um veículo")
+                elif dias > 0 and valor_total > 0 and numero_fatura_input.strip():
                     try:
-                        # Validar se o número da fatura já existe
-                        fatura_existente = db.execute_query(
-                            "SELECT id FROM faturas WHERE numero_fatura = ?", 
-                            (numero_fatura_input.strip(),), 
-                            fetch_one=True
+                        # Emitir fatura, atualizar sequência e registrar receita em uma única transação
+                        # Mantida a sugestão, o número é alocado atomicamente na emissão
+                        # (outra sessão pode ter usado o número sugerido nesse meio tempo)
+                        numero_escolhido = numero_fatura_input.strip()
+                        if numero_escolhido == st.session_state.proximo_numero_fatura:
+                            numero_escolhido = None
+                        
+                        emissao = db.issue_invoice(
+                            numero_fatura=numero_escolhido,
+                            cliente_id=cliente_id,
+                            veiculo_id=veiculo_id,
+                            data_inicio=data_inicio.strftime('%Y-%m-%d'),
+                            data_fim=data_fim.strftime('%Y-%m-%d'),
+                            dias=dias,
+                            valor_diaria=valor_diaria,
+                            valor_total=valor_total,
+                            observacoes=observacoes,
+                            data_emissao=data_emissao.strftime('%Y-%m-%d %H:%M:%S')
                         )
+                        numero_fatura = emissao['fatura']['numero_fatura']
+                        etapas.mark("emissao")
                         
-                        if fatura_existente:
-                            st.error(f"❌ Número de fatura {numero_fatura_input} já existe. Escolha outro número.")
-                        else:
-                            # Obter dados do veículo
-                            veiculo_data = db.get_veiculo_by_id(veiculo_id)
-                            
-                            # Usar o número da fatura informado
-                            numero_fatura = numero_fatura_input.strip()
+                        # Gerar PDF
+                        pdf_path = cached_invoice_pdf(cache_pdf(), emissao)
+                        etapas.mark("pdf")
                         
-                            # Salvar fatura no banco
-                            fatura_id = db.add_fatura(
-                                numero_fatura=numero_fatura,
-                                cliente_id=cliente_id,
-                                veiculo_id=veiculo_id,
-                                data_inicio=data_inicio.strftime('%Y-%m-%d'),
-                                data_fim=data_fim.strftime('%Y-%m-%d'),
-                                dias=dias,
-                                valor_diaria=valor_diaria,
-                                valor_total=valor_total,
-                                observacoes=observacoes,
-                                data_emissao=data_emissao.strftime('%Y-%m-%d %H:%M:%S')
-                            )
-                            
-                            # Atualizar o último número de fatura se for maior que o atual
-                            try:
-                                numero_atual = int(numero_fatura)
-                                ultimo_numero_result = db.execute_query(
-                                    "SELECT valor FROM configuracoes WHERE chave = 'ultimo_numero_fatura'",
-                                    fetch_one=True
-                                )
-                                if ultimo_numero_result:
-                                    ultimo_numero = int(ultimo_numero_result[0])
-                                    if numero_atual > ultimo_numero:
-                                        db.execute_query(
-                                            "UPDATE configuracoes SET valor = ?, data_atualizacao = CURRENT_TIMESTAMP WHERE chave = 'ultimo_numero_fatura'",
-                                            (str(numero_atual),)
-                                        )
-                            except ValueError:
-                                # Se o número não for numérico, não atualiza a sequência
-                                pass
+                        del st.session_state.proximo_numero_fatura
                         
-                            # Adicionar transação de receita
-                            db.add_transacao(
-                                tipo="receita",
-                                descricao=f"Locação Mensal - {veiculo_data['modelo']} - {veiculo_data['placa']}",
-                                valor=valor_total,
-                                data_transacao=datetime.now().strftime('%Y-%m-%d'),
-                                categoria="Locação",
-                                fatura_id=fatura_id
-                            )
-                            
-                            # Obter dados para o PDF
-                            cliente_data = db.get_cliente_by_id(cliente_id)
-                            
-                            fatura_data = {
-                                'numero_fatura': numero_fatura,
-                                'data_inicio': data_inicio.strftime('%Y-%m-%d'),
-                                'data_fim': data_fim.strftime('%Y-%m-%d'),
-                                'dias': dias,
-                                'valor_diaria': valor_diaria,
-                                'valor_total': valor_total,
-                                'observacoes': observacoes,
-                                'data_emissao': data_emissao.strftime('%Y-%m-%d')
-                            }
+                        if pdf_path:
+                            st.success(f"✅ Fatura {numero_fatura} gerada com sucesso!")
                             
-                            # Gerar PDF
-                            pdf_bytes = generate_professional_pdf(cliente_data, veiculo_data, fatura_data)
-                            
-                            if pdf_bytes:
-                                st.success(f"✅ Fatura {numero_fatura} gerada com sucesso!")
-                                
-                                # Armazenar PDF no session_state para download fora do form
-                                st.session_state.pdf_data = pdf_bytes
-                                st.session_state.pdf_filename = f"fatura_{numero_fatura}.pdf"
-                                st.session_state.show_download = True
-                            else:
-                                st.error("❌ Erro ao gerar PDF da fatura")
-                                
+                            # Só a fatura fica na sessão: o PDF é lido do cache em disco no download
+                            st.session_state.pdf_fatura_id = emissao['fatura_id']
+                            st.session_state.pdf_path = pdf_path
+                            st.session_state.pdf_filename = f"fatura_{numero_fatura}.pdf"
+                            st.session_state.show_download = True
+                        else:
+                            st.error("❌ Erro ao gerar PDF da fatura")
+                    
+                    except FaturaDuplicadaError:
+                        st.error(f"❌ Número de fatura {numero_fatura_input} já existe. Escolha outro número.")
+                    except VeiculoIndisponivelError as e:
+                        periodos = "; ".join(
+                            f"fatura {c['numero_fatura']}: "
+                            f"{datetime.strptime(c['data_inicio'][:10], '%Y-%m-%d').strftime('%d/%m/%Y')} a "
+                            f"{datetime.strptime(c['data_fim'][:10], '%Y-%m-%d').strftime('%d/%m/%Y')}"
+                            for c in e.conflitos
+                        )
+                        st.error(f"❌ Veículo já locado nesse período ({periodos}). Escolha outro veículo ou outras datas.")
                     except Exception as e:
                         st.error(f"❌ Erro ao gerar fatura: {str(e)}")
                 elif not numero_fatura_input.strip():
@@ -637,18 +479,22 @@ def main():
         col1, col2 = st.columns([3, 1])
         with col2:
             if st.button("🔄 Atualizar Número"):
-                st.session_state.proximo_numero_fatura = db.get_next_invoice_number()
+                st.session_state.proximo_numero_fatura = db.peek_next_invoice_number()
                 st.rerun()
         
         # Botão de download fora do formulário
         if hasattr(st.session_state, 'show_download') and st.session_state.show_download:
-            st.download_button(
-                label="📄 Baixar Fatura em PDF",
-                data=st.session_state.pdf_data,
-                file_name=st.session_state.pdf_filename,
-                mime="application/pdf",
-                use_container_width=True
-            )
+            conteudo = conteudo_do_pdf(st.session_state.pdf_fatura_id, st.session_state.pdf_path)
+            if conteudo is None:
+                st.error("Erro ao gerar PDF da fatura")
+            else:
+                st.download_button(
+                    label="📄 Baixar Fatura em PDF",
+                    data=conteudo,
+                    file_name=st.session_state.pdf_filename,
+                    mime="application/pdf",
+                    use_container_width=True
+                )
             # Limpar após download
             if st.button("🔄 Nova Fatura"):
                 st.session_state.show_download = False
@@ -663,14 +509,16 @@ def main():
         tab1, tab2 = st.tabs(["📋 Lista de Clientes", "➕ Novo Cliente"])
         
         with tab1:
-            clientes_df = db.get_clientes()
+            clientes_df = carregar("get_clientes")
+            etapas.mark("dados")
             if not clientes_df.empty:
                 # Formatar dados para exibição
                 clientes_display = clientes_df.copy()
-                clientes_display['cpf_cnpj'] = clientes_display['cpf_cnpj'].apply(format_cpf_cnpj)
-                clientes_display['telefone'] = clientes_display['telefone'].apply(format_phone)
+                clientes_display['cpf_cnpj'] = formatters.format_cpf_cnpj_series(clientes_display['cpf_cnpj'])
+                clientes_display['telefone'] = formatters.format_phone_series(clientes_display['telefone'])
                 
                 st.dataframe(clientes_display, use_container_width=True)
+                etapas.mark("tabelas")
             else:
                 st.info("Nenhum cliente cadastrado.")
         
@@ -757,13 +605,15 @@ def main():
         tab1, tab2 = st.tabs(["📋 Lista de Veículos", "➕ Novo Veículo"])
         
         with tab1:
-            veiculos_df = db.get_veiculos()
+            veiculos_df = carregar("get_veiculos")
+            etapas.mark("dados")
             if not veiculos_df.empty:
                 # Formatar dados para exibição
                 veiculos_display = veiculos_df.copy()
-                veiculos_display['valor_diaria'] = veiculos_display['valor_diaria'].apply(format_currency)
+                veiculos_display['valor_diaria'] = formatters.format_currency_series(veiculos_display['valor_diaria'])
                 
                 st.dataframe(veiculos_display, use_container_width=True)
+                etapas.mark("tabelas")
             else:
                 st.info("Nenhum veículo cadastrado.")
         
@@ -798,12 +648,14 @@ def main():
         tab1, tab2 = st.tabs(["📊 Resumo Financeiro", "➕ Nova Transação"])
         
         with tab1:
-            transacoes_df = db.get_transacoes()
+            resumo_tipo = carregar("get_resumo_transacoes")
+            etapas.mark("dados")
             
-            if not transacoes_df.empty:
+            if not resumo_tipo.empty:
                 # Métricas financeiras
-                receitas = transacoes_df[transacoes_df['tipo'] == 'receita']['valor'].sum()
-                despesas = transacoes_df[transacoes_df['tipo'] == 'despesa']['valor'].sum()
+                totais = dict(zip(resumo_tipo['tipo'], resumo_tipo['valor']))
+                receitas = totais.get('receita', 0.0)
+                despesas = totais.get('despesa', 0.0)
                 saldo = receitas - despesas
                 
                 col1, col2, col3 = st.columns(3)
@@ -820,19 +672,26 @@ def main():
                 
                 # Gráfico de receitas vs despesas
                 st.subheader("📈 Receitas vs Despesas")
-                resumo_tipo = transacoes_df.groupby('tipo')['valor'].sum().reset_index()
                 
+                import plotly.express as px
                 fig = px.bar(resumo_tipo, x='tipo', y='valor',
                            title="Receitas vs Despesas",
                            labels={'valor': 'Valor (R$)', 'tipo': 'Tipo'},
                            color='tipo')
                 st.plotly_chart(fig, use_container_width=True)
+                etapas.mark("graficos")
                 
-                # Lista de transações
+                # Lista de transações (paginada no banco)
                 st.subheader("📋 Últimas Transações")
-                transacoes_display = transacoes_df.copy()
-                transacoes_display['valor'] = transacoes_display['valor'].apply(format_currency)
-                st.dataframe(transacoes_display, use_container_width=True)
+                
+                def formatar_transacoes(transacoes_display):
+                    transacoes_display = transacoes_display.copy()
+                    transacoes_display['valor'] = formatters.format_currency_series(transacoes_display['valor'])
+                    return transacoes_display
+                
+                exibir_paginado("transacoes", db.get_transacoes, 'data_transacao',
+                                formatar=formatar_transacoes)
+                etapas.mark("tabelas")
             else:
                 st.info("Nenhuma transação encontrada.")
         
@@ -877,17 +736,20 @@ def main():
         with col2:
             data_fim_filtro = st.date_input("Data de Fim", value=datetime.now())
         
-        # Obter dados filtrados
-        faturas_df = db.get_faturas()
-        transacoes_df = db.get_transacoes()
+        # Obter dados já filtrados pelo período no banco
+        faturas_filtradas = carregar(
+            "get_faturas",
+            data_inicio=data_inicio_filtro.strftime('%Y-%m-%d'),
+            data_fim=data_fim_filtro.strftime('%Y-%m-%d')
+        )
         
-        if not faturas_df.empty:
-            # Filtrar por data
-            faturas_df['data_emissao'] = pd.to_datetime(faturas_df['data_emissao'])
-            faturas_filtradas = faturas_df[
-                (faturas_df['data_emissao'].dt.date >= data_inicio_filtro) &
-                (faturas_df['data_emissao'].dt.date <= data_fim_filtro)
-            ]
+        if faturas_filtradas.empty and carregar("get_dashboard_metrics")['total_faturas'] == 0:
+            st.info("Nenhuma fatura encontrada.")
+        else:
+            import pandas as pd
+            import plotly.express as px
+            faturas_filtradas['data_emissao'] = pd.to_datetime(faturas_filtradas['data_emissao'])
+            etapas.mark("dados")
             
             if not faturas_filtradas.empty:
                 # Relatório de locações
@@ -910,24 +772,164 @@ def main():
                 st.subheader("📈 Evolução Diária de Receitas")
                 faturas_filtradas['data'] = faturas_filtradas['data_emissao'].dt.date
                 receita_diaria = faturas_filtradas.groupby('data')['valor_total'].sum().reset_index()
+                etapas.mark("dados")
                 
                 fig = px.line(receita_diaria, x='data', y='valor_total',
                             title="Receita Diária",
                             labels={'valor_total': 'Receita (R$)', 'data': 'Data'})
                 st.plotly_chart(fig, use_container_width=True)
+                etapas.mark("graficos")
                 
                 # Top clientes
                 st.subheader("🏆 Top Clientes")
                 top_clientes = faturas_filtradas.groupby('cliente_nome')['valor_total'].sum().sort_values(ascending=False).head(10)
+                etapas.mark("dados")
                 
                 fig = px.bar(x=top_clientes.values, y=top_clientes.index, orientation='h',
                            title="Top 10 Clientes por Receita",
                            labels={'x': 'Receita (R$)', 'y': 'Cliente'})
                 st.plotly_chart(fig, use_container_width=True)
+                etapas.mark("graficos")
+                
+                # Lista de faturas do período (paginada no banco)
+                st.subheader("📋 Faturas do Período")
+                periodo = f"{data_inicio_filtro:%Y%m%d}_{data_fim_filtro:%Y%m%d}"
+                
+                def carregar_faturas_periodo(limit, after):
+                    return db.get_faturas(
+                        data_inicio=data_inicio_filtro.strftime('%Y-%m-%d'),
+                        data_fim=data_fim_filtro.strftime('%Y-%m-%d'),
+                        limit=limit, after=after
+                    )
+                
+                pagina_faturas = exibir_paginado(f"faturas_{periodo}", carregar_faturas_periodo, 'data_emissao')
+                baixar_fatura(pagina_faturas, f"faturas_{periodo}")
+                etapas.mark("tabelas")
             else:
                 st.info("Nenhuma fatura encontrada no período selecionado.")
-        else:
-            st.info("Nenhuma fatura encontrada.")
+            
+            # PDFs das locações ativas no período (ex.: fechamento do mês), gerados em lote
+            with st.expander("📦 PDFs das Locações do Período"):
+                ids_lote = carregar("get_faturas_locacao_ids", data_inicio_filtro.strftime('%Y-%m-%d'),
+                                    data_fim_filtro.strftime('%Y-%m-%d'))
+                st.caption(f"{len(ids_lote)} faturas com locação entre {data_inicio_filtro:%d/%m/%Y} e {data_fim_filtro:%d/%m/%Y}")
+                if ids_lote and st.button("Gerar PDFs (ZIP)", key="gerar_lote_pdf"):
+                    import shutil
+                    import tempfile
+                    from invoice_pdf import render_batch
+                    anterior = st.session_state.get('lote_pdf')
+                    if anterior:
+                        shutil.rmtree(os.path.dirname(anterior['destino']), ignore_errors=True)
+                    destino = os.path.join(tempfile.mkdtemp(prefix="locauto_lote_"),
+                                           f"faturas_{data_inicio_filtro:%Y%m%d}_{data_fim_filtro:%Y%m%d}.zip")
+                    barra = st.progress(0.0, text="Gerando PDFs...")
+                    st.session_state.lote_pdf = render_batch(
+                        db, ids_lote, destino, cache=cache_pdf(),
+                        progress=lambda feitas, total: barra.progress(feitas / total, text=f"{feitas} de {total} PDFs")
+                    )
+                    etapas.mark("pdf")
+                
+                relatorio = st.session_state.get('lote_pdf')
+                if relatorio and os.path.exists(relatorio['destino']):
+                    st.caption(f"{relatorio['gerados']} de {relatorio['total']} PDFs ({relatorio['do_cache']} do cache) "
+                               f"em {relatorio['duracao_s']:.1f}s "
+                               f"({relatorio['faturas_por_s']:.1f} faturas/s, {relatorio['processos']} processos)")
+                    for falha in relatorio['falhas']:
+                        st.warning(f"⚠️ Fatura {falha['numero_fatura'] or falha['fatura_id']}: {falha['erro']}")
+                    with open(relatorio['destino'], 'rb') as arquivo:
+                        st.download_button("📥 Baixar PDFs (ZIP)", data=arquivo, file_name=os.path.basename(relatorio['destino']),
+                                           mime="application/zip")
+            
+            # Utilização da frota: dias locados x dias disponíveis por veículo e mês
+            st.subheader("🚗 Utilização da Frota")
+            meses_analise = st.slider("Meses analisados (até a Data de Fim)", 1, 36, 12)
+            inicio_analise = (pd.Timestamp(data_fim_filtro).to_period('M') - (meses_analise - 1)).to_timestamp().date()
+            utilizacao = _utilizacao_frota(db.data_version(), inicio_analise, data_fim_filtro)
+            resumo_frota = utilizacao['veiculos']
+            dias_disponiveis = resumo_frota['dias_disponiveis'].sum()
+            etapas.mark("analise_frota")
+            
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                taxa_media = resumo_frota['dias_locados'].sum() / dias_disponiveis if dias_disponiveis else 0
+                st.metric("Utilização Média", f"{taxa_media:.0%}")
+            
+            with col2:
+                receita_dia = resumo_frota['receita'].sum() / dias_disponiveis if dias_disponiveis else 0
+                st.metric("Receita por Dia Disponível", format_currency(receita_dia))
+            
+            with col3:
+                st.metric("Veículos sem Locação", int((resumo_frota['dias_locados'] == 0).sum()))
+            
+            # Mapa de calor veículo x mês (frotas grandes: tabela)
+            taxa_mensal = (utilizacao['taxa'] * 100).round(0)
+            taxa_mensal.index = resumo_frota['modelo'] + " - " + resumo_frota['placa']
+            if len(taxa_mensal) <= 60:
+                fig = px.imshow(taxa_mensal, aspect="auto", zmin=0, zmax=100, color_continuous_scale="Blues",
+                                title="Utilização por Veículo e Mês (%)",
+                                labels={'x': 'Mês', 'y': 'Veículo', 'color': 'Utilização (%)'})
+                st.plotly_chart(fig, use_container_width=True)
+            else:
+                st.dataframe(taxa_mensal, use_container_width=True)
+            etapas.mark("graficos")
+            
+            # Veículos menos utilizados primeiro
+            tabela_frota = resumo_frota.sort_values('utilizacao').rename(columns={
+                'modelo': 'Modelo', 'placa': 'Placa', 'dias_locados': 'Dias Locados',
+                'dias_disponiveis': 'Dias Disponíveis', 'utilizacao': 'Utilização (%)',
+                'receita': 'Receita', 'receita_por_dia_disponivel': 'Receita/Dia Disponível',
+                'maior_ociosidade_dias': 'Maior Período Parado (dias)',
+                'ociosidade_final_dias': 'Parado Há (dias)',
+            })
+            tabela_frota['Utilização (%)'] = (tabela_frota['Utilização (%)'] * 100).round(1)
+            tabela_frota['Receita'] = formatters.format_currency_series(tabela_frota['Receita'])
+            tabela_frota['Receita/Dia Disponível'] = formatters.format_currency_series(tabela_frota['Receita/Dia Disponível'].fillna(0))
+            st.dataframe(tabela_frota.reset_index(drop=True), use_container_width=True)
+            etapas.mark("tabelas")
+
+def registrar_primeira_renderizacao():
+    """Mede, na primeira execução de cada sessão, o tempo até a tela estar renderizada"""
+    if 'primeira_renderizacao_ms' not in st.session_state:
+        st.session_state.primeira_renderizacao_ms = (time.perf_counter() - _inicio_execucao) * 1000
+        logger.info(f"Primeira renderização em {st.session_state.primeira_renderizacao_ms:.0f} ms "
+                    f"(banco pronto em {db.startup_s * 1000:.0f} ms)")
+    st.sidebar.caption(f"⏱️ Carregado em {st.session_state.primeira_renderizacao_ms:.0f} ms")
+
+def registrar_execucao():
+    """Fecha o cronômetro desta execução, acumula as etapas e mostra o resumo na barra lateral"""
+    resultado = etapas.finish()
+    estatisticas_renderizacao().record(resultado)
+    pagina = resultado['pagina'].split(" ", 1)[-1]  # sem o ícone
+    for etapa, ms in list(resultado['etapas'].items()) + [("total", resultado['total_ms'])]:
+        _METRICA_PAGINAS.observe(ms / 1000, pagina, etapa)
+    st.sidebar.caption(f"⏱️ Esta execução: {resultado['total_ms']:.0f} ms ({format_stages(resultado)})")
+    # Painel de diagnóstico: abrir o app com ?desempenho=1
+    if st.query_params.get("desempenho"):
+        exibir_desempenho()
+
+def exibir_desempenho():
+    """Consultas mais custosas, consultas lentas com o plano e etapas por página"""
+    import pandas as pd
+    st.divider()
+    st.subheader("⏱️ Desempenho")
+    
+    st.markdown("**Consultas (por tempo total)**")
+    st.dataframe(pd.DataFrame(db.query_stats()).head(20).round(2), use_container_width=True)
+    
+    st.markdown("**Etapas por página**")
+    st.dataframe(pd.DataFrame(estatisticas_renderizacao().stats()).round(1), use_container_width=True)
+    
+    st.markdown("**Consultas lentas**")
+    lentas = db.slow_queries()
+    if not lentas:
+        st.caption("Nenhuma consulta lenta registrada.")
+    for lenta in lentas[:10]:
+        st.caption(f"{lenta['quando']} · {lenta['duracao_ms']:.1f} ms · {lenta['linhas']} linhas · {lenta['local']}")
+        st.code(f"{lenta['consulta']}\n\n{lenta['plano']}", language="sql")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    etapas = RenderTimer(db.monitor)
+    main()
+    registrar_primeira_renderizacao()
+    registrar_execucao()
\ No newline at end of file
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Métricas do LocAuto no formato texto do Prometheus
+Registro de contadores, medidores e histogramas alimentado pelo DatabaseManager (consultas,
+cache, tamanho do banco e do WAL, backups), pela geração de PDF e pelo cronômetro das
+páginas, exposto por um endpoint HTTP local e/ou por um arquivo regravado periodicamente
+(para o textfile collector do node_exporter)
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from instrumentation import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Exposição (desligada por padrão): porta do endpoint HTTP local e/ou arquivo regravado
+METRICS_PORT = os.environ.get("LOCAUTO_METRICS_PORT")
+METRICS_ADDR = os.environ.get("LOCAUTO_METRICS_ADDR", "127.0.0.1")
+METRICS_FILE = os.environ.get("LOCAUTO_METRICS_FILE")
+METRICS_INTERVAL_S = float(os.environ.get("LOCAUTO_METRICS_INTERVAL", "15"))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Limites superiores (inclusivos) dos baldes, em segundos
+LATENCY_BUCKETS_S = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                     0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SLOW_BUCKETS_S = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# Amostra de coletor: (nome, tipo, ajuda, [(rótulos, valor)])
+Amostra = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _valor(valor: float) -> str:
+    """Número no formato de exposição (inteiros sem casa decimal, +Inf/-Inf/NaN)"""
+    if isinstance(valor, int):
+        return str(valor)
+    if math.isnan(valor):
+        return "NaN"
+    if math.isinf(valor):
+        return "+Inf" if valor > 0 else "-Inf"
+    return str(int(valor)) if valor.is_integer() and abs(valor) < 1e15 else repr(valor)
+
+
+def _escapar(valor: Any) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rotulos(nomes: Iterable[str], valores: Iterable[Any]) -> str:
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class _Metric:
+    """Família de métricas: um valor por combinação de rótulos (passados na ordem de `rotulos`)"""
+
+    tipo = "untyped"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Tuple[str, ...] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._valores: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _cabecalho(self) -> List[str]:
+        return [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+
+    def expose(self) -> List[str]:
+        with self._lock:
+            valores = sorted(self._valores.items())
+        return self._cabecalho() + [f"{self.nome}{_rotulos(self.rotulos, chave)} {_valor(valor)}"
+                                    for chave, valor in valores]
+
+
+class Counter(_Metric):
+    """Contador que só cresce"""
+
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Tuple[str, ...] = ()):
+        super().__init__(nome, ajuda, rotulos)
+        if not self.rotulos:
+            self._valores[()] = 0
+
+    def inc(self, *rotulos: str, valor: float = 1):
+        with self._lock:
+            self._valores[rotulos] = self._valores.get(rotulos, 0) + valor
+
+
+class Gauge(_Metric):
+    """Medidor: último valor informado"""
+
+    tipo = "gauge"
+
+    def set(self, valor: float, *rotulos: str):
+        with self._lock:
+            self._valores[rotulos] = valor
+
+
+class HistogramMetric(_Metric):
+    """Histograma de baldes fixos (instrumentation.Histogram) por combinação de rótulos"""
+
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS_S):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(buckets)
+
+    def observe(self, valor: float, *rotulos: str):
+        with self._lock:
+            histograma = self._valores.get(rotulos)
+            if histograma is None:
+                histograma = self._valores[rotulos] = Histogram(self.buckets)
+            histograma.observe(valor)
+
+    def expose(self) -> List[str]:
+        with self._lock:
+            valores = [(chave, histograma.cumulative(), histograma.total, histograma.count)
+                       for chave, histograma in sorted(self._valores.items())]
+        linhas = self._cabecalho()
+        nomes = self.rotulos + ("le",)
+        for chave, acumulados, total, quantidade in valores:
+            for limite, acumulado in acumulados:
+                linhas.append(f"{self.nome}_bucket{_rotulos(nomes, chave + (_valor(float(limite)),))} {acumulado}")
+            linhas.append(f"{self.nome}_sum{_rotulos(self.rotulos, chave)} {_valor(total)}")
+            linhas.append(f"{self.nome}_count{_rotulos(self.rotulos, chave)} {quantidade}")
+        return linhas
+
+
+class MetricsRegistry:
+    """Métricas registradas e coletores chamados a cada leitura.
+
+    counter/gauge/histogram devolvem a métrica já existente com o mesmo nome, então podem
+    ser chamados de novo a cada rerun do Streamlit. Coletores calculam valores caros (tamanho
+    de arquivos, estatísticas do cache) só quando as métricas são lidas; métodos de objetos
+    são guardados por referência fraca e somem junto com o objeto.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Optional[Callable[[], Iterable[Amostra]]]]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, classe, nome: str, *args, **kwargs):
+        with self._lock:
+            metrica = self._metrics.get(nome)
+            if metrica is None:
+                metrica = self._metrics[nome] = classe(nome, *args, **kwargs)
+            elif not isinstance(metrica, classe):
+                raise ValueError(f"Métrica {nome} já registrada como {metrica.tipo}")
+            return metrica
+
+    def counter(self, nome: str, ajuda: str, rotulos: Tuple[str, ...] = ()) -> Counter:
+        return self._get_or_create(Counter, nome, ajuda, rotulos)
+
+    def gauge(self, nome: str, ajuda: str, rotulos: Tuple[str, ...] = ()) -> Gauge:
+        return self._get_or_create(Gauge, nome, ajuda, rotulos)
+
+    def histogram(self, nome: str, ajuda: str, rotulos: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS_S) -> HistogramMetric:
+        return self._get_or_create(HistogramMetric, nome, ajuda, rotulos, buckets)
+
+    def add_collector(self, coletor: Callable[[], Iterable[Amostra]]):
+        """Registra uma função que devolve amostras (nome, tipo, ajuda, [(rótulos, valor)])"""
+        referencia = weakref.WeakMethod(coletor) if hasattr(coletor, "__self__") else (lambda: coletor)
+        with self._lock:
+            self._collectors.append(referencia)
+
+    def remove_collector(self, coletor: Callable[[], Iterable[Amostra]]):
+        with self._lock:
+            self._collectors = [referencia for referencia in self._collectors
+                                if referencia() is not None and referencia() != coletor]
+
+    def expose(self) -> str:
+        """Todas as métricas no formato texto do Prometheus (versão 0.0.4)"""
+        with self._lock:
+            metricas = list(self._metrics.values())
+            self._collectors = [referencia for referencia in self._collectors if referencia() is not None]
+            coletores = [referencia() for referencia in self._collectors]
+
+        linhas: List[str] = []
+        for metrica in metricas:
+            linhas.extend(metrica.expose())
+
+        # Amostras de coletores com o mesmo nome (ex.: dois bancos) saem sob um único cabeçalho
+        familias: Dict[str, Tuple[str, str, List[str]]] = {}
+        for coletor in coletores:
+            if coletor is None:
+                continue
+            try:
+                for nome, tipo, ajuda, amostras in coletor():
+                    familia = familias.setdefault(nome, (tipo, ajuda, []))
+                    familia[2].extend(f"{nome}{_rotulos(rotulos.keys(), rotulos.values())} {_valor(valor)}"
+                                      for rotulos, valor in amostras)
+            except Exception as e:
+                logger.error(f"Erro ao coletar métricas: {e}")
+        for nome, (tipo, ajuda, amostras) in familias.items():
+            linhas.extend([f"# HELP {nome} {ajuda}", f"# TYPE {nome} {tipo}"] + amostras)
+        return "\n".join(linhas) + "\n"
+
+
+# Registro do processo, compartilhado por DatabaseManager, geração de PDF e páginas
+REGISTRY = MetricsRegistry()
+
+
+def write_file(caminho: str, registry: MetricsRegistry = REGISTRY):
+    """Grava as métricas em `caminho` de forma atômica (o leitor nunca vê um arquivo pela metade)"""
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        arquivo.write(registry.expose())
+    os.replace(temporario, caminho)
+
+
+def start_file_dump(caminho: str, intervalo_s: float = METRICS_INTERVAL_S,
+                    registry: MetricsRegistry = REGISTRY) -> threading.Thread:
+    """Regrava o arquivo de métricas a cada `intervalo_s` segundos em uma thread de segundo plano"""
+    def gravar_periodicamente():
+        while True:
+            try:
+                write_file(caminho, registry)
+            except Exception as e:
+                logger.error(f"Erro ao gravar métricas em {caminho}: {e}")
+            time.sleep(intervalo_s)
+
+    thread = threading.Thread(target=gravar_periodicamente, name="locauto-metricas-arquivo", daemon=True)
+    thread.start()
+    logger.info(f"Métricas gravadas em {caminho} a cada {intervalo_s:g}s")
+    return thread
+
+
+def start_http_server(porta: int, endereco: str = METRICS_ADDR, registry: MetricsRegistry = REGISTRY):
+    """Serve GET /metrics em uma thread de segundo plano; retorna o servidor (server_address, shutdown)"""
+    # http.server só é carregado quando o endpoint é ligado
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            try:
+                corpo = registry.expose().encode("utf-8")
+            except Exception as e:
+                logger.error(f"Erro ao expor métricas: {e}")
+                self.send_error(500)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, formato, *args):
+            logger.debug(formato % args)
+
+    servidor = ThreadingHTTPServer((endereco, porta), MetricsHandler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name="locauto-metricas-http", daemon=True).start()
+    logger.info(f"Métricas em http://{servidor.server_address[0]}:{servidor.server_address[1]}/metrics")
+    return servidor
+
+
+def start_exporters(registry: MetricsRegistry = REGISTRY) -> Dict[str, Any]:
+    """Liga a exposição configurada por LOCAUTO_METRICS_PORT e/ou LOCAUTO_METRICS_FILE"""
+    iniciados: Dict[str, Any] = {}
+    if METRICS_PORT:
+        try:
+            iniciados["http"] = start_http_server(int(METRICS_PORT), METRICS_ADDR, registry)
+        except Exception as e:
+            logger.error(f"Erro ao iniciar endpoint de métricas na porta {METRICS_PORT}: {e}")
+    if METRICS_FILE:
+        iniciados["arquivo"] = start_file_dump(METRICS_FILE, METRICS_INTERVAL_S, registry)
+    return iniciados
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Migrações versionadas do esquema do banco LocAuto
+Cada migração é aplicada uma única vez e registrada na tabela schema_version
+"""
+
+import logging
+import sqlite3
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+
+def _schema_inicial(cursor):
+    """Cria as tabelas principais do sistema"""
+    # Tabela de clientes
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS clientes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            cpf_cnpj TEXT UNIQUE NOT NULL,
+            telefone TEXT,
+            endereco TEXT,
+            rua TEXT,
+            numero TEXT,
+            complemento TEXT,
+            bairro TEXT,
+            cidade TEXT,
+            uf TEXT,
+            cep TEXT,
+            email TEXT,
+            data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            ativo BOOLEAN DEFAULT 1
+        )
+    """)
+
+    # Tabela de veículos
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS veiculos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            modelo TEXT NOT NULL,
+            placa TEXT UNIQUE NOT NULL,
+            ano INTEGER,
+            cor TEXT,
+            valor_diaria REAL NOT NULL,
+            disponivel BOOLEAN DEFAULT 1,
+            data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            ativo BOOLEAN DEFAULT 1
+        )
+    """)
+
+    # Tabela de faturas
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS faturas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            numero_fatura TEXT UNIQUE NOT NULL,
+            cliente_id INTEGER NOT NULL,
+            veiculo_id INTEGER NOT NULL,
+            data_inicio DATE NOT NULL,
+            data_fim DATE NOT NULL,
+            dias INTEGER NOT NULL,
+            valor_diaria REAL NOT NULL,
+            valor_total REAL NOT NULL,
+            observacoes TEXT,
+            data_emissao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status TEXT DEFAULT 'ativa',
+            FOREIGN KEY (cliente_id) REFERENCES clientes (id),
+            FOREIGN KEY (veiculo_id) REFERENCES veiculos (id)
+        )
+    """)
+
+    # Tabela de transações financeiras
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS transacoes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fatura_id INTEGER,
+            tipo TEXT NOT NULL, -- 'receita' ou 'despesa'
+            descricao TEXT NOT NULL,
+            valor REAL NOT NULL,
+            data_transacao DATE NOT NULL,
+            categoria TEXT,
+            data_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (fatura_id) REFERENCES faturas (id)
+        )
+    """)
+
+    # Tabela de configurações
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS configuracoes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chave TEXT UNIQUE NOT NULL,
+            valor TEXT NOT NULL,
+            descricao TEXT,
+            data_atualizacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Inserir configuração inicial do número da fatura
+    cursor.execute("""
+        INSERT OR IGNORE INTO configuracoes (chave, valor, descricao)
+        VALUES ('ultimo_numero_fatura', '0', 'Último número de fatura gerado')
+    """)
+
+
+def _endereco_clientes(cursor):
+    """Adiciona os campos de endereço separados em bancos criados antes deles existirem"""
+    cursor.execute("PRAGMA table_info(clientes)")
+    columns = [column[1] for column in cursor.fetchall()]
+
+    new_columns = [
+        ('rua', 'TEXT'),
+        ('numero', 'TEXT'),
+        ('complemento', 'TEXT'),
+        ('bairro', 'TEXT'),
+        ('cidade', 'TEXT'),
+        ('uf', 'TEXT'),
+        ('cep', 'TEXT')
+    ]
+
+    for column_name, column_type in new_columns:
+        if column_name not in columns:
+            cursor.execute(f"ALTER TABLE clientes ADD COLUMN {column_name} {column_type}")
+            logger.info(f"Coluna {column_name} adicionada à tabela clientes")
+
+
+def _indices_consultas(cursor):
+    """Cria os índices usados pelas listagens, junções e filtros de soft-delete"""
+    # Listagens de ativos ordenadas (get_clientes / get_veiculos)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_clientes_nome_ativos ON clientes (nome) WHERE ativo = 1")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_veiculos_modelo_ativos ON veiculos (modelo) WHERE ativo = 1")
+
+    # Faturas: ordenação por emissão (cobre somas de receita) e junções
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_faturas_data_emissao ON faturas (data_emissao, valor_total)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_faturas_cliente ON faturas (cliente_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_faturas_veiculo ON faturas (veiculo_id, data_inicio, data_fim)")
+
+    # Transações: ordenação por data e totais por tipo
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transacoes_data ON transacoes (data_transacao)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transacoes_tipo_data ON transacoes (tipo, data_transacao, valor)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transacoes_fatura ON transacoes (fatura_id)")
+
+    cursor.execute("ANALYZE")
+
+
+def _resumos_faturas(cursor):
+    """Cria tabelas de resumo do Dashboard mantidas por triggers (receita por mês e locações por veículo)"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS resumo_faturas_mes (
+            mes TEXT PRIMARY KEY,
+            faturas INTEGER NOT NULL DEFAULT 0,
+            receita REAL NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS resumo_locacoes_veiculo (
+            veiculo_id INTEGER PRIMARY KEY,
+            locacoes INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+
+    # Carga inicial a partir das faturas existentes
+    cursor.execute("DELETE FROM resumo_faturas_mes")
+    cursor.execute("""
+        INSERT INTO resumo_faturas_mes (mes, faturas, receita)
+        SELECT IFNULL(strftime('%Y-%m', data_emissao), ''), COUNT(*), SUM(valor_total)
+        FROM faturas
+        GROUP BY 1
+    """)
+    cursor.execute("DELETE FROM resumo_locacoes_veiculo")
+    cursor.execute("""
+        INSERT INTO resumo_locacoes_veiculo (veiculo_id, locacoes)
+        SELECT veiculo_id, COUNT(*) FROM faturas GROUP BY veiculo_id
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_faturas_resumo_insert AFTER INSERT ON faturas
+        BEGIN
+            INSERT INTO resumo_faturas_mes (mes, faturas, receita)
+            VALUES (IFNULL(strftime('%Y-%m', NEW.data_emissao), ''), 1, NEW.valor_total)
+            ON CONFLICT (mes) DO UPDATE SET faturas = faturas + 1, receita = receita + excluded.receita;
+            INSERT INTO resumo_locacoes_veiculo (veiculo_id, locacoes)
+            VALUES (NEW.veiculo_id, 1)
+            ON CONFLICT (veiculo_id) DO UPDATE SET locacoes = locacoes + 1;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_faturas_resumo_delete AFTER DELETE ON faturas
+        BEGIN
+            UPDATE resumo_faturas_mes SET faturas = faturas - 1, receita = receita - OLD.valor_total
+            WHERE mes = IFNULL(strftime('%Y-%m', OLD.data_emissao), '');
+            UPDATE resumo_locacoes_veiculo SET locacoes = locacoes - 1
+            WHERE veiculo_id = OLD.veiculo_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_faturas_resumo_update
+        AFTER UPDATE OF data_emissao, valor_total, veiculo_id ON faturas
+        BEGIN
+            UPDATE resumo_faturas_mes SET faturas = faturas - 1, receita = receita - OLD.valor_total
+            WHERE mes = IFNULL(strftime('%Y-%m', OLD.data_emissao), '');
+            UPDATE resumo_locacoes_veiculo SET locacoes = locacoes - 1
+            WHERE veiculo_id = OLD.veiculo_id;
+            INSERT INTO resumo_faturas_mes (mes, faturas, receita)
+            VALUES (IFNULL(strftime('%Y-%m', NEW.data_emissao), ''), 1, NEW.valor_total)
+            ON CONFLICT (mes) DO UPDATE SET faturas = faturas + 1, receita = receita + excluded.receita;
+            INSERT INTO resumo_locacoes_veiculo (veiculo_id, locacoes)
+            VALUES (NEW.veiculo_id, 1)
+            ON CONFLICT (veiculo_id) DO UPDATE SET locacoes = locacoes + 1;
+        END
+    """)
+
+
+def _indice_paginacao_faturas(cursor):
+    """Troca o índice de emissão por (data_emissao, id) para a paginação por chave"""
+    # As somas de receita passaram a vir de resumo_faturas_mes; o índice só precisa
+    # manter a ordem (data_emissao, rowid) usada no ORDER BY e no cursor das páginas
+    cursor.execute("DROP INDEX IF EXISTS idx_faturas_data_emissao")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_faturas_data_emissao ON faturas (data_emissao)")
+
+
+def _numeros_fatura_livres(cursor):
+    """Cria o estoque de números de fatura reservados e devolvidos sem uso"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS numeros_fatura_livres (
+            numero INTEGER PRIMARY KEY,
+            liberado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _numeros_fatura_reservados(cursor):
+    """Registra os números de fatura reservados e ainda não usados nem devolvidos"""
+    # Só um número desta tabela pode voltar ao estoque: sem ela, qualquer lacuna antiga da
+    # numeração podia ser "devolvida" e sugerida de novo abaixo das faturas já emitidas
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS numeros_fatura_reservados (
+            numero INTEGER PRIMARY KEY,
+            reservado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+# Texto indexado na busca: o documento e a placa entram também só com letras e dígitos,
+# para que "123.456.789-00" e "12345678900" (ou "ABC-1234" e "ABC1234") se encontrem
+def _busca_clientes_valores(t: str) -> str:
+    """Valores indexados em clientes_busca, a partir da linha `t` (NEW, OLD ou a tabela)"""
+    documento = f"REPLACE(REPLACE(REPLACE(REPLACE({t}.cpf_cnpj, '.', ''), '-', ''), '/', ''), ' ', '')"
+    return (f"{t}.nome, {t}.cpf_cnpj || ' ' || {documento}, IFNULL({t}.cidade, ''), "
+            f"IFNULL({t}.endereco, '') || ' ' || IFNULL({t}.rua, '') || ' ' || IFNULL({t}.bairro, '')")
+
+
+def _busca_veiculos_valores(t: str) -> str:
+    """Valores indexados em veiculos_busca, a partir da linha `t` (NEW, OLD ou a tabela)"""
+    return f"{t}.modelo, {t}.placa || ' ' || REPLACE(REPLACE({t}.placa, '-', ''), ' ', '')"
+
+
+def _busca_textual(cursor):
+    """Cria índices FTS5 (trigramas) de clientes e veículos, sincronizados por triggers"""
+    try:
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS clientes_busca
+            USING fts5(nome, documento, cidade, endereco, content='', tokenize='trigram')
+        """)
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS veiculos_busca
+            USING fts5(modelo, placa, content='', tokenize='trigram')
+        """)
+    except sqlite3.OperationalError as e:
+        # SQLite sem FTS5/trigram (anterior à 3.34): a busca usa LIKE
+        logger.warning(f"Busca textual indisponível, usando LIKE: {e}")
+        return
+
+    # Tabelas sem conteúdo (content=''): a remoção exige os mesmos valores indexados
+    for tabela, indice, colunas, valores, colunas_update in (
+        ("clientes", "clientes_busca", "nome, documento, cidade, endereco", _busca_clientes_valores,
+         "nome, cpf_cnpj, cidade, endereco, rua, bairro"),
+        ("veiculos", "veiculos_busca", "modelo, placa", _busca_veiculos_valores, "modelo, placa"),
+    ):
+        cursor.execute(f"INSERT INTO {indice} ({indice}) VALUES ('delete-all')")
+        cursor.execute(f"INSERT INTO {indice} (rowid, {colunas}) SELECT id, {valores(tabela)} FROM {tabela}")
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{tabela}_busca_insert AFTER INSERT ON {tabela}
+            BEGIN
+                INSERT INTO {indice} (rowid, {colunas}) VALUES (NEW.id, {valores('NEW')});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{tabela}_busca_delete AFTER DELETE ON {tabela}
+            BEGIN
+                INSERT INTO {indice} ({indice}, rowid, {colunas}) VALUES ('delete', OLD.id, {valores('OLD')});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{tabela}_busca_update AFTER UPDATE OF {colunas_update} ON {tabela}
+            BEGIN
+                INSERT INTO {indice} ({indice}, rowid, {colunas}) VALUES ('delete', OLD.id, {valores('OLD')});
+                INSERT INTO {indice} (rowid, {colunas}) VALUES (NEW.id, {valores('NEW')});
+            END
+        """)
+
+
+
+def _veiculo_livre_hoje(veiculo_id: str) -> str:
+    """Expressão SQL: o veículo não tem locação não cancelada que inclua a data de hoje"""
+    return f"""NOT EXISTS (
+        SELECT 1 FROM faturas f
+        WHERE f.veiculo_id = {veiculo_id}
+          AND f.data_fim >= date('now', 'localtime') AND f.data_inicio <= date('now', 'localtime')
+          AND IFNULL(f.status, 'ativa') <> 'cancelada'
+    )"""
+
+
+def _disponibilidade_veiculos(cursor):
+    """Indexa os períodos de locação por veículo e mantém veiculos.disponivel por triggers"""
+    # (veiculo_id, data_fim, data_inicio): a sobreposição com [inicio, fim] começa em
+    # data_fim >= inicio, então períodos já encerrados ficam fora da faixa lida no índice;
+    # o status completa um índice de cobertura para a verificação
+    cursor.execute("DROP INDEX IF EXISTS idx_faturas_veiculo")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_faturas_veiculo_periodo
+        ON faturas (veiculo_id, data_fim, data_inicio, status)
+    """)
+
+    # Carga inicial; a virada do dia é tratada por DatabaseManager.refresh_disponibilidade
+    cursor.execute(f"UPDATE veiculos SET disponivel = {_veiculo_livre_hoje('veiculos.id')}")
+
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_faturas_disponibilidade_insert AFTER INSERT ON faturas
+        BEGIN
+            UPDATE veiculos SET disponivel = {_veiculo_livre_hoje('veiculos.id')} WHERE id = NEW.veiculo_id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_faturas_disponibilidade_delete AFTER DELETE ON faturas
+        BEGIN
+            UPDATE veiculos SET disponivel = {_veiculo_livre_hoje('veiculos.id')} WHERE id = OLD.veiculo_id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_faturas_disponibilidade_update
+        AFTER UPDATE OF veiculo_id, data_inicio, data_fim, status ON faturas
+        BEGIN
+            UPDATE veiculos SET disponivel = {_veiculo_livre_hoje('veiculos.id')}
+            WHERE id IN (OLD.veiculo_id, NEW.veiculo_id);
+        END
+    """)
+
+    cursor.execute("ANALYZE")
+
+
+# Lista ordenada de migrações: (versão, descrição, função que recebe o cursor)
+MIGRATIONS = [
+    (1, "Esquema inicial", _schema_inicial),
+    (2, "Campos de endereço separados em clientes", _endereco_clientes),
+    (3, "Índices de consultas de faturas, transações e cadastros", _indices_consultas),
+    (4, "Resumos de faturas por mês e por veículo mantidos por triggers", _resumos_faturas),
+    (5, "Índice de paginação de faturas por data de emissão", _indice_paginacao_faturas),
+    (6, "Números de fatura devolvidos para reutilização", _numeros_fatura_livres),
+    (7, "Busca textual de clientes e veículos (FTS5)", _busca_textual),
+    (8, "Índice de períodos de locação e disponibilidade de veículos", _disponibilidade_veiculos),
+    (9, "Números de fatura reservados aguardando uso ou devolução", _numeros_fatura_reservados),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Retorna a versão do esquema registrada no banco (0 se nunca migrado)"""
+    cursor = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+    )
+    if cursor.fetchone() is None:
+        return 0
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def apply_migrations(conn: sqlite3.Connection) -> List[int]:
+    """Aplica, em ordem, as migrações ainda não registradas e retorna as versões aplicadas"""
+    # Caminho rápido: PRAGMA user_version (cabeçalho do arquivo) espelha a versão do esquema
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return []
+
+    if get_schema_version(conn) >= SCHEMA_VERSION:
+        # Banco migrado antes de user_version ser mantido
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+        return []
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            descricao TEXT NOT NULL,
+            aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+
+    aplicadas = []
+    for version, descricao, migration in MIGRATIONS:
+        # BEGIN IMMEDIATE impede que dois processos apliquem a mesma migração
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                continue
+
+            migration(conn.cursor())
+            conn.execute(
+                "INSERT INTO schema_version (version, descricao) VALUES (?, ?)",
+                (version, descricao)
+            )
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        aplicadas.append(version)
+        logger.info(f"Migração {version} aplicada: {descricao}")
+
+    return aplicadas
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Pasta e tamanho máximo (MB) do cache de PDFs
+DEFAULT_DIRECTORY = os.environ.get("LOCAUTO_PDF_CACHE_DIR", "pdf_cache")
+DEFAULT_MAX_MB = float(os.environ.get("LOCAUTO_PDF_CACHE_MB", "200"))
+
+
+def content_key(*partes: Any) -> str:
+    """SHA-256 do JSON canônico (chaves ordenadas) das partes"""
+    texto = json.dumps(partes, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+class PdfCache:
+    """Cache em disco de PDFs endereçado pelo conteúdo.
+
+    Cada PDF é gravado como <pasta>/<2 primeiros dígitos>/<chave>.pdf, em que a chave é o
+    hash dos dados que o geraram (ver content_key): dados iguais produzem o mesmo arquivo e
+    dados alterados, uma chave nova. O tamanho total é limitado a max_bytes; ao passar do
+    limite, os PDFs usados há mais tempo são descartados (o último uso é a data de
+    modificação do arquivo, então a ordem sobrevive a reinícios do app).
+    """
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY, max_bytes: int = int(DEFAULT_MAX_MB * 1024 * 1024)):
+        self.directory = directory
+        self.max_bytes = max(0, int(max_bytes))
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # chave -> bytes, do uso mais antigo ao mais recente
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+        metrics.REGISTRY.add_collector(self._coletar_metricas)
+
+    def _scan(self):
+        """Carrega os PDFs já gravados, do uso mais antigo ao mais recente"""
+        encontrados = []
+        for pasta in os.scandir(self.directory):
+            if not pasta.is_dir():
+                continue
+            for arquivo in os.scandir(pasta.path):
+                if arquivo.name.endswith(".pdf"):
+                    info = arquivo.stat()
+                    encontrados.append((info.st_mtime, arquivo.name[:-4], info.st_size))
+                elif arquivo.name.endswith(".tmp"):
+                    # Gravação interrompida
+                    os.remove(arquivo.path)
+        for _, chave, tamanho in sorted(encontrados):
+            self._entries[chave] = tamanho
+            self.total_bytes += tamanho
+
+    def path_of(self, chave: str) -> str:
+        return os.path.join(self.directory, chave[:2], f"{chave}.pdf")
+
+    def get(self, chave: str) -> Optional[str]:
+        """Caminho do PDF em cache (marcado como usado agora) ou None"""
+        caminho = self.path_of(chave)
+        try:
+            os.utime(caminho)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+                tamanho = self._entries.pop(chave, None)
+                if tamanho is not None:
+                    # Removido por fora (outro processo ou limpeza manual)
+                    self.total_bytes -= tamanho
+            return None
+        with self._lock:
+            self.hits += 1
+            if chave in self._entries:
+                self._entries.move_to_end(chave)
+            else:
+                # Gravado por outro processo que usa a mesma pasta
+                self._entries[chave] = os.path.getsize(caminho)
+                self.total_bytes += self._entries[chave]
+        return caminho
+
+    def put(self, chave: str, conteudo: bytes) -> str:
+        """Grava o PDF (de forma atômica) e descarta os menos usados se passar do limite"""
+        caminho = self.path_of(chave)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temporario = f"{caminho}.{threading.get_ident()}.tmp"
+        with open(temporario, "wb") as arquivo:
+            arquivo.write(conteudo)
+        os.replace(temporario, caminho)
+        with self._lock:
+            self.total_bytes += len(conteudo) - self._entries.pop(chave, 0)
+            self._entries[chave] = len(conteudo)
+            descartados = self._evict()
+        for descartado in descartados:
+            try:
+                os.remove(self.path_of(descartado))
+            except FileNotFoundError:
+                pass
+        if descartados:
+            logger.info(f"Cache de PDFs: {len(descartados)} arquivos descartados ({self.total_bytes} bytes em uso)")
+        return caminho
+
+    def _evict(self) -> List[str]:
+        """Chaves descartadas, das usadas há mais tempo, até caber no limite (o PDF mais recente fica)"""
+        descartados = []
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            chave, tamanho = self._entries.popitem(last=False)
+            self.total_bytes -= tamanho
+            self.evictions += 1
+            descartados.append(chave)
+        return descartados
+
+    def get_or_create(self, chave: str, gerar: Callable[[], Optional[bytes]]) -> Optional[str]:
+        """Caminho do PDF da chave, gerado por gerar() e gravado se ainda não estiver em cache.
+
+        Retorna None se gerar() não produzir o PDF.
+        """
+        caminho = self.get(chave)
+        if caminho is not None:
+            return caminho
+        conteudo = gerar()
+        if not conteudo:
+            return None
+        return self.put(chave, conteudo)
+
+    def stats(self) -> Dict[str, Any]:
+        """Estatísticas de uso do cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entradas': len(self._entries),
+                'bytes': self.total_bytes,
+                'capacidade_bytes': self.max_bytes,
+                'acertos': self.hits,
+                'falhas': self.misses,
+                'taxa_acerto': self.hits / total if total else 0.0,
+                'descartes': self.evictions,
+            }
+
+    def _coletar_metricas(self) -> List[metrics.Amostra]:
+        stats = self.stats()
+        pasta = {"pasta": os.path.basename(os.path.abspath(self.directory))}
+        return [
+            ("locauto_pdf_cache_hits_total", "counter", "PDFs de faturas servidos do cache em disco", [(pasta, stats['acertos'])]),
+            ("locauto_pdf_cache_misses_total", "counter", "PDFs de faturas ausentes do cache em disco", [(pasta, stats['falhas'])]),
+            ("locauto_pdf_cache_evictions_total", "counter", "PDFs descartados do cache para respeitar o tamanho máximo",
+             [(pasta, stats['descartes'])]),
+            ("locauto_pdf_cache_entries", "gauge", "PDFs guardados no cache em disco", [(pasta, stats['entradas'])]),
+            ("locauto_pdf_cache_bytes", "gauge", "Tamanho dos PDFs guardados no cache em disco", [(pasta, stats['bytes'])]),
+        ]
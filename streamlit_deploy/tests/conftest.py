@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# Os módulos do app são importados pelo nome (python locauto.py, streamlit run locauto.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database_manager import DatabaseManager  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Banco vazio em uma pasta temporária, com um cliente (id 1) e um veículo (id 1)"""
+    gerenciador = DatabaseManager(str(tmp_path / "locauto.db"), backup_dir=str(tmp_path / "backups"))
+    gerenciador.add_cliente("Cliente Teste", "12345678901")
+    gerenciador.add_veiculo("Gol", "ABC1D23", 2020, "Branco", 80.0)
+    yield gerenciador
+    gerenciador.close()
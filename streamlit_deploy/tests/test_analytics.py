@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from analytics import dias_desde_epoca, sequencias_ociosas, utilizacao_frota
+
+
+def dia(data):
+    return int(dias_desde_epoca([data])[0])
+
+
+def locacoes(*linhas):
+    return pd.DataFrame(
+        [(veiculo_id, None if inicio is None else dia(inicio), None if fim is None else dia(fim), valor)
+         for veiculo_id, inicio, fim, valor in linhas],
+        columns=["veiculo_id", "inicio", "fim", "valor_total"],
+    )
+
+
+def frota(*cadastros):
+    return pd.DataFrame({
+        "id": range(1, len(cadastros) + 1),
+        "modelo": [f"Modelo {i}" for i in range(len(cadastros))],
+        "placa": [f"ABC{i:04d}" for i in range(len(cadastros))],
+        "data_cadastro": list(cadastros),
+    })
+
+
+def test_utilizacao_por_mes():
+    resultado = utilizacao_frota(
+        locacoes((1, "2030-01-25", "2030-02-03", 1000.0),
+                 (1, "2030-02-01", "2030-02-05", 500.0)),  # sobreposta: dias não contam em dobro
+        frota("2029-06-01"), "2030-01-01", "2030-02-28")
+    mensal = resultado["mensal"].set_index("mes")
+    assert mensal["dias_locados"].tolist() == [7, 5]
+    assert mensal["dias_disponiveis"].tolist() == [31, 28]
+    assert np.allclose(mensal["receita"], [700.0, 800.0])
+    veiculo = resultado["veiculos"].loc[1]
+    assert veiculo["maior_ociosidade_dias"] == 24
+    assert veiculo["ociosidade_final_dias"] == 23
+
+
+def test_locacoes_sem_data_valida_sao_ignoradas():
+    dados = locacoes((1, "2030-01-10", "2030-01-19", 1000.0),
+                     (1, None, "2030-01-25", 300.0),
+                     (1, "2030-01-20", None, 300.0))
+    dados.loc[len(dados)] = [1, np.nan, np.nan, 300.0]
+    resultado = utilizacao_frota(dados, frota("2029-06-01"), "2030-01-01", "2030-01-31")
+    veiculo = resultado["veiculos"].loc[1]
+    assert veiculo["dias_locados"] == 10
+    assert veiculo["receita"] == 1000.0
+
+
+def test_veiculo_cadastrado_depois_do_periodo():
+    resultado = utilizacao_frota(locacoes((1, "2030-01-10", "2030-01-19", 1000.0)),
+                                 frota("2029-06-01", "2030-03-15"), "2030-01-01", "2030-01-31")
+    novo = resultado["veiculos"].loc[2]
+    assert novo["dias_disponiveis"] == 0
+    assert novo["maior_ociosidade_dias"] == 0
+    assert novo["ociosidade_final_dias"] == 0
+    assert np.isnan(resultado["taxa"].loc[2, "2030-01"])
+
+
+def test_sequencias_ociosas_sem_locacoes():
+    vazio = np.array([], dtype=np.int64)
+    maior, final = sequencias_ociosas(vazio, vazio, vazio, np.array([10, 50]), 30)
+    assert maior.tolist() == [21, 0]
+    assert final.tolist() == [21, 0]
@@ -0,0 +1,49 @@
+from database_manager import _is_cacheable_query, _is_read_query
+
+
+def contar_clientes(db):
+    return db.execute_query("SELECT COUNT(*) FROM clientes", fetch_one=True)[0]
+
+
+def test_with_update_returning_executa_sempre(db):
+    db.execute_query("INSERT INTO configuracoes (chave, valor) VALUES ('contador', '0')")
+    query = """WITH n(x) AS (SELECT 1)
+               UPDATE configuracoes SET valor = valor + (SELECT x FROM n) WHERE chave = 'contador'
+               RETURNING valor"""
+    assert db.execute_query(query, fetch_one=True)[0] == "1"
+    assert db.execute_query(query, fetch_one=True)[0] == "2"
+    assert db.execute_query("SELECT valor FROM configuracoes WHERE chave = 'contador'", fetch_one=True)[0] == "2"
+
+
+def test_with_insert_invalida_o_cache(db):
+    assert contar_clientes(db) == 1
+    db.execute_query("""WITH novo(nome, cpf_cnpj) AS (SELECT 'Outro Cliente', '98765432100')
+                        INSERT INTO clientes (nome, cpf_cnpj) SELECT nome, cpf_cnpj FROM novo""")
+    assert contar_clientes(db) == 2
+    assert db.get_dataframe("SELECT COUNT(*) AS total FROM clientes")["total"][0] == 2
+
+
+def test_escrita_nao_reconhecida_invalida_o_cache(db):
+    assert contar_clientes(db) == 1
+    # Nome entre aspas: a expressão de tabelas alteradas não reconhece, total_changes sim
+    query = """WITH novo(nome, cpf_cnpj) AS (SELECT 'Outro Cliente', ?)
+               INSERT INTO "clientes" (nome, cpf_cnpj) SELECT nome, cpf_cnpj FROM novo RETURNING id"""
+    assert db.execute_query(query, ("98765432100",), fetch_one=True)[0] == 2
+    assert db.execute_query(query, ("11122233344",), fetch_one=True)[0] == 3
+    assert contar_clientes(db) == 3
+
+
+def test_pragma_nao_fica_no_cache(db):
+    assert db.execute_query("PRAGMA user_version", fetch_one=True)[0] == db.execute_query(
+        "PRAGMA user_version", fetch_one=True)[0]
+    db.execute_query("PRAGMA user_version = 77")
+    assert db.execute_query("PRAGMA user_version", fetch_one=True)[0] == 77
+
+
+def test_classificacao():
+    assert _is_read_query("SELECT * FROM clientes")
+    assert _is_cacheable_query("WITH t AS (SELECT 1) SELECT * FROM t")
+    assert not _is_read_query("WITH t AS (SELECT 1) DELETE FROM clientes WHERE id IN (SELECT * FROM t)")
+    assert not _is_read_query("WITH t AS (SELECT 1) REPLACE INTO configuracoes SELECT * FROM t")
+    assert _is_read_query("PRAGMA table_info(clientes)")
+    assert not _is_cacheable_query("PRAGMA table_info(clientes)")
@@ -0,0 +1,50 @@
+import pytest
+
+from database_manager import VeiculoIndisponivelError
+
+
+def emitir(db, inicio, fim, veiculo_id=1):
+    return db.issue_invoice(None, 1, veiculo_id, inicio, fim, 1, 80.0, 80.0)
+
+
+@pytest.mark.parametrize("inicio, fim", [
+    ("2030-01-10", "2030-01-20"),  # mesmo período
+    ("2030-01-05", "2030-01-10"),  # termina no primeiro dia
+    ("2030-01-20", "2030-01-25"),  # começa no último dia
+    ("2030-01-12", "2030-01-15"),  # dentro
+    ("2030-01-01", "2030-01-31"),  # cobre
+])
+def test_sobreposicao_rejeitada(db, inicio, fim):
+    emitir(db, "2030-01-10", "2030-01-20")
+    with pytest.raises(VeiculoIndisponivelError) as erro:
+        emitir(db, inicio, fim)
+    assert [c["numero_fatura"] for c in erro.value.conflitos] == ["000001"]
+    with pytest.raises(VeiculoIndisponivelError):
+        db.add_fatura("000099", 1, 1, inicio, fim, 1, 80.0, 80.0)
+    assert db.execute_query("SELECT COUNT(*) FROM faturas", fetch_one=True)[0] == 1
+    assert not db.is_veiculo_disponivel(1, inicio, fim)
+
+
+def test_periodos_adjacentes_aceitos(db):
+    emitir(db, "2030-01-10", "2030-01-20")
+    emitir(db, "2030-01-21", "2030-01-31")
+    db.add_fatura("000099", 1, 1, "2030-01-01", "2030-01-09", 9, 80.0, 720.0)
+    assert db.is_veiculo_disponivel(1, "2030-02-01", "2030-02-01")
+
+
+def test_outro_veiculo_no_mesmo_periodo(db):
+    db.add_veiculo("Uno", "XYZ9A87", 2021, "Prata", 70.0)
+    emitir(db, "2030-01-10", "2030-01-20")
+    emitir(db, "2030-01-10", "2030-01-20", veiculo_id=2)
+
+
+def test_fatura_cancelada_libera_o_veiculo(db):
+    fatura_id = emitir(db, "2030-01-10", "2030-01-20")["fatura_id"]
+    db.execute_query("UPDATE faturas SET status = 'cancelada' WHERE id = ?", (fatura_id,))
+    assert db.is_veiculo_disponivel(1, "2030-01-10", "2030-01-20")
+    emitir(db, "2030-01-15", "2030-01-25")
+
+
+def test_periodo_invertido(db):
+    with pytest.raises(ValueError):
+        emitir(db, "2030-01-20", "2030-01-10")
@@ -0,0 +1,37 @@
+import pytest
+
+from database_manager import FaturaDuplicadaError
+
+
+def contar(db, tabela):
+    return db.execute_query(f"SELECT COUNT(*) FROM {tabela}", fetch_one=True)[0]
+
+
+def test_emissao_grava_fatura_e_receita(db):
+    emissao = db.issue_invoice(None, 1, 1, "2030-01-01", "2030-01-30", 30, 80.0, 2400.0,
+                               data_transacao="2030-01-01")
+    assert emissao["fatura"]["numero_fatura"] == "000001"
+    assert emissao["cliente"]["nome"] == "Cliente Teste"
+    assert emissao["veiculo"]["placa"] == "ABC1D23"
+    receita = db.execute_query("SELECT fatura_id, tipo, valor FROM transacoes", fetch_all=True)
+    assert [tuple(linha) for linha in receita] == [(emissao["fatura_id"], "receita", 2400.0)]
+    assert db.peek_next_invoice_number() == "000002"
+
+
+def test_falha_nao_grava_nada(db):
+    with pytest.raises(ValueError):
+        db.issue_invoice(None, 999, 1, "2030-01-01", "2030-01-30", 30, 80.0, 2400.0)
+    assert contar(db, "faturas") == 0
+    assert contar(db, "transacoes") == 0
+    # O número alocado na transação desfeita não é consumido
+    assert db.peek_next_invoice_number() == "000001"
+
+
+def test_numero_duplicado(db):
+    db.issue_invoice("000010", 1, 1, "2030-01-01", "2030-01-30", 30, 80.0, 2400.0)
+    with pytest.raises(FaturaDuplicadaError):
+        db.issue_invoice("000010", 1, 1, "2030-03-01", "2030-03-30", 30, 80.0, 2400.0)
+    assert contar(db, "faturas") == 1
+    assert contar(db, "transacoes") == 1
+    # A sequência acompanha o maior número informado
+    assert db.peek_next_invoice_number() == "000011"
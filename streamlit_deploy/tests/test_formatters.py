@@ -0,0 +1,62 @@
+import math
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from formatters import (format_cpf_cnpj, format_cpf_cnpj_series, format_currency,
+                        format_currency_series, format_phone, format_phone_series)
+
+VALORES = [0, 0.005, 0.015, 0.125, 1, 1.005, 2.675, 999.995, 1000, 1234567.891, 99999999999.99,
+           1e11, 1e15, -0.0, -0.001, -0.005, -1.5, -1234.565, -1e12, math.nan, math.inf, -math.inf, None]
+
+DOCUMENTOS = [None, math.nan, "", "123", "1234567890", "12345678901", "123.456.789-01", "123456789012",
+              "12345678000195", "12.345.678/0001-95", "123456780001950", 12345678901, 12345678901.0,
+              "١٢٣٤٥٦٧٨٩٠١", "abc12345678901xyz"]
+
+TELEFONES = [None, math.nan, "", "9", "999817121", "3599981712", "35999817121", "(35) 99981-7121",
+             "+55 35 99981-7121", "359998171212", 35999817121, "٣٥٩٩٩٨١٧١٢١", "-35999817121"]
+
+
+def comparar(serie, formatar_serie, formatar, valores):
+    assert formatar_serie(serie).tolist() == [formatar(valor) for valor in valores]
+
+
+def test_moeda_igual_a_escalar():
+    serie = pd.Series(VALORES, index=range(10, 10 + len(VALORES)))
+    resultado = format_currency_series(serie)
+    # A coluna é lida como números: None vira NaN, como em pd.to_numeric
+    assert resultado.tolist() == [format_currency(valor) for valor in pd.to_numeric(serie)]
+    assert resultado.index.equals(serie.index)
+
+
+def test_moeda_valores_aleatorios():
+    rnd = random.Random(19)
+    valores = ([round(rnd.uniform(-1e6, 1e6), 3) for _ in range(2000)]
+               + [rnd.randrange(-10 ** 10, 10 ** 10) / 100 for _ in range(2000)])
+    comparar(pd.Series(valores), format_currency_series, format_currency, valores)
+
+
+@pytest.mark.parametrize("dtype", ["int64", "float64", "Float64"])
+def test_moeda_tipos_numericos(dtype):
+    valores = [0, 7, -42, 123456]
+    comparar(pd.Series(valores, dtype=dtype), format_currency_series, format_currency, valores)
+
+
+def test_moeda_serie_vazia():
+    assert format_currency_series(pd.Series([], dtype=np.float64)).tolist() == []
+
+
+def test_cpf_cnpj_igual_a_escalar():
+    comparar(pd.Series(DOCUMENTOS, dtype=object), format_cpf_cnpj_series, format_cpf_cnpj, DOCUMENTOS)
+
+
+def test_telefone_igual_a_escalar():
+    comparar(pd.Series(TELEFONES, dtype=object), format_phone_series, format_phone, TELEFONES)
+
+
+def test_textos_serie_vazia():
+    vazia = pd.Series([], dtype=object)
+    assert format_cpf_cnpj_series(vazia).tolist() == []
+    assert format_phone_series(vazia).tolist() == []
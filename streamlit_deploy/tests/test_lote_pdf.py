@@ -0,0 +1,57 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+import invoice_pdf
+
+
+@pytest.fixture
+def faturas(db):
+    return [db.issue_invoice(None, 1, 1, f"2030-01-{dia:02d}", f"2030-01-{dia:02d}", 1, 80.0, 80.0)["fatura_id"]
+            for dia in range(1, 4)]
+
+
+def gerados(metrica):
+    return sum(histograma.count for histograma in metrica._valores.values())
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_lote_em_pasta(db, faturas, tmp_path, workers):
+    antes = gerados(invoice_pdf._METRICA_PDF)
+    relatorio = invoice_pdf.render_batch(db, faturas + [999], str(tmp_path / "lote"), workers=workers)
+
+    assert relatorio["gerados"] == 3
+    assert [falha["fatura_id"] for falha in relatorio["falhas"]] == [999]
+    assert sorted(os.listdir(tmp_path / "lote")) == ["fatura_000001.pdf", "fatura_000002.pdf", "fatura_000003.pdf"]
+    # Cada PDF gerado entra uma vez na métrica, registrada neste processo
+    assert gerados(invoice_pdf._METRICA_PDF) - antes == 3
+
+
+RENDERIZAR = invoice_pdf._renderizar
+
+
+def renderizar_ou_travar(documento):
+    if documento["fatura"]["numero_fatura"] == "000001":
+        time.sleep(3600)
+    return RENDERIZAR(documento)
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(),
+                    reason="o processo de trabalho herda a função substituída só com fork")
+def test_processo_travado_encerra_o_lote(db, faturas, tmp_path, monkeypatch):
+    monkeypatch.setattr(invoice_pdf, "_renderizar", renderizar_ou_travar)
+    monkeypatch.setattr(invoice_pdf, "BATCH_TIMEOUT_S", 2.0)
+
+    inicio = time.perf_counter()
+    relatorio = invoice_pdf.render_batch(db, faturas, str(tmp_path / "lote.zip"), workers=2)
+    assert time.perf_counter() - inicio < 30
+
+    falhas = {falha["numero_fatura"]: falha["erro"] for falha in relatorio["falhas"]}
+    assert "000001" in falhas
+    assert falhas["000001"].startswith("Tempo esgotado")
+    assert relatorio["gerados"] + len(falhas) == 3
+    assert os.path.exists(tmp_path / "lote.zip")
+    # Nenhum processo do pool fica para trás, nem o travado
+    assert not multiprocessing.active_children()
@@ -0,0 +1,98 @@
+import logging
+
+import pytest
+
+from database_manager import DatabaseManager
+
+
+@pytest.fixture
+def backup(tmp_path):
+    """Outro banco com o mesmo cliente e veículo do fixture db e um veículo só dele"""
+    origem = DatabaseManager(str(tmp_path / "origem.db"), backup_dir=str(tmp_path / "backups_origem"))
+    origem.add_cliente("Cliente Teste", "12345678901")
+    origem.add_veiculo("Gol", "ABC1D23", 2020, "Branco", 80.0)
+    origem.add_veiculo("Uno", "XYZ9A87", 2021, "Prata", 70.0)
+    yield origem
+    origem.close()
+
+
+def emitir(db, numero, inicio, fim, veiculo_id=1):
+    return db.issue_invoice(numero, 1, veiculo_id, inicio, fim, 1, 80.0, 80.0)
+
+
+def mesclar(db, origem):
+    return db.merge_from_backup(origem.backup_database())
+
+
+def numeros(db):
+    return [row[0] for row in db.execute_query("SELECT numero_fatura FROM faturas ORDER BY numero_fatura",
+                                               fetch_all=True)]
+
+
+def test_fatura_sobreposta_nao_e_mesclada(db, backup):
+    emitir(db, "000001", "2030-01-10", "2030-01-20")
+    emitir(backup, "000101", "2030-01-15", "2030-01-18")  # sobrepõe a 000001
+    emitir(backup, "000102", "2030-01-21", "2030-01-31")  # adjacente
+    emitir(backup, "000103", "2030-01-10", "2030-01-20", veiculo_id=2)  # outro veículo
+
+    resultado = mesclar(db, backup)
+    assert resultado["faturas"] == {"backup": 3, "gravadas": 2, "ignoradas": 0, "conflitos": 1}
+    assert numeros(db) == ["000001", "000102", "000103"]
+    # A receita da fatura não mesclada também fica de fora
+    assert resultado["transacoes"]["gravadas"] == 2
+    assert db.execute_query("SELECT COUNT(*) FROM transacoes", fetch_one=True)[0] == 3
+
+
+def test_mesclagem_repetida(db, backup):
+    emitir(db, "000001", "2030-01-10", "2030-01-20")
+    emitir(backup, "000101", "2030-01-15", "2030-01-18")
+    emitir(backup, "000102", "2030-01-21", "2030-01-31")
+    caminho = backup.backup_database()
+
+    db.merge_from_backup(caminho)
+    resultado = db.merge_from_backup(caminho)
+    assert resultado["faturas"] == {"backup": 2, "gravadas": 0, "ignoradas": 1, "conflitos": 1}
+
+
+def test_sobreposicao_dentro_do_backup(db, backup):
+    # Backup anterior à verificação de disponibilidade, com locações sobrepostas
+    emitir(backup, "000101", "2030-01-10", "2030-01-20")
+    backup.execute_query(
+        """INSERT INTO faturas (numero_fatura, cliente_id, veiculo_id, data_inicio, data_fim, dias,
+                                valor_diaria, valor_total)
+           VALUES ('000102', 1, 1, '2030-01-18', '2030-01-28', 11, 80.0, 880.0)"""
+    )
+
+    resultado = mesclar(db, backup)
+    assert resultado["faturas"]["conflitos"] == 1
+    assert numeros(db) == ["000101"]
+
+
+def test_fatura_cancelada_e_mesclada(db, backup):
+    emitir(db, "000001", "2030-01-10", "2030-01-20")
+    fatura_id = emitir(backup, "000101", "2030-02-01", "2030-02-10")["fatura_id"]
+    backup.execute_query("UPDATE faturas SET data_inicio = '2030-01-15', status = 'cancelada' WHERE id = ?",
+                         (fatura_id,))
+
+    resultado = mesclar(db, backup)
+    assert resultado["faturas"]["conflitos"] == 0
+    assert numeros(db) == ["000001", "000101"]
+    assert db.is_veiculo_disponivel(1, "2030-01-21", "2030-01-31")
+
+
+def test_erro_ao_desanexar_nao_esconde_o_erro_original(db, backup, monkeypatch, caplog):
+    caminho = backup.backup_database()
+
+    def falhar(conn, tabela):
+        conn.execute("DETACH DATABASE backup")
+        raise RuntimeError("falha na mesclagem")
+
+    monkeypatch.setattr(db, "_merge_query", falhar)
+    with caplog.at_level(logging.ERROR, logger="database_manager"):
+        with pytest.raises(RuntimeError, match="falha na mesclagem"):
+            db.merge_from_backup(caminho)
+    assert "Erro ao desanexar o backup" in caplog.text
+
+    # A conexão volta ao pool utilizável
+    monkeypatch.undo()
+    assert db.merge_from_backup(caminho)["veiculos"]["gravadas"] == 1
@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+
+from bulk_import import ler_csv_em_blocos
+
+
+class Interrompida(Exception):
+    pass
+
+
+@pytest.fixture
+def legado(tmp_path):
+    """CSV antigo de despesas com descrições em várias linhas (campo entre aspas) e linhas em branco"""
+    caminho = tmp_path / "legado.csv"
+    linhas = ["Tipo,Descrição,Valor,Data,Categoria"]
+    for i in range(25):
+        descricao = f'"Despesa {i}\nlinha 2\nlinha 3"' if i % 3 == 0 else f"Despesa {i}"
+        linhas.append(f'despesa,{descricao},"R$ {i},90",2019-05-01,Manutenção')
+        if i % 5 == 1:
+            linhas.append("")
+    caminho.write_text("\n".join(linhas) + "\n", encoding="utf-8")
+    return str(caminho)
+
+
+@pytest.mark.parametrize("inicio", [0, 3, 4, 10, 24, 25, 40])
+def test_blocos_pulam_registros_e_nao_linhas(legado, inicio):
+    blocos = list(ler_csv_em_blocos(legado, 4, inicio=inicio))
+    descricoes = [descricao for bloco in blocos for descricao in bloco["Descrição"]]
+    assert descricoes == [f"Despesa {i}\nlinha 2\nlinha 3" if i % 3 == 0 else f"Despesa {i}"
+                          for i in range(inicio, 25)]
+    assert all(len(bloco) <= 4 for bloco in blocos)
+
+
+def test_csv_vazio(tmp_path):
+    caminho = tmp_path / "vazio.csv"
+    caminho.write_text("")
+    assert list(ler_csv_em_blocos(str(caminho), 4, inicio=2)) == []
+
+
+def test_migracao_retomada_com_campos_multilinha(db, legado):
+    def interromper(migradas):
+        if migradas >= 8:
+            raise Interrompida()
+
+    with pytest.raises(Interrompida):
+        db.migrate_csv_file("transacoes", legado, 4, progress=interromper)
+    assert db.execute_query("SELECT COUNT(*) FROM transacoes", fetch_one=True)[0] == 8
+
+    estatisticas = db.migrate_csv_file("transacoes", legado, 4)
+    assert estatisticas["retomada_em"] == 8
+    assert estatisticas["linhas"] == 17
+    descricoes = [row[0] for row in db.execute_query("SELECT descricao FROM transacoes ORDER BY id",
+                                                     fetch_all=True)]
+    assert descricoes == pd.read_csv(legado, dtype=str)["Descrição"].tolist()
+    assert db.migrate_csv_file("transacoes", legado, 4) is None
@@ -0,0 +1,77 @@
+import threading
+
+from database_manager import DatabaseManager
+
+
+def emitir(db, numero, inicio, fim):
+    return db.issue_invoice(numero, 1, 1, inicio, fim, 1, 80.0, 80.0)
+
+
+def test_reserva_e_devolucao(db):
+    assert db.reserve_invoice_numbers(3) == ["000001", "000002", "000003"]
+    assert db.release_invoice_numbers(["000002"]) == 1
+    assert db.peek_next_invoice_number() == "000002"
+    # O devolvido é o primeiro a sair na próxima alocação
+    assert emitir(db, None, "2030-01-01", "2030-01-02")["fatura"]["numero_fatura"] == "000002"
+    assert db.peek_next_invoice_number() == "000004"
+
+
+def test_devolucao_rejeita_numero_nao_reservado(db):
+    emitir(db, "000123", "2030-01-01", "2030-01-02")
+    # 3 é uma lacuna antiga da numeração, nunca reservada
+    assert db.release_invoice_numbers(["000003"]) == 0
+    assert db.peek_next_invoice_number() == "000124"
+
+
+def test_devolucao_rejeita_numero_ja_usado_ou_devolvido(db):
+    numero, = db.reserve_invoice_numbers(1)
+    emitir(db, numero, "2030-01-01", "2030-01-02")
+    assert db.release_invoice_numbers([numero]) == 0
+
+    outro, = db.reserve_invoice_numbers(1)
+    assert db.release_invoice_numbers([outro]) == 1
+    assert db.release_invoice_numbers([outro]) == 0
+    assert db.execute_query("SELECT COUNT(*) FROM numeros_fatura_livres", fetch_one=True)[0] == 1
+
+
+def test_devolucao_ignora_numeros_invalidos(db):
+    db.reserve_invoice_numbers(1)
+    assert db.release_invoice_numbers(["abc", "", "000999"]) == 0
+
+
+def test_alocacao_concorrente_sem_numeros_repetidos(db, tmp_path):
+    threads, operacoes = 4, 15
+    numeros, erros = [], []
+    lock = threading.Lock()
+
+    def trabalhar(indice):
+        # Cada thread usa o próprio gerenciador (outro pool de conexões), como outra sessão
+        gerenciador = DatabaseManager(db.db_path, backup_dir=str(tmp_path / "backups"))
+        try:
+            for i in range(operacoes):
+                dia = indice * operacoes + i
+                inicio = f"2031-{1 + dia // 28:02d}-{1 + dia % 28:02d}"
+                if i % 5 == 0:
+                    bloco = gerenciador.reserve_invoice_numbers(3)
+                    gerenciador.release_invoice_numbers(bloco[2:])
+                    usados = bloco[:2]
+                else:
+                    usados = [emitir(gerenciador, None, inicio, inicio)["fatura"]["numero_fatura"]]
+                with lock:
+                    numeros.extend(usados)
+        except Exception as e:
+            with lock:
+                erros.append(e)
+        finally:
+            gerenciador.close()
+
+    trabalhadores = [threading.Thread(target=trabalhar, args=(i,)) for i in range(threads)]
+    for trabalhador in trabalhadores:
+        trabalhador.start()
+    for trabalhador in trabalhadores:
+        trabalhador.join()
+
+    assert erros == []
+    assert len(numeros) == len(set(numeros))
+    faturas = db.execute_query("SELECT COUNT(*) FROM faturas", fetch_one=True)[0]
+    assert faturas == threads * (operacoes - operacoes // 5)